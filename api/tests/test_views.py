@@ -172,13 +172,18 @@ class TestEntry(TestCase):
         result = self.client.get("/data/headword_search/?term=ba")
         expected = {
             'entries': [
-                {'id': 'bar', 'label': 'bar', 'value': 'bar'},
-                {'id': 'baz', 'label': 'baz', 'value': 'baz'}
+                {'id': 'bar', 'label': 'bar', 'value': 'bar', 'type': 'entry'},
+                {'id': 'baz', 'label': 'baz', 'value': 'baz', 'type': 'entry'}
             ]
         }
         self.assertEqual(result.status_code, 200)
         self.assertDictEqual(result.json(), expected)
 
+    def test_entries(self):
+        result = self.client.get("/data/entries/?q=BA")
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual([e['slug'] for e in result.json()['entries']], ['bar', 'baz'])
+
     def test_random_entry(self):
         result = self.client.get("/data/entries/random/", follow=True)
         j = result.json()
@@ -221,6 +226,20 @@ class TestExample(TestCase):
         self.assertEqual(result.status_code, 200)
         self.assertDictEqual(j, expected)
 
+    @mock.patch('dictionary.utils.check_for_image')
+    def test_example_search(self, mock_check_for_image):
+        mock_check_for_image.return_value = '__none.png'
+        result = self.client.get("/data/examples/search/?q=rocks")
+        j = result.json()
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(j['result_count'], 1)
+        self.assertEqual(j['examples'][0]['lyric'], "Now, it's time for me, the E, to rock it loco")
+
+    def test_example_search_no_results(self):
+        result = self.client.get("/data/examples/search/?q=zootie")
+        self.assertEqual(result.status_code, 200)
+        self.assertDictEqual(result.json(), {})
+
 
 class TestPlace(TestCase):
 
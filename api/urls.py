@@ -27,10 +27,12 @@ urlpatterns = [
     path("regions/<slug:region_slug>/", views.region, name="region"),
 
     path("entries/random/", views.random_entry, name="random_entry"),
+    path("entries/word-of-the-day/", views.word_of_the_day, name="word_of_the_day"),
     path("entries/", views.entries, name="entries"),
     path("entries/<slug:entry_slug>/", views.entry, name="entry"),
 
     path("examples/random/", views.random_example, name="random_example"),
+    path("examples/search/", views.example_search, name="example_search"),
 
     path("headword_search/", views.headword_search, name="headword_search"),
 
@@ -5,11 +5,14 @@ from rest_framework.reverse import reverse
 from rest_framework.decorators import api_view
 
 from api.utils import APIUtils
-from dictionary.models import Artist, Domain, Region, Entry, Example, \
+from dictionary.models import Artist, Domain, Region, Entry, \
     NamedEntity, Place, Salience, SemanticClass, Sense, Song
-from dictionary.utils import build_artist, build_example, build_beta_example, \
-    build_place, build_place_with_artist_slugs, build_sense, build_timeline_example, build_song, \
-    check_for_image, reduce_ordered_list, reformat_name, slugify, build_heatmap_feature
+from dictionary.utils import build_artist, build_examples, build_beta_example, prefetch_examples, \
+    build_place, build_place_with_artist_slugs, build_sense, build_senses, build_timeline_example, build_song, \
+    check_for_image, reduce_ordered_list, reformat_name, search_examples, slugify, build_heatmap_feature
+from dictionary.prefix_index import ENTRY, get_prefix_index
+from dictionary.published_index import get_published_index
+from dictionary.sampler import get_sampler
 from dictionary.views import NUM_QUOTS_TO_SHOW
 
 
@@ -108,7 +111,7 @@ def artist_sense_examples(request, artist_slug):
     artist_results = Artist.objects.filter(slug=artist_slug)
     _artist = artist_results[0]
     feat = request.GET.get('feat', '')
-    published = Entry.objects.filter(publish=True).values_list('slug', flat=True)
+    published = get_published_index().slugs
     if not feat:
         salient_senses = _artist.get_salient_senses()
         if not salient_senses.count():
@@ -122,7 +125,7 @@ def artist_sense_examples(request, artist_slug):
                 'slug': _sense.slug,
                 'xml_id': _sense.xml_id,
                 'example_count': _sense.examples.filter(artist=_artist).count(),
-                'examples': [build_example(example, published) for example in _sense.examples.filter(artist=_artist).order_by('release_date')]
+                'examples': build_examples(_sense.examples.filter(artist=_artist).order_by('release_date'), published)
             } for _sense in p_senses
         ]
     else:
@@ -132,7 +135,7 @@ def artist_sense_examples(request, artist_slug):
                 'slug': _sense.slug,
                 'xml_id': _sense.xml_id,
                 'example_count': _sense.examples.filter(feat_artist=_artist).count(),
-                'examples': [build_example(example, published) for example in _sense.examples.filter(feat_artist=_artist).order_by('release_date')]
+                'examples': build_examples(_sense.examples.filter(feat_artist=_artist).order_by('release_date'), published)
             } for _sense in _artist.featured_senses.filter(publish=True).annotate(num_examples=Count('examples')).order_by('num_examples')[5:]
         ]
     if _senses:
@@ -234,7 +237,7 @@ def artist_salient_senses(request, artist_slug):
     except Exception as e:
         return Response({})
     else:
-        results = Salience.objects.filter(artist=_artist).order_by('-score')
+        results = Salience.objects.filter(artist=_artist).select_related('sense').order_by('artist_rank', '-score')
 
         linked = [{
             "headword": s.sense.headword,
@@ -346,18 +349,37 @@ def regions(request):
         return Response({})
 
 
+@api_view(('GET',))
+def example_search(request):
+    q = request.GET.get('q', '')
+    limit, offset = APIUtils.extract_limit_offset(request)
+    results = search_examples(q)
+    result_count = results.count()
+    if result_count:
+        published = get_published_index().slugs
+        data = {
+            'query': q,
+            'result_count': result_count,
+            'examples': build_examples(results[offset:limit+offset], published, rf=True)
+        }
+        return Response(data)
+    else:
+        return Response({})
+
+
 @api_view(('GET',))
 def headword_search(request):
     q = request.GET.get('term', '')
-    results = Entry.objects.filter(publish=True).filter(headword__istartswith=q)[:20]
+    results = get_prefix_index().search(q)
     if results:
         data = {
             "entries": [
                 {
-                    'id': _entry.slug,
-                    'label': _entry.headword,
-                    'value': _entry.headword
-                } for _entry in results]
+                    'id': suggestion.slug,
+                    'label': suggestion.label,
+                    'value': suggestion.label,
+                    'type': suggestion.type
+                } for suggestion in results]
         }
         return Response(data)
     else:
@@ -387,15 +409,15 @@ def entry(request, entry_slug):
 @api_view(('GET',))
 def entries(request):
     q = request.GET.get('q', '')
-    results = Entry.objects.filter(publish=True).filter(headword__istartswith=q)[:20]
+    results = get_prefix_index().search(q, types=(ENTRY,))
     if results:
         data = {
             "entries": [
                 {
-                    'slug': _entry.slug,
-                    'headword': _entry.headword,
-                    'link': reverse('entry', args=[_entry.slug], request=request)
-                } for _entry in results]
+                    'slug': suggestion.slug,
+                    'headword': suggestion.label,
+                    'link': reverse('entry', args=[suggestion.slug], request=request)
+                } for suggestion in results]
         }
         return Response(data)
     else:
@@ -435,10 +457,20 @@ def place_artists(request, place_slug):
 
 @api_view(('GET',))
 def random_entry(request):
-    published = Entry.objects.filter(publish=True).values_list('slug', flat=True)
-    _entry = Entry.objects.filter(publish=True).order_by('?').first()
+    _entry = get_sampler().choice('entry')
+    return entry_with_senses(_entry)
+
+
+@api_view(('GET',))
+def word_of_the_day(request):
+    _entry = get_sampler().word_of_the_day()
+    return entry_with_senses(_entry)
+
+
+def entry_with_senses(_entry):
+    published = get_published_index().slugs
     if _entry:
-        _senses = [build_sense(_sense, published) for _sense in _entry.get_senses_ordered_by_example_count()]
+        _senses = build_senses(_entry.get_senses_ordered_by_example_count(), published)
         data = {'headword': _entry.headword, 'slug': _entry.slug, 'pub_date': _entry.pub_date, 'senses': _senses}
         return Response(data)
     else:
@@ -447,43 +479,43 @@ def random_entry(request):
 
 @api_view(('GET',))
 def random_artist(request):
-    a = Artist.objects.all().order_by('?').first()
+    a = get_sampler().choice('artist')
     return Response(build_artist(a)) if a else Response({})
 
 
 @api_view(('GET',))
 def random_song(request):
-    s = Song.objects.all().order_by('?').first()
+    s = get_sampler().choice('song')
     return Response(build_song(s)) if s else Response({})
 
 
 @api_view(('GET',))
 def random_place(request):
-    p = Place.objects.filter(longitude__isnull=False).order_by('?').first()
+    p = get_sampler().choice('place')
     return Response(build_place(p)) if p else Response({})
 
 
 @api_view(('GET',))
 def random_sense(request):
-    published = Entry.objects.filter(publish=True).values_list('slug', flat=True)
-    s = Sense.objects.filter(publish=True).order_by('?').first()
+    published = get_published_index().slugs
+    s = get_sampler().choice('sense')
     return Response(build_sense(s, published)) if s else Response({})
 
 
 @api_view(('GET',))
 def random_example(request):
-    result = Example.objects.order_by('?').first()
+    result = get_sampler().choice('example')
     return Response(build_beta_example(result)) if result else Response({})
 
 
 @api_view(('GET',))
 def remaining_place_examples(request, place_slug):
-    published = Entry.objects.filter(publish=True).values_list('slug', flat=True)
+    published = get_published_index().slugs
     entity_results = NamedEntity.objects.filter(pref_label_slug=place_slug)
     examples = []
     if len(entity_results) >= 1:
         for entity in entity_results:
-            examples += [build_example(example, published) for example in entity.examples.order_by('release_date')]
+            examples += build_examples(entity.examples.order_by('release_date'), published)
 
     if examples:
         data = {
@@ -497,14 +529,14 @@ def remaining_place_examples(request, place_slug):
 
 @api_view(('GET',))
 def remaining_sense_examples(request, sense_id):
-    published = Entry.objects.filter(publish=True).values_list('slug', flat=True)
+    published = get_published_index().slugs
     sense_object = Sense.objects.filter(xml_id=sense_id)[0]
     example_results = sense_object.examples.order_by('release_date')
 
     if example_results:
         data = {
             'sense_id': sense_id,
-            'examples': [build_example(example, published) for example in example_results[NUM_QUOTS_TO_SHOW:]]
+            'examples': build_examples(example_results[NUM_QUOTS_TO_SHOW:], published)
         }
         return Response(data)
     else:
@@ -553,7 +585,7 @@ def semantic_classes(request):
 @api_view(('GET',))
 def sense(request, sense_id):
     results = Sense.objects.filter(xml_id=sense_id)
-    published = Entry.objects.filter(publish=True).values_list('slug', flat=True)
+    published = get_published_index().slugs
     if results:
         sense_object = results[0]
         data = {'senses': [build_sense(sense_object, published)]}
@@ -565,7 +597,7 @@ def sense(request, sense_id):
 @api_view(('GET',))
 def sense_artist(request, sense_id, artist_slug):
     feat = request.GET.get('feat', '')
-    published = Entry.objects.filter(publish=True).values_list('slug', flat=True)
+    published = get_published_index().slugs
     sense_results = Sense.objects.filter(xml_id=sense_id)
     artist_results = Artist.objects.filter(slug=artist_slug)
     if sense_results and artist_results:
@@ -580,7 +612,7 @@ def sense_artist(request, sense_id, artist_slug):
             data = {
                 'sense_id': sense_id,
                 'artist_slug': artist_slug,
-                'examples': [build_example(example, published, rf=False) for example in example_results]
+                'examples': build_examples(example_results, published, rf=False)
             }
             return Response(data)
         else:
@@ -621,7 +653,7 @@ def sense_artists_salience(request, sense_id):
     results = Sense.objects.filter(xml_id=sense_id)
     if results:
         _sense = results[0]
-        _saliences = Salience.objects.filter(sense=_sense).order_by("-score")
+        _saliences = Salience.objects.filter(sense=_sense).select_related('artist').order_by("sense_rank", "-score")
 
         sorted_data = [{
             "artist": build_artist(s.artist),
@@ -641,7 +673,7 @@ def sense_artists_salience(request, sense_id):
 @api_view(('GET',))
 def sense_timeline(request, sense_id):
     EXX_THRESHOLD = 30
-    published_entries = Entry.objects.filter(publish=True).values_list('headword', flat=True)
+    published_entries = get_published_index().headwords
     results = Sense.objects.filter(xml_id=sense_id)
     if results:
         _sense = results[0]
@@ -649,6 +681,7 @@ def sense_timeline(request, sense_id):
         exx_count = exx.count()
         if exx_count > 30:
             exx = [ex for ex in reduce_ordered_list(exx, EXX_THRESHOLD)]
+        exx = prefetch_examples(exx)
         events = [build_timeline_example(example, published_entries) for example in exx if check_for_image(example.artist_slug, 'artists', 'full')]
         data = {
             "events": events
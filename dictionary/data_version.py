@@ -0,0 +1,39 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+DATA_VERSION_KEY = 'data_version'
+
+_checked = {'version': None, 'at': 0.0}
+
+
+def get_data_version() -> str:
+    """
+    Returns the stamp identifying the current state of the published data, shared by all workers
+    through the cache; in-memory indexes compare it to the stamp they were built from.
+    The shared stamp is re-read at most once per DATA_VERSION_CHECK_INTERVAL seconds (5 by default),
+    a bump made in this worker being seen at once
+    """
+    interval = getattr(settings, 'DATA_VERSION_CHECK_INTERVAL', 5)
+    now = time.monotonic()
+    if _checked['version'] is not None and now - _checked['at'] < interval:
+        return _checked['version']
+    version = cache.get(DATA_VERSION_KEY)
+    if version is None:
+        version = bump_data_version()
+    _checked['version'], _checked['at'] = version, now
+    return version
+
+
+def bump_data_version() -> str:
+    """
+    Marks the published data as changed, so that every worker rebuilds its indexes on next use;
+    called at the end of ingestion & whenever a headword is renamed
+    """
+    version = uuid.uuid4().hex
+    cache.set(DATA_VERSION_KEY, version, None)
+    _checked['version'], _checked['at'] = version, time.monotonic()
+    return version
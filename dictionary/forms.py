@@ -3,9 +3,17 @@ from dictionary.models import Song, Sense
 
 
 class SongForm(forms.ModelForm):
+    # lyrics live in their own table, so are loaded for the form only & saved with Song.set_lyrics
+    lyrics = forms.CharField(required=False, widget=forms.Textarea)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk is not None and 'lyrics' not in self.initial:
+            self.initial['lyrics'] = self.instance.get_lyrics()
+
     class Meta:
         model = Song
-        fields = ("id", "xml_id", "release_date", "release_date_string", "title", "artist_name", "album", "lyrics", "release_date_verified")
+        fields = ("id", "xml_id", "release_date", "release_date_string", "title", "artist_name", "album", "release_date_verified")
         widgets = {
             "title": forms.fields.TextInput(attrs={
                 "placeholder": "Enter the song title",
@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+IMAGE_ROOT = 'dictionary/static/dictionary/img'
+IMAGE_URL_ROOT = '/static/dictionary/img'
+IMAGE_EXTENSIONS = ('.jpg', '.png')
+
+ImageKey = Tuple[str, str, str]
+
+
+class ImageManifest:
+    """
+    In-memory index of the images under dictionary/static/dictionary/img, keyed by
+    (image_type, folder, slug), so that image lookups are dict hits rather than stat calls
+    """
+
+    def __init__(self, images: Dict[ImageKey, List[str]]):
+        self.images = images
+
+    def __len__(self):
+        return len(self.images)
+
+    def lookup(self, slug: str, image_type: str = 'artists', folder: str = 'thumb') -> List[str]:
+        return self.images.get((image_type, folder, slug), [])
+
+    @staticmethod
+    def scan(root: Optional[str] = None) -> 'ImageManifest':
+        root = root if root is not None else os.path.join(settings.BASE_DIR, IMAGE_ROOT)
+        images = dict()
+        for image_type in sorted(os.listdir(root)):
+            type_dir = os.path.join(root, image_type)
+            if not os.path.isdir(type_dir):
+                continue
+            for folder in sorted(os.listdir(type_dir)):
+                folder_dir = os.path.join(type_dir, folder)
+                if not os.path.isdir(folder_dir):
+                    continue
+                # sorted() puts each slug's .jpg ahead of its .png, as check_for_image always has
+                for filename in sorted(os.listdir(folder_dir)):
+                    slug, extension = os.path.splitext(filename)
+                    if extension in IMAGE_EXTENSIONS:
+                        url = '{}/{}/{}/{}'.format(IMAGE_URL_ROOT, image_type, folder, filename)
+                        images.setdefault((image_type, folder, slug), []).append(url)
+        return ImageManifest(images)
+
+    def to_dict(self) -> Dict[str, Dict[str, Dict[str, List[str]]]]:
+        nested = dict()
+        for (image_type, folder, slug), urls in self.images.items():
+            nested.setdefault(image_type, dict()).setdefault(folder, dict())[slug] = urls
+        return nested
+
+    @staticmethod
+    def from_dict(nested: Dict[str, Dict[str, Dict[str, List[str]]]]) -> 'ImageManifest':
+        return ImageManifest({
+            (image_type, folder, slug): urls
+            for image_type, folders in nested.items()
+            for folder, slugs in folders.items()
+            for slug, urls in slugs.items()
+        })
+
+    def save(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, sort_keys=True)
+
+    @staticmethod
+    def load(path: str) -> 'ImageManifest':
+        with open(path, encoding='utf-8') as f:
+            return ImageManifest.from_dict(json.load(f))
+
+
+_manifest: Optional[ImageManifest] = None
+
+
+def manifest_path() -> str:
+    return getattr(settings, 'IMAGE_MANIFEST_PATH', os.path.join(settings.BASE_DIR, 'dictionary/image_manifest.json'))
+
+
+def get_image_manifest() -> ImageManifest:
+    """
+    Returns this worker's manifest, loading it from the generated file on first use,
+    or scanning the image tree if no file has been generated yet
+    """
+    global _manifest
+    if _manifest is None:
+        path = manifest_path()
+        try:
+            _manifest = ImageManifest.load(path)
+        except (IOError, ValueError) as e:
+            msg = "Unable to load image manifest from {} ({}); scanning image directory".format(path, e)
+            logger.warning(msg)
+            _manifest = ImageManifest.scan()
+    return _manifest
+
+
+def refresh_image_manifest(write: bool = False) -> ImageManifest:
+    """
+    Rebuilds the manifest from the image tree & swaps it in for this worker,
+    optionally writing it out for other workers to load
+    """
+    global _manifest
+    manifest = ImageManifest.scan()
+    if write:
+        manifest.save(manifest_path())
+    _manifest = manifest
+    return manifest
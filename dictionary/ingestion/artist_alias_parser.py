@@ -1,4 +1,5 @@
 from dictionary.ingestion.artist_parser import ArtistParser
+from dictionary.models import ArtistParsed
 from dictionary.utils import slugify
 
 
@@ -6,6 +7,10 @@ class ArtistAliasParser:
 
     @staticmethod
     def parse(row):
+        _ = ArtistParser.persist(ArtistAliasParser.extract(row))
+
+    @staticmethod
+    def extract(row) -> ArtistParsed:
         artist_name, alias_name = row
         alias = {
             "name": alias_name,
@@ -16,5 +21,4 @@ class ArtistAliasParser:
             "slug": slugify(artist_name),
             "also_known_as": [alias]
         }
-        artist_parsed = ArtistParser.parse(artist)
-        _ = ArtistParser.persist(artist_parsed)
+        return ArtistParser.parse(artist)
@@ -1,4 +1,5 @@
 from dictionary.ingestion.artist_parser import ArtistParser
+from dictionary.models import ArtistParsed
 from dictionary.utils import slugify
 
 
@@ -6,6 +7,10 @@ class ArtistMembershipParser:
 
     @staticmethod
     def parse(row):
+        _ = ArtistParser.persist(ArtistMembershipParser.extract(row))
+
+    @staticmethod
+    def extract(row) -> ArtistParsed:
         artist_name, group_name = row
         group = {
             "name": group_name,
@@ -16,5 +21,4 @@ class ArtistMembershipParser:
             "slug": slugify(artist_name),
             "member_of": [group]
         }
-        artist_parsed = ArtistParser.parse(artist)
-        _ = ArtistParser.persist(artist_parsed)
+        return ArtistParser.parse(artist)
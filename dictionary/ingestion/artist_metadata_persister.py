@@ -0,0 +1,128 @@
+from collections import Counter
+from typing import Any, Dict, Set, Tuple
+
+from django.core.exceptions import MultipleObjectsReturned
+from django.db import transaction
+from django.db.models import Q
+
+from dictionary.ingestion.artist_parser import ArtistParser
+from dictionary.ingestion.write_tracker import WriteTracker
+from dictionary.models import Artist, ArtistParsed, Place, PlaceParsed
+
+
+BATCH_SIZE = 1000
+
+
+class ArtistMetadataPersister:
+    """
+    Batch path for the artist metadata CSVs (origins, aliases & memberships): rows are collected whole, the artists
+    & places they name are resolved with one query each & written with bulk_create/bulk_update, and the CSV's links
+    missing from each relation it was read for are inserted, all in one transaction; counts of what changed are kept
+    for the report. Like the row by row path, links are only ever added, since the XML ingest & Artist.add_alias add
+    them too; with replace, the links of the artists a CSV lists are instead made exactly the CSV's
+    """
+
+    def __init__(self, replace: bool = False):
+        self.replace = replace
+        self.artists: Dict[str, str] = dict()
+        self.places: Dict[str, PlaceParsed] = dict()
+        self.links: Dict[Any, Set[Tuple[str, str]]] = dict()
+        self.counts = Counter()
+
+    def add_artist(self, nt: ArtistParsed) -> str:
+        self.artists[nt.slug] = nt.name
+        return nt.slug
+
+    def collect_origin(self, nt: ArtistParsed) -> None:
+        links = self.links.setdefault(Artist.origin, set())
+        artist = self.add_artist(nt)
+        origin = ArtistParser.extract_origin(nt)
+        if origin:
+            self.places[origin.slug] = origin
+            links.add((artist, origin.slug))
+
+    def collect_aliases(self, nt: ArtistParsed) -> None:
+        links = self.links.setdefault(Artist.also_known_as, set())
+        artist = self.add_artist(nt)
+        for alias in ArtistParser.extract_aliases(nt):
+            # also_known_as is symmetrical, so its through table holds each alias both ways round
+            links.add((artist, self.add_artist(alias)))
+            links.add((alias.slug, artist))
+
+    def collect_membership(self, nt: ArtistParsed) -> None:
+        links = self.links.setdefault(Artist.member_of, set())
+        artist = self.add_artist(nt)
+        for group in ArtistParser.extract_membership(nt):
+            links.add((artist, self.add_artist(group)))
+
+    def persist(self) -> Counter:
+        with transaction.atomic():
+            self.persist_artists()
+            place_ids = self.persist_places()
+            for relation, links in self.links.items():
+                if relation is Artist.origin:
+                    links = {(artist, place_ids[place]) for artist, place in links}
+                self.sync(relation, links)
+        return self.counts
+
+    def persist_artists(self) -> None:
+        stored = dict(Artist.objects.filter(slug__in=list(self.artists)).order_by().values_list('slug', 'name'))
+        created = [Artist(slug=slug, name=name) for slug, name in self.artists.items() if slug not in stored]
+        renamed = [Artist(slug=slug, name=name) for slug, name in self.artists.items()
+                   if slug in stored and stored[slug] != name]
+        Artist.objects.bulk_create(created, batch_size=BATCH_SIZE)
+        Artist.objects.bulk_update(renamed, ['name'], batch_size=BATCH_SIZE)
+        self.counts.update({'artists created': len(created), 'artists renamed': len(renamed)})
+
+    def persist_places(self) -> Dict[str, int]:
+        """Writes places as PlaceParser.persist does, returning the id of each by slug"""
+        stored: Dict[str, Place] = dict()
+        for place in Place.objects.filter(slug__in=list(self.places)).order_by():
+            if place.slug in stored:
+                print(place.slug, "has more than one place")
+                raise MultipleObjectsReturned(place.slug)
+            stored[place.slug] = place
+        created, changed, fields = list(), list(), set()
+        for slug, nt in self.places.items():
+            values = dict(name=nt.name, full_name=nt.full_name)
+            if nt.latitude and nt.longitude:
+                values.update(latitude=nt.latitude, longitude=nt.longitude)
+            place = stored.get(slug)
+            if place is None:
+                created.append(Place(slug=slug, **{'latitude': nt.latitude or None, 'longitude': nt.longitude or None,
+                                                   **values}))
+                continue
+            diff = WriteTracker.changed_fields(place, values)
+            if diff:
+                for f, v in diff.items():
+                    setattr(place, f, v)
+                changed.append(place)
+                fields.update(diff)
+        Place.objects.bulk_create(created, batch_size=BATCH_SIZE)
+        if changed:
+            Place.objects.bulk_update(changed, sorted(fields), batch_size=BATCH_SIZE)
+        self.counts.update({'places created': len(created), 'places updated': len(changed)})
+        return {place.slug: place.id for place in list(stored.values()) + created}
+
+    def sync(self, relation, links: Set[Tuple[Any, Any]]) -> None:
+        """
+        Inserts the links the relation lacks; when replacing, also deletes the other links of the artists among
+        links' sources, both ways round for a symmetrical relation so that its through table stays symmetrical
+        """
+        through, name = relation.through, relation.field.name
+        source, target = relation.field.m2m_column_name(), relation.field.m2m_reverse_name()
+        scope = {artist for artist, _ in links}
+        listed = Q(**{source + '__in': scope})
+        if self.replace and relation.field.remote_field.symmetrical:
+            listed |= Q(**{target + '__in': scope})
+        stored = {(s, t): pk for pk, s, t in through.objects.filter(listed).values_list('id', source, target)}
+        stale = [pk for link, pk in stored.items() if link not in links] if self.replace else list()
+        added = links - set(stored)
+        if stale:
+            through.objects.filter(id__in=stale).delete()
+        through.objects.bulk_create([through(**{source: s, target: t}) for s, t in added],
+                                    batch_size=BATCH_SIZE, ignore_conflicts=True)
+        self.counts.update({f'{name} added': len(added), f'{name} removed': len(stale)})
+
+    def report(self) -> str:
+        return ', '.join(f"{count} {change}" for change, count in sorted(self.counts.items()))
@@ -1,4 +1,5 @@
 from dictionary.ingestion.artist_parser import ArtistParser
+from dictionary.models import ArtistParsed
 from dictionary.utils import slugify
 
 
@@ -6,6 +7,10 @@ class ArtistOriginParser:
 
     @staticmethod
     def parse(row):
+        _ = ArtistParser.persist(ArtistOriginParser.extract(row))
+
+    @staticmethod
+    def extract(row) -> ArtistParsed:
         artist_name, origin_full_name, latitude, longitude = row
         origin = {
             "full_name": origin_full_name,
@@ -19,5 +24,4 @@ class ArtistOriginParser:
             "slug": slugify(artist_name),
             "origin": origin
         }
-        artist_parsed = ArtistParser.parse(artist)
-        _ = ArtistParser.persist(artist_parsed)
+        return ArtistParser.parse(artist)
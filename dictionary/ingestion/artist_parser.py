@@ -1,6 +1,6 @@
-from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
 from typing import Tuple, Dict, Optional, List
 
+from dictionary.ingestion.identity_map import IdentityMap
 from dictionary.ingestion.place_parser import PlaceParser
 from dictionary.models import ArtistParsed, Artist, ArtistRelations, Place, PlaceParsed
 from dictionary.utils import slugify
@@ -24,15 +24,7 @@ class ArtistParser:
 
     @staticmethod
     def persist(nt: ArtistParsed) -> Tuple[Artist, ArtistRelations]:
-        try:
-            artist = Artist.objects.get(slug=nt.slug)
-            artist.name = nt.name
-            artist.save()
-        except MultipleObjectsReturned as e:
-            print(nt.slug, e)
-            raise
-        except ObjectDoesNotExist:
-            artist = Artist.objects.create(slug=nt.slug, name=nt.name)
+        artist = IdentityMap.persist(Artist, dict(slug=nt.slug), dict(name=nt.name))
         return ArtistParser.update_relations(artist, nt)
 
     @staticmethod
@@ -0,0 +1,362 @@
+from collections import defaultdict
+from typing import Any, Dict, List, Set, Tuple
+
+from django.core.exceptions import MultipleObjectsReturned
+from django.db import transaction
+from django.db.models import Q
+
+from dictionary.ingestion.dirty_tracker import DirtyTracker
+from dictionary.ingestion.entry_parser import EntryParser
+from dictionary.ingestion.example_parser import ExampleParser
+from dictionary.ingestion.lyric_link_parser import LyricLinkParser
+from dictionary.ingestion.sense_parser import SenseParser
+from dictionary.ingestion.write_tracker import WriteTracker
+from dictionary.models import Entry, EntryParsed, Form, Sense, SenseParsed, Domain, Region, SemanticClass, SynSet, \
+    Xref, Collocate, Artist, Example, ExampleParsed, Song, ExampleRhyme, NamedEntity, LyricLink
+from dictionary.utils import slugify, render_linked_lyrics, rerender_linked_lyrics, content_digest
+
+
+BATCH_SIZE = 1000
+
+# the fields each model's rows are resolved by (the first one is the IN lookup), as in the parsers' gets
+KEYS = {
+    Form: ('slug',),
+    Sense: ('xml_id',),
+    Domain: ('slug',),
+    Region: ('slug',),
+    SemanticClass: ('slug',),
+    SynSet: ('slug',),
+    Xref: ('target_id', 'xref_word', 'xref_type', 'target_lemma', 'target_slug'),
+    Collocate: ('source_sense_xml_id', 'collocate_lemma', 'target_id'),
+    Artist: ('slug',),
+    Example: ('lyric_text', 'song_title', 'artist_name', 'artist_slug', 'release_date', 'release_date_string', 'album'),
+    Song: ('slug', 'album'),
+    ExampleRhyme: ('word_one', 'word_two', 'word_one_position', 'word_two_position'),
+    NamedEntity: ('pref_label_slug', 'entity_type'),
+    LyricLink: ('target_slug', 'link_text', 'link_type', 'target_lemma', 'position'),
+}
+
+# the fields the parsers' persist methods overwrite on an existing row
+UPDATE_FIELDS = {
+    Form: ['frequency'],
+    Sense: ['json', 'headword', 'part_of_speech', 'definition', 'etymology', 'notes', 'slug', 'publish', 'digest'],
+    Domain: ['name'],
+    Region: ['name'],
+    SemanticClass: ['name'],
+    SynSet: [],
+    Xref: ['position', 'frequency'],
+    Collocate: ['target_slug', 'frequency'],
+    Artist: ['name'],
+    Example: ['digest'],
+    Song: ['title', 'xml_id', 'release_date', 'release_date_string', 'artist_name', 'artist_slug', 'spot_uri'],
+    ExampleRhyme: ['word_one_slug', 'word_two_slug', 'word_two_target_id'],
+    NamedEntity: ['pref_label', 'slug', 'name'],
+    LyricLink: [],
+}
+
+EXAMPLE_RELATIONS = (Example.artist, Example.from_song, Example.feat_artist, Example.example_rhymes,
+                     Example.illustrates_senses, Example.features_entities, Example.lyric_links)
+SENSE_RELATIONS = (Sense.examples, Sense.domains, Sense.regions, Sense.semantic_classes, Sense.synset, Sense.xrefs,
+                   Sense.sense_rhymes, Sense.collocates, Sense.features_entities, Sense.cites_artists)
+
+
+class BulkPersister:
+    """
+    Batch persistence mode for one file's entries: the parsers' extract methods collect the namedtuples,
+    then each model's existing rows are resolved with one IN query, new rows are inserted with bulk_create
+    & changed ones written with bulk_update, and relations are synced a through table at a time by their difference
+    with the stored links, in place of a get & save per row & an add() per relation
+    """
+
+    def __init__(self, force_update: bool = False):
+        self.force_update = force_update
+        self.rows: Dict[Any, Dict[Tuple, Dict[str, Any]]] = defaultdict(dict)
+        self.stub_senses: Dict[Tuple, Dict[str, Any]] = dict()
+        self.objects: Dict[Any, Dict[Tuple, Any]] = defaultdict(dict)
+        self.purges: Dict[Any, Set[Tuple]] = defaultdict(set)
+        self.links: Dict[Any, Set[Tuple[Tuple, Tuple]]] = defaultdict(set)
+        self.republished: List[str] = list()
+        self.sense_digests: Dict[str, str] = dict()
+        self.example_digests: Dict[Tuple, str] = dict()
+        self.changed_examples: Set[Tuple] = set()
+        self.dirty_senses: Set[Tuple] = set()
+        self.dirty_artists: Set[Tuple] = set()
+
+    @staticmethod
+    def clean(model, **values) -> Dict[str, Any]:
+        """Converts parsed values to the python types the database hands back, so that keys compare equal"""
+        return {f: model._meta.get_field(f).to_python(v) for f, v in values.items()}
+
+    def add(self, model, **values) -> Tuple:
+        row = BulkPersister.clean(model, **values)
+        key = tuple(row[f] for f in KEYS[model])
+        self.rows[model][key] = row
+        return key
+
+    def link(self, relation, source: Tuple, target: Tuple) -> None:
+        self.links[relation].add((source, target))
+
+    def purge(self, source: Tuple, *relations) -> None:
+        for relation in relations:
+            self.purges[relation].add(source)
+
+    @staticmethod
+    def upsert(model, rows: Dict[Tuple, Dict[str, Any]], update_fields: List[str]) -> Dict[Tuple, Any]:
+        """
+        Resolves rows against the table with one IN query on their first key field,
+        bulk_updates the existing ones whose update_fields differ & bulk_creates the rest
+        """
+        if not rows:
+            return dict()
+        key_fields = KEYS[model]
+        lookup = key_fields[0]
+        resolved = dict()
+        for obj in model.objects.filter(**{lookup + '__in': {row[lookup] for row in rows.values()}}):
+            key = tuple(getattr(obj, f) for f in key_fields)
+            if key in rows:
+                if key in resolved:
+                    print(model.__name__, key)
+                    raise MultipleObjectsReturned(f"More than one {model.__name__} for {key}")
+                resolved[key] = obj
+
+        changed = list()
+        for key, obj in resolved.items():
+            row = rows[key]
+            if any(getattr(obj, f) != row[f] for f in update_fields):
+                for f in update_fields:
+                    setattr(obj, f, row[f])
+                changed.append(obj)
+        if changed:
+            model.objects.bulk_update(changed, update_fields, batch_size=BATCH_SIZE)
+        WriteTracker.written += len(changed)
+        WriteTracker.avoided += len(resolved) - len(changed)
+
+        created = [model(**row) for key, row in rows.items() if key not in resolved]
+        model.objects.bulk_create(created, batch_size=BATCH_SIZE)
+        resolved.update((tuple(getattr(obj, f) for f in key_fields), obj) for obj in created)
+        return resolved
+
+    def persist(self, entry_nts: List[EntryParsed]) -> List[Entry]:
+        with transaction.atomic():
+            entries, updated = self.persist_entries(entry_nts)
+            xml_ids = [sense_nt.xml_id for nt in updated for sense_nt in EntryParser.extract_senses(nt)]
+            self.sense_digests = dict(Sense.objects.filter(xml_id__in=xml_ids).values_list('xml_id', 'digest'))
+            senses = [changed for nt in updated for changed in self.collect_entry(nt)]
+            examples = {sense: SenseParser.extract_examples(sense_nt.xml_dict) for sense_nt, sense in senses}
+            lyric_texts = {example_nt.lyric_text for example_nts in examples.values() for example_nt in example_nts}
+            self.example_digests = {row[:-1]: row[-1] for row in Example.objects.filter(lyric_text__in=lyric_texts)
+                                    .values_list(*KEYS[Example], 'digest')}
+            for sense_nt, sense in senses:
+                self.collect_sense(sense_nt, sense, examples[sense])
+            self.flush()
+        return entries
+
+    def persist_entries(self, entry_nts: List[EntryParsed]) -> Tuple[List[Entry], List[EntryParsed]]:
+        """Resolves the entries themselves, returning them & the parsed entries whose relations need updating"""
+        nts = {nt.slug: nt for nt in entry_nts}
+        existing = {entry.slug: entry for entry in Entry.objects.filter(slug__in=nts).defer('json')}
+        entries, updated, created, changed = list(), list(), list(), list()
+        for slug, nt in nts.items():
+            entry = existing.get(slug)
+            update = self.force_update
+            digest = content_digest(nt.xml_dict)
+            if entry is None:
+                entry = Entry(headword=nt.headword, slug=nt.slug, publish=nt.publish, json=nt.xml_dict,
+                              digest=digest, letter=nt.letter, sort_key=nt.sort_key)
+                created.append(entry)
+                update = True
+                if entry.publish:
+                    self.republished.append(slug)
+            elif update or digest != entry.digest:
+                if entry.publish != nt.publish:
+                    self.republished.append(slug)
+                entry.publish = nt.publish
+                entry.json = nt.xml_dict
+                entry.digest = digest
+                entry.letter = nt.letter
+                entry.sort_key = nt.sort_key
+                changed.append(entry)
+                update = True
+            entries.append(entry)
+            if update:
+                self.objects[Entry][(slug,)] = entry
+                updated.append(nt)
+        Entry.objects.bulk_create(created, batch_size=BATCH_SIZE)
+        Entry.objects.bulk_update(changed, ['publish', 'json', 'digest', 'letter', 'sort_key'], batch_size=BATCH_SIZE)
+        return entries, updated
+
+    def collect_entry(self, nt: EntryParsed) -> List[Tuple[SenseParsed, Tuple]]:
+        """Collects the entry's forms & senses, returning the senses whose relations need collecting"""
+        entry = (nt.slug,)
+        self.purge(entry, Entry.forms, Entry.senses)
+        changed = list()
+        for form_nt in EntryParser.extract_forms(nt):
+            form = self.add(Form, slug=form_nt.slug, frequency=form_nt.frequency)
+            self.purge(form, Form.parent_entry)
+            self.link(Entry.forms, entry, form)
+        for sense_nt in EntryParser.extract_senses(nt):
+            digest = SenseParser.digest(sense_nt)
+            sense = self.add(Sense, xml_id=sense_nt.xml_id, json=sense_nt.xml_dict, headword=sense_nt.headword,
+                             part_of_speech=sense_nt.part_of_speech, definition=sense_nt.definition,
+                             etymology=sense_nt.etymology, notes=sense_nt.notes, slug=sense_nt.slug,
+                             publish=sense_nt.publish, digest=digest)
+            self.link(Entry.senses, entry, sense)
+            # an unchanged sense keeps its stored relations, as in SenseParser.persist
+            if self.force_update or self.sense_digests.get(sense_nt.xml_id) != digest:
+                self.purge(sense, *SENSE_RELATIONS)
+                changed.append((sense_nt, sense))
+        return changed
+
+    def collect_sense(self, nt: SenseParsed, sense: Tuple, example_nts: List[ExampleParsed]) -> None:
+        self.dirty_senses.add(sense)
+        for d in SenseParser.extract_domains(nt.xml_dict):
+            self.link(Sense.domains, sense, self.add(Domain, slug=d.slug, name=d.name))
+        for r in SenseParser.extract_regions(nt.xml_dict):
+            self.link(Sense.regions, sense, self.add(Region, slug=r.slug, name=r.name))
+        for s in SenseParser.extract_semantic_classes(nt.xml_dict):
+            self.link(Sense.semantic_classes, sense, self.add(SemanticClass, slug=s.slug, name=s.name))
+        for s in SenseParser.extract_synsets(nt.xml_dict):
+            self.link(Sense.synset, sense, self.add(SynSet, slug=s.slug, name=s.name))
+        for x in SenseParser.extract_xrefs(nt.xml_dict):
+            self.link(Sense.xrefs, sense, self.add(Xref, **x._asdict()))
+        for c in SenseParser.extract_collocates(nt.xml_dict, nt.xml_id):
+            self.link(Sense.collocates, sense, self.add(Collocate, **c._asdict()))
+        for a in SenseParser.extract_artists(nt.xml_dict):
+            artist = self.add(Artist, slug=a.slug, name=a.name)
+            self.link(Sense.cites_artists, sense, artist)
+            self.dirty_artists.add(artist)
+        for example_nt in example_nts:
+            example, primary_artists, featured_artists, entities = self.collect_example(example_nt)
+            self.link(Sense.examples, sense, example)
+            for artist in primary_artists:
+                self.link(Artist.primary_senses, artist, sense)
+            for artist in featured_artists:
+                self.link(Artist.featured_senses, artist, sense)
+            for entity in entities:
+                self.link(Sense.features_entities, sense, entity)
+
+    def collect_example(self, nt: ExampleParsed) -> Tuple[Tuple, List[Tuple], List[Tuple], List[Tuple]]:
+        artist_name = nt.primary_artists
+        example = self.add(Example, song_title=nt.song_title, artist_name=artist_name, artist_slug=slugify(artist_name),
+                           release_date=nt.release_date, release_date_string=nt.release_date_string,
+                           album=nt.album, lyric_text=nt.lyric_text, digest=content_digest(nt._asdict()))
+        primary_artists = [self.add(Artist, slug=a.slug, name=a.name) for a in ExampleParser.extract_primary_artists(nt)]
+        featured_artists = [self.add(Artist, slug=a.slug, name=a.name) for a in ExampleParser.extract_featured_artists(nt)]
+        entities = [self.add(NamedEntity, **e._asdict()) for e in ExampleParser.extract_entities(nt)]
+        # an unchanged example keeps its stored relations, as in ExampleParser.persist; since its digest covers
+        # the parsed values, the artists & entities its senses are linked through are those stored
+        if not self.force_update and self.example_digests.get(example) == self.rows[Example][example]['digest']:
+            return example, primary_artists, featured_artists, entities
+        self.changed_examples.add(example)
+        self.purge(example, *EXAMPLE_RELATIONS)
+
+        self.dirty_artists.update(primary_artists + featured_artists)
+        for artist in primary_artists:
+            self.link(Example.artist, example, artist)
+        for artist in featured_artists:
+            self.link(Example.feat_artist, example, artist)
+
+        for s in ExampleParser.extract_songs(nt):
+            song = self.add(Song, **s._asdict())
+            self.purge(song, Song.artist, Song.feat_artist)
+            self.link(Example.from_song, example, song)
+            for artist in primary_artists:
+                self.link(Song.artist, song, artist)
+            for artist in featured_artists:
+                self.link(Song.feat_artist, song, artist)
+
+        for r in ExampleParser.extract_example_rhymes(nt):
+            self.link(Example.example_rhymes, example, self.add(ExampleRhyme, **r._asdict()))
+
+        for entity in entities:
+            self.link(Example.features_entities, example, entity)
+
+        for a in ExampleParser.extract_entity_artists(nt):
+            self.add(Artist, slug=a.slug, name=a.name)
+        for ll in ExampleParser.extract_lyric_links(nt):
+            self.link(Example.lyric_links, example, self.add(LyricLink, **ll._asdict()))
+            if ll.link_type == LyricLinkParser.XREF:
+                hw, xml_id = ll.target_slug.split("#")
+                sense = (xml_id,)
+                self.stub_senses.setdefault(sense, BulkPersister.clean(Sense, xml_id=xml_id, headword=ll.target_lemma))
+                self.dirty_senses.add(sense)
+                self.link(Example.illustrates_senses, example, sense)
+                for artist in primary_artists:
+                    self.link(Artist.primary_senses, artist, sense)
+                for artist in featured_artists:
+                    self.link(Artist.featured_senses, artist, sense)
+
+        return example, primary_artists, featured_artists, entities
+
+    @staticmethod
+    def xref_scope(example_ids: List[int]) -> Q:
+        """
+        Limits the purge of examples' illustrates_senses to the senses their stored xref lyric links point at: the
+        through table is shared with Sense.examples, whose links belong to the senses holding the examples
+        """
+        targets: Dict[str, Set[int]] = defaultdict(set)
+        for example_id, target_slug in (Example.lyric_links.through.objects
+                                        .filter(example_id__in=example_ids, lyriclink__link_type=LyricLinkParser.XREF)
+                                        .values_list('example_id', 'lyriclink__target_slug')):
+            hw, xml_id = target_slug.split("#")
+            targets[xml_id].add(example_id)
+        scope = Q(id__in=[])
+        for sense_id, xml_id in Sense.objects.filter(xml_id__in=list(targets)).values_list('id', 'xml_id'):
+            scope |= Q(sense_id=sense_id, example_id__in=targets[xml_id])
+        return scope
+
+    def sync_links(self) -> None:
+        """
+        Diffs each through table's collected links against the stored ones of the purged sources, deleting only
+        the links that went away & inserting only the new ones; a link is keyed by its sorted (column, id) pairs
+        since the relations on both sides of a through table (e.g. Sense.examples & Example.illustrates_senses) share it
+        """
+        desired: Dict[Any, Set[Tuple]] = defaultdict(set)
+        for relation, pairs in self.links.items():
+            source_model, target_model = relation.field.model, relation.field.related_model
+            source_name, target_name = relation.field.m2m_field_name(), relation.field.m2m_reverse_field_name()
+            for source, target in pairs:
+                desired[relation.through].add(tuple(sorted(((source_name + '_id', self.objects[source_model][source].pk),
+                                                            (target_name + '_id', self.objects[target_model][target].pk)))))
+        scopes: Dict[Any, Q] = dict()
+        for relation, sources in self.purges.items():
+            ids = [self.objects[relation.field.model][key].pk for key in sources]
+            if relation is Example.illustrates_senses:
+                scope = BulkPersister.xref_scope(ids)
+            else:
+                scope = Q(**{relation.field.m2m_field_name() + '__in': ids})
+            scopes[relation.through] = scopes[relation.through] | scope if relation.through in scopes else scope
+
+        for through in set(desired) | set(scopes):
+            stored, stale = set(), list()
+            if through in scopes:
+                for row in through.objects.filter(scopes[through]).values():
+                    pk = row.pop('id')
+                    link = tuple(sorted(row.items()))
+                    if link in desired[through]:
+                        stored.add(link)
+                    else:
+                        stale.append(pk)
+            if stale:
+                through.objects.filter(id__in=stale).delete()
+            through.objects.bulk_create([through(**dict(link)) for link in desired[through] - stored],
+                                        batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+    def flush(self) -> None:
+        for model, rows in self.rows.items():
+            self.objects[model].update(BulkPersister.upsert(model, rows, UPDATE_FIELDS[model]))
+        # lyric links may point at senses not ingested yet, which get a stub as in ExampleParser.process_lyric_links
+        stubs = {key: row for key, row in self.stub_senses.items() if key not in self.objects[Sense]}
+        self.objects[Sense].update(BulkPersister.upsert(Sense, stubs, list()))
+
+        examples = [self.objects[Example][key] for key in self.changed_examples]
+        example_ids = [example.id for example in examples]
+        DirtyTracker.mark_senses(Sense.examples.through.objects.filter(example_id__in=example_ids)
+                                 .values_list('sense_id', flat=True).distinct())
+
+        self.sync_links()
+
+        DirtyTracker.mark_senses(self.objects[Sense][key].id for key in self.dirty_senses)
+        DirtyTracker.mark_artists(key[0] for key in self.dirty_artists)
+        render_linked_lyrics(examples)
+        rerender_linked_lyrics(self.republished)
@@ -2,6 +2,7 @@ from typing import Dict
 
 from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
 
+from dictionary.ingestion.write_tracker import WriteTracker
 from dictionary.models import Collocate, CollocateParsed
 from dictionary.utils import slugify
 
@@ -24,9 +25,7 @@ class CollocateParser:
             collocate = Collocate.objects.get(collocate_lemma=nt.collocate_lemma,
                                               source_sense_xml_id=nt.source_sense_xml_id,
                                               target_id=nt.target_id)
-            collocate.target_slug = nt.target_slug,
-            collocate.frequency = nt.frequency
-            collocate.save()
+            WriteTracker.save_changed(collocate, dict(target_slug=nt.target_slug, frequency=nt.frequency))
         except MultipleObjectsReturned as e:
             print(nt.collocate_lemma, nt.source_sense_xml_id, nt.target_id, e)
             raise
@@ -1,6 +1,13 @@
-from typing import Dict, List, Tuple
+from itertools import islice
+from typing import Dict, Iterable, Iterator, IO, List, Tuple, Union
 
+from django.conf import settings
+from django.db import transaction
+
+from dictionary.ingestion.bulk_persister import BulkPersister
 from dictionary.ingestion.entry_parser import EntryParser
+from dictionary.ingestion.identity_map import IdentityMap
+from dictionary.ingestion.json_converter import JSONConverter
 from dictionary.models import Entry, EntryParsed, EntryRelations
 
 
@@ -17,8 +24,70 @@ class DictionaryParser:
         except Exception as e:
             raise KeyError(f"Could not access ['dictionary']['entry'] in {xml_dict}: {e}")
 
+    @staticmethod
+    def iter_parse(source: Union[str, IO]) -> Iterator[EntryParsed]:
+        """
+        Parses a file one entry at a time, rather than converting the whole of it to a dict first;
+        an entry that fails to parse is reported & skipped, so that it doesn't abort the rest of the file
+        """
+        for d in JSONConverter.iter_entries(source):
+            try:
+                yield EntryParser.parse(d)
+            except KeyError as e:
+                print(f"Could not parse entry '{(d.get('head') or dict()).get('headword')}', skipped: {e}")
+
     @staticmethod
     def process_entries(entry_nts: List[EntryParsed], force_update: bool = False) -> List[Tuple[Entry, EntryRelations]]:
         def process_entry(entry: Entry, relations: EntryRelations) -> Tuple[Entry, EntryRelations]:
             return entry, relations
         return [process_entry(*EntryParser.persist(nt, force_update)) for nt in entry_nts]
+
+    @staticmethod
+    def bulk_process_entries(entry_nts: List[EntryParsed], force_update: bool = False) -> List[Entry]:
+        return BulkPersister(force_update).persist(entry_nts)
+
+    @staticmethod
+    def persist_isolated(nt: EntryParsed, force_update: bool = False) -> bool:
+        """
+        Persists an entry inside a savepoint, so that an entry that fails rolls back alone; as the run's identity map
+        may hold rows created under the rolled back savepoint, it is emptied then; returns whether the entry persisted
+        """
+        try:
+            with transaction.atomic():
+                _ = EntryParser.persist(nt, force_update)
+        except Exception as e:
+            IdentityMap.invalidate()
+            print(f"Could not persist entry '{nt.headword}', rolled back: {e}")
+            return False
+        return True
+
+    @staticmethod
+    def persist_batch(entry_nts: List[EntryParsed], force_update: bool = False) -> int:
+        """Persists a batch of entries in a single transaction, an entry per savepoint; returns the count persisted"""
+        with transaction.atomic():
+            return sum(DictionaryParser.persist_isolated(nt, force_update) for nt in entry_nts)
+
+    @staticmethod
+    def persist_stream(entry_nts: Iterable[EntryParsed], force_update: bool = False, bulk: bool = False,
+                       batch_size: int = None) -> int:
+        """
+        Persists entries as they arrive without keeping hold of more than one batch, so that with iter_parse memory
+        stays flat however large the file; each batch is written in one transaction (a batch_size of 0 makes the
+        whole stream one batch), and an entry that fails is rolled back alone, a bulk batch that fails being
+        retried an entry at a time; entries the preloaded digests show unchanged are skipped without a query;
+        returns the count of entries persisted
+        """
+        batch_size = settings.INGEST_BATCH_SIZE if batch_size is None else batch_size
+        count = 0
+        entry_nts = (nt for nt in entry_nts if force_update or not EntryParser.is_unchanged(nt))
+        for batch in iter(lambda: list(islice(entry_nts, batch_size or None)), []):
+            if not bulk:
+                count += DictionaryParser.persist_batch(batch, force_update)
+                continue
+            try:
+                count += len(DictionaryParser.bulk_process_entries(batch, force_update))
+            except Exception as e:
+                IdentityMap.invalidate()
+                print(f"Bulk batch failed, persisting its entries one at a time: {e}")
+                count += DictionaryParser.persist_batch(batch, force_update)
+        return count
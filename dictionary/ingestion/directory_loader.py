@@ -1,15 +1,40 @@
 import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from genericpath import isfile
+from itertools import islice
 from os import listdir
 from os.path import join
-from typing import AnyStr, List, Dict
+from typing import AnyStr, List, Iterable, Iterator, Tuple
 
+from django.conf import settings
+from django.db import connection
+
+from dictionary.data_version import bump_data_version
 from dictionary.ingestion.artist_origin_parser import ArtistOriginParser
 from dictionary.ingestion.artist_alias_parser import ArtistAliasParser
 from dictionary.ingestion.artist_membership_parser import ArtistMembershipParser
+from dictionary.ingestion.artist_metadata_persister import ArtistMetadataPersister
 from dictionary.ingestion.dictionary_parser import DictionaryParser
-from dictionary.ingestion.json_converter import JSONConverter
+from dictionary.ingestion.dirty_tracker import DirtyTracker
+from dictionary.ingestion.entry_parser import EntryParser
+from dictionary.ingestion.identity_map import IdentityMap
+from dictionary.ingestion.ingest_profiler import IngestProfiler
+from dictionary.ingestion.write_tracker import WriteTracker
 from dictionary.ingestion.xml_file_reader import FileReader
+from dictionary.models import EntryParsed
+
+
+# files each worker may have parsed ahead of the writer, bounding how many parsed files are held in memory
+PARSE_AHEAD = 2
+
+
+def init_parse_worker() -> None:
+    """Sets Django up in pool workers that were spawned rather than forked, so the parsers can import the models"""
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
 
 
 class DirectoryLoader:
@@ -27,18 +52,65 @@ class DirectoryLoader:
         return [join(directory, f) for f in listdir(directory) if isfile(join(directory, f)) and f.endswith("csv")]
 
     @staticmethod
-    def process_xml(xml_list: List[str], force_update: bool = False) -> None:
-        from dictionary.management.commands.utils import print_progress
-        iterations = len(xml_list)
-        print_progress(0, iterations, prefix='Progress:', suffix='Complete ')
+    def parse_xml(xml: str) -> List[EntryParsed]:
+        """Reads & parses one file into picklable entry namedtuples; CPU-bound, and touches no database"""
+        return list(DictionaryParser.iter_parse(xml))
 
-        for i, xml in enumerate(xml_list):
-            if "malformed" not in xml:
-                xml_string: str = FileReader.read_file(xml)
-                xml_dict: Dict = JSONConverter.parse_to_dict(xml_string)
-                print_progress(i + 1, iterations, prefix='Progress:', suffix=f"Complete ", filename=xml)
-                entry_tuples = DictionaryParser.parse(xml_dict)
-                _ = DictionaryParser.process_entries(entry_tuples, force_update)
+    @staticmethod
+    def parse_xml_files(xml_list: List[str], workers: int = 1) -> Iterator[Tuple[str, Iterable[EntryParsed]]]:
+        """
+        Yields each file's parsed entries in list order: streamed an entry at a time when parsing in-process,
+        or, with more than one worker, as whole files parsed in a process pool kept at most PARSE_AHEAD files
+        per worker ahead of the consumer
+        """
+        if workers <= 1:
+            for xml in xml_list:
+                yield xml, DictionaryParser.iter_parse(xml)
+            return
+
+        files = iter(xml_list)
+        # forked workers must not inherit (& later close) the writer's open database connection; one held by an
+        # enclosing transaction is left open, as closing it would roll that back
+        if not connection.in_atomic_block:
+            connection.close()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_parse_worker) as pool:
+            pending = deque((xml, pool.submit(DirectoryLoader.parse_xml, xml)) for xml in islice(files, workers * PARSE_AHEAD))
+            while pending:
+                xml, future = pending.popleft()
+                entry_tuples = future.result()
+                for queued in islice(files, 1):
+                    pending.append((queued, pool.submit(DirectoryLoader.parse_xml, queued)))
+                yield xml, entry_tuples
+
+    @staticmethod
+    def process_xml(xml_list: List[str], force_update: bool = False, bulk: bool = False, workers: int = None,
+                    batch_size: int = None, profile: bool = False) -> None:
+        from dictionary.management.commands.utils import RateLimitedProgress
+        workers = workers if workers is not None else settings.INGEST_WORKERS
+        xml_list = [xml for xml in xml_list if "malformed" not in xml]
+        progress = RateLimitedProgress(len(xml_list))
+        progress.update(0)
+
+        EntryParser.preload_digests()
+        IdentityMap.start()
+        WriteTracker.reset()
+        if profile:
+            IngestProfiler.start()
+        try:
+            parsed = IngestProfiler.parsing(DirectoryLoader.parse_xml_files(xml_list, workers))
+            for i, (xml, entry_tuples) in enumerate(parsed):
+                with IngestProfiler.file(xml) as stats:
+                    stats['entries'] = DictionaryParser.persist_stream(IngestProfiler.parsing(entry_tuples),
+                                                                       force_update, bulk, batch_size)
+                progress.update(i + 1, filename=xml)
+        finally:
+            IngestProfiler.stop()
+            IdentityMap.stop()
+            EntryParser.release_digests()
+            # batches committed before a failure must still reach the salience refresh & the workers' indexes
+            DirtyTracker.flush()
+            bump_data_version()
+        print(WriteTracker.report())
 
     @staticmethod
     def process_json(json_list) -> None:
@@ -53,12 +125,13 @@ class DirectoryLoader:
                 print_progress(i + 1, iterations, prefix='Progress:', suffix=f"Complete", filename=doc)
 
     @staticmethod
-    def process_csv(csv_list: List[str]) -> None:
+    def process_csv(csv_list: List[str], replace: bool = False) -> None:
         from dictionary.management.commands.utils import print_progress
         import csv
         iterations = len(csv_list)
         print_progress(0, iterations, prefix='Progress:', suffix='Complete ')
 
+        persister = ArtistMetadataPersister(replace)
         for i, doc in enumerate(csv_list):
             print(doc)
             if doc.endswith("artist-origins.csv"):
@@ -66,17 +139,20 @@ class DirectoryLoader:
                     reader = csv.reader(csv_string, delimiter=';')
                     next(reader)  # skip header
                     for row in reader:
-                        ArtistOriginParser.parse(row)
+                        persister.collect_origin(ArtistOriginParser.extract(row))
             if doc.endswith("artist-aliases.csv"):
                 with open(doc) as csv_string:
                     reader = csv.reader(csv_string, delimiter=';')
                     next(reader)  # skip header
                     for row in reader:
-                        ArtistAliasParser.parse(row)
+                        persister.collect_aliases(ArtistAliasParser.extract(row))
             if doc.endswith("artist-membership.csv"):
                 with open(doc) as csv_string:
                     reader = csv.reader(csv_string, delimiter=';')
                     next(reader)  # skip header
                     for row in reader:
-                        ArtistMembershipParser.parse(row)
-
+                        persister.collect_membership(ArtistMembershipParser.extract(row))
+            print_progress(i + 1, iterations, prefix='Progress:', suffix="Complete", filename=doc)
+        persister.persist()
+        print(persister.report())
+        bump_data_version()
@@ -0,0 +1,62 @@
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Set, Tuple
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+
+class DirtyTracker:
+    """
+    Records the senses & artists whose example relations an ingest changed, so that
+    saliences can be refreshed for those alone; marks accumulate in memory & are merged
+    into the shared cache by flush(), until a salience refresh discards those it has handled
+    """
+
+    CACHE_KEY = 'salience_dirty'
+    # postgres advisory lock serialising read-merge-writes of the shared marks across processes
+    LOCK_ID = 0x5a11e7ce
+
+    senses: Set[int] = set()
+    artists: Set[str] = set()
+
+    @staticmethod
+    def mark_senses(sense_ids: Iterable[int]) -> None:
+        DirtyTracker.senses.update(sense_ids)
+
+    @staticmethod
+    def mark_artists(artist_slugs: Iterable[str]) -> None:
+        DirtyTracker.artists.update(artist_slugs)
+
+    @staticmethod
+    @contextmanager
+    def locked() -> Iterator[None]:
+        """Holds the lock until the end of a transaction, in which the database cache's reads & writes also run"""
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [DirtyTracker.LOCK_ID])
+            yield
+
+    @staticmethod
+    def flush() -> None:
+        if DirtyTracker.senses or DirtyTracker.artists:
+            with DirtyTracker.locked():
+                senses, artists = DirtyTracker.pending()
+                cache.set(DirtyTracker.CACHE_KEY, (senses | DirtyTracker.senses, artists | DirtyTracker.artists), None)
+        DirtyTracker.senses = set()
+        DirtyTracker.artists = set()
+
+    @staticmethod
+    def pending() -> Tuple[Set[int], Set[str]]:
+        return cache.get(DirtyTracker.CACHE_KEY, (set(), set()))
+
+    @staticmethod
+    def discard(sense_ids: Set[int], artist_slugs: Set[str]) -> None:
+        """Removes the marks a refresh read & handled, keeping any flushed since it read them"""
+        if not sense_ids and not artist_slugs:
+            return
+        with DirtyTracker.locked():
+            senses, artists = DirtyTracker.pending()
+            senses, artists = senses - sense_ids, artists - artist_slugs
+            if senses or artists:
+                cache.set(DirtyTracker.CACHE_KEY, (senses, artists), None)
+            else:
+                cache.delete(DirtyTracker.CACHE_KEY)
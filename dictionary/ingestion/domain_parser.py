@@ -1,5 +1,4 @@
-from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
-
+from dictionary.ingestion.identity_map import IdentityMap
 from dictionary.models import DomainParsed, Domain
 from dictionary.utils import make_label_from_camel_case, slugify
 
@@ -13,13 +12,4 @@ class DomainParser:
 
     @staticmethod
     def persist(nt: DomainParsed):
-        try:
-            domain = Domain.objects.get(slug=nt.slug)
-            domain.name = nt.name
-            domain.save()
-        except MultipleObjectsReturned as e:
-            print(nt.slug, e)
-            raise
-        except ObjectDoesNotExist:
-            domain = Domain.objects.create(slug=nt.slug, name=nt.name)
-        return domain
+        return IdentityMap.persist(Domain, dict(slug=nt.slug), dict(name=nt.name))
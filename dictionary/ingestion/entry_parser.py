@@ -1,15 +1,32 @@
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
 from dictionary.ingestion.sense_parser import SenseParser
 from dictionary.ingestion.form_parser import FormParser
+from dictionary.ingestion.relation_sync import RelationSync
 from dictionary.models import EntryParsed, Entry, EntryRelations, FormParsed, Form, SenseParsed, Sense, SenseRelations, \
     FormRelations
-from dictionary.utils import slugify, move_definite_article_to_end, get_letter
+from dictionary.utils import slugify, move_definite_article_to_end, get_letter, content_digest
 
 
 class EntryParser:
 
+    # slug -> content digest of every stored entry, loaded once per run by preload_digests()
+    digests: Optional[Dict[str, str]] = None
+
+    @staticmethod
+    def preload_digests() -> None:
+        EntryParser.digests = dict(Entry.objects.values_list('slug', 'digest'))
+
+    @staticmethod
+    def release_digests() -> None:
+        EntryParser.digests = None
+
+    @staticmethod
+    def is_unchanged(nt: EntryParsed) -> bool:
+        """True if the preloaded digests show the stored entry was ingested from this very dict"""
+        return EntryParser.digests is not None and EntryParser.digests.get(nt.slug) == content_digest(nt.xml_dict)
+
     @staticmethod
     def parse(d: Dict) -> EntryParsed:
         try:
@@ -25,18 +42,19 @@ class EntryParser:
         except Exception as e:
             raise KeyError(f"Entry parse failed: {e}")
         else:
-            print(f" ['{headword}']")
             return nt
 
     @staticmethod
     def persist(nt: EntryParsed, force_update: bool = False) -> Tuple[Entry, EntryRelations]:
         update = force_update
+        digest = content_digest(nt.xml_dict)
         try:
-            entry = Entry.objects.get(slug=nt.slug)
-            update = force_update or (nt.xml_dict != entry.json)
+            entry = Entry.objects.defer('json').get(slug=nt.slug)
+            update = force_update or (digest != entry.digest)
             if update:
                 entry.publish = nt.publish
                 entry.json = nt.xml_dict
+                entry.digest = digest
                 entry.letter = nt.letter
                 entry.sort_key = nt.sort_key
                 entry.save()
@@ -45,23 +63,18 @@ class EntryParser:
             raise
         except ObjectDoesNotExist:
             entry = Entry.objects.create(headword=nt.headword, slug=nt.slug, publish=nt.publish, json=nt.xml_dict,
-                                         letter=nt.letter, sort_key=nt.sort_key)
+                                         digest=digest, letter=nt.letter, sort_key=nt.sort_key)
             update = True
-        return EntryParser.update_relations(entry, nt, update)
-
-    @staticmethod
-    def purge_relations(entry: Entry) -> Entry:
-        entry.forms.clear()
-        entry.senses.clear()
-        return entry
+        return EntryParser.update_relations(entry, nt, update, force_update)
 
     @staticmethod
-    def update_relations(entry: Entry, nt: EntryParsed, update: bool = False) -> Tuple[Entry, EntryRelations]:
+    def update_relations(entry: Entry, nt: EntryParsed, update: bool = False,
+                         force_update: bool = False) -> Tuple[Entry, EntryRelations]:
+        """Relinks an updated entry's forms & senses; only those senses whose digest changed are re-persisted in full"""
         if update:
-            purged = EntryParser.purge_relations(entry)
-            return purged, EntryRelations(
-                forms=EntryParser.process_forms(nt, purged),
-                senses=EntryParser.process_senses(nt, purged)
+            return entry, EntryRelations(
+                forms=EntryParser.process_forms(nt, entry),
+                senses=EntryParser.process_senses(nt, entry, force_update)
             )
         return entry, EntryRelations(forms=list(), senses=list())
 
@@ -76,11 +89,9 @@ class EntryParser:
 
     @staticmethod
     def process_forms(nt: EntryParsed, entry: Entry) -> List[Tuple[Form, FormRelations]]:
-        def process_form(form: Form, relations: FormRelations) -> Tuple[Form, FormRelations]:
-            _, _ = FormParser.update_relations(form)
-            entry.forms.add(form)
-            return form, relations
-        return [process_form(*FormParser.persist(a)) for a in EntryParser.extract_forms(nt)]
+        forms = [FormParser.persist(a, entry) for a in EntryParser.extract_forms(nt)]
+        RelationSync.sync(entry, 'forms', [form for form, _ in forms])
+        return forms
 
     @staticmethod
     def extract_senses(nt: EntryParsed) -> List[SenseParsed]:
@@ -93,8 +104,7 @@ class EntryParser:
                     lexeme['sense']]
 
     @staticmethod
-    def process_senses(nt: EntryParsed, entry: Entry) -> List[Tuple[Sense, SenseRelations]]:
-        def process_sense(sense: Sense, relations: SenseRelations) -> Tuple[Sense, SenseRelations]:
-            entry.senses.add(sense)
-            return sense, relations
-        return [process_sense(*SenseParser.persist(a)) for a in EntryParser.extract_senses(nt)]
+    def process_senses(nt: EntryParsed, entry: Entry, force_update: bool = False) -> List[Tuple[Sense, SenseRelations]]:
+        senses = [SenseParser.persist(a, force_update) for a in EntryParser.extract_senses(nt)]
+        RelationSync.sync(entry, 'senses', [sense for sense, _ in senses])
+        return senses
@@ -3,14 +3,18 @@ from typing import Dict, List, Iterator, Tuple
 from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
 
 from dictionary.ingestion.artist_parser import ArtistParser
+from dictionary.ingestion.dirty_tracker import DirtyTracker
 from dictionary.ingestion.example_rhyme_parser import ExampleRhymeParser
+from dictionary.ingestion.identity_map import IdentityMap
 from dictionary.ingestion.lyric_link_parser import LyricLinkParser
 from dictionary.ingestion.named_entity_parser import NamedEntityParser
+from dictionary.ingestion.relation_sync import RelationSync
 from dictionary.ingestion.song_parser import SongParser
+from dictionary.ingestion.write_tracker import WriteTracker
 from dictionary.management.commands.xml_handler import clean_up_date
-from dictionary.models import ExampleParsed, Example, Song, ExampleRelations, SongParsed, Artist, ArtistParsed, \
-    SongRelations, LyricLink, LyricLinkParsed, Sense, NamedEntity, ExampleRhyme, ExampleRhymeParsed, ArtistRelations
-from dictionary.utils import slugify, join_artists
+from dictionary.models import ExampleParsed, Example, ExampleRelations, SongParsed, Artist, ArtistParsed, \
+    LyricLink, LyricLinkParsed, Sense, NamedEntity, ExampleRhyme, ExampleRhymeParsed
+from dictionary.utils import slugify, join_artists, render_linked_lyrics, content_digest
 
 
 class ExampleParser:
@@ -40,9 +44,14 @@ class ExampleParser:
             return nt
 
     @staticmethod
-    def persist(nt: ExampleParsed) -> Tuple[Example, ExampleRelations]:
+    def persist(nt: ExampleParsed, parent_sense: Sense = None, force_update: bool = False) -> Tuple[Example, ExampleRelations]:
         artist_name = nt.primary_artists
         artist_slug = slugify(artist_name)
+        key = (nt.song_title, artist_name, nt.release_date_string, nt.album, nt.lyric_text)
+        persisted = IdentityMap.persisted_example(key)
+        if persisted:
+            return persisted
+        digest = content_digest(nt._asdict())
         try:
             example = Example.objects.get(song_title=nt.song_title,
                                           artist_name=artist_name,
@@ -62,32 +71,56 @@ class ExampleParser:
                                              release_date_string=nt.release_date_string,
                                              album=nt.album,
                                              lyric_text=nt.lyric_text)
-        return ExampleParser.update_relations(example, nt)
+        if not force_update and example.digest == digest:
+            WriteTracker.avoided += 1
+            relations = ExampleParser.stored_relations(example)
+        else:
+            example, relations = ExampleParser.update_relations(example, nt, parent_sense)
+            WriteTracker.save_changed(example, dict(digest=digest))
+        # the senses an example illustrates need only its artists & entities, so the rest isn't held for the run
+        IdentityMap.remember_example(key, (example, relations._replace(from_song=[], example_rhymes=[], lyric_links=[])))
+        return example, relations
+
+    @staticmethod
+    def stored_relations(example: Example) -> ExampleRelations:
+        """The relations of an unchanged example that the senses illustrated by it are linked through"""
+        return ExampleRelations(
+            artist=list(example.artist.all()),
+            from_song=[],
+            feat_artist=list(example.feat_artist.all()),
+            example_rhymes=[],
+            features_entities=list(example.features_entities.all()),
+            lyric_links=[]
+        )
 
     @staticmethod
-    def update_relations(example: Example, nt: ExampleParsed) -> Tuple[Example, ExampleRelations]:
-        purged = ExampleParser.purge_relations(example)
-        primary_artists = ExampleParser.process_primary_artists(nt, purged)
-        featured_artists = ExampleParser.process_featured_artists(nt, purged)
+    def update_relations(example: Example, nt: ExampleParsed, parent_sense: Sense = None) -> Tuple[Example, ExampleRelations]:
+        primary_artists = ExampleParser.process_primary_artists(nt, example)
+        featured_artists = ExampleParser.process_featured_artists(nt, example)
         relations = ExampleRelations(
             artist=primary_artists,
-            from_song=ExampleParser.process_songs(nt, purged, primary_artists, featured_artists),
+            from_song=ExampleParser.process_songs(nt, example, primary_artists, featured_artists),
             feat_artist=featured_artists,
-            example_rhymes=ExampleParser.process_example_rhymes(nt, purged),
-            features_entities=ExampleParser.process_entities(nt, purged),
-            lyric_links=ExampleParser.process_lyric_links(nt, purged)
+            example_rhymes=ExampleParser.process_example_rhymes(nt, example),
+            features_entities=ExampleParser.process_entities(nt, example),
+            lyric_links=ExampleParser.process_lyric_links(nt, example)
         )
-        return purged, relations
-
-    @staticmethod
-    def purge_relations(example: Example) -> Example:
-        example.artist.clear()
-        example.from_song.clear()
-        example.feat_artist.clear(),
-        example.example_rhymes.clear(),
-        example.illustrates_senses.clear(),
-        example.features_entities.clear(),
-        example.lyric_links.clear()
+        senses = ExampleParser.process_illustrated_senses(relations, parent_sense)
+        ExampleParser.sync_relations(example, relations, senses)
+        DirtyTracker.mark_artists([artist.slug for artist in primary_artists + featured_artists])
+        render_linked_lyrics([example])
+        return example, relations
+
+    @staticmethod
+    def sync_relations(example: Example, relations: ExampleRelations, senses: List[Sense]) -> Example:
+        RelationSync.sync(example, 'artist', relations.artist)
+        RelationSync.sync(example, 'from_song', [song for song, _ in relations.from_song])
+        RelationSync.sync(example, 'feat_artist', relations.feat_artist)
+        RelationSync.sync(example, 'example_rhymes', relations.example_rhymes)
+        RelationSync.sync(example, 'features_entities', relations.features_entities)
+        RelationSync.sync(example, 'lyric_links', relations.lyric_links)
+        _, removed = RelationSync.sync(example, 'illustrates_senses', senses)
+        DirtyTracker.mark_senses(RelationSync.related_ids(senses) | removed)
         return example
 
     @staticmethod
@@ -97,11 +130,7 @@ class ExampleParser:
     @staticmethod
     def process_songs(nt: ExampleParsed, example: Example, primary_artists: List[Artist],
                       featured_artists: List[Artist]):
-        def process_song(song: Song, relations: SongRelations) -> Tuple[Song, SongRelations]:
-            example.from_song.add(song)
-            return song, relations
-
-        return [process_song(*SongParser.persist(d, primary_artists, featured_artists)) for d in
+        return [SongParser.persist(d, primary_artists, featured_artists) for d in
                 ExampleParser.extract_songs(nt)]
 
     @staticmethod
@@ -114,18 +143,11 @@ class ExampleParser:
 
     @staticmethod
     def process_primary_artists(nt: ExampleParsed, example: Example) -> List[Artist]:
-        def process_primary_artist(artist: Artist, artist_relations: ArtistRelations) -> Artist:
-            example.artist.add(artist)
-            return artist
-
-        return [process_primary_artist(*ArtistParser.persist(a)) for a in ExampleParser.extract_primary_artists(nt)]
+        return [ArtistParser.persist(a)[0] for a in ExampleParser.extract_primary_artists(nt)]
 
     @staticmethod
     def process_featured_artists(nt: ExampleParsed, example: Example) -> List[Artist]:
-        def process_featured_artist(artist: Artist, artist_relations: ArtistRelations) -> Artist:
-            example.feat_artist.add(artist)
-            return artist
-        return [process_featured_artist(*ArtistParser.persist(a)) for a in ExampleParser.extract_featured_artists(nt)]
+        return [ArtistParser.persist(a)[0] for a in ExampleParser.extract_featured_artists(nt)]
 
     @staticmethod
     def extract_entities(nt: ExampleParsed) -> List[LyricLinkParsed]:
@@ -133,10 +155,7 @@ class ExampleParser:
 
     @staticmethod
     def process_entities(nt: ExampleParsed, example: Example) -> List[NamedEntity]:
-        def process_entity(entity) -> NamedEntity:
-            example.features_entities.add(entity)
-            return entity
-        return [process_entity(NamedEntityParser.persist(ll)) for ll in ExampleParser.extract_entities(nt)]
+        return [NamedEntityParser.persist(ll) for ll in ExampleParser.extract_entities(nt)]
 
     @staticmethod
     def extract_example_rhymes(nt: ExampleParsed) -> List[ExampleRhymeParsed]:
@@ -144,10 +163,7 @@ class ExampleParser:
 
     @staticmethod
     def process_example_rhymes(nt: ExampleParsed, example: Example) -> List[ExampleRhyme]:
-        def process_example_rhyme(example_rhyme) -> ExampleRhyme:
-            example.example_rhymes.add(example_rhyme)
-            return example_rhyme
-        return [process_example_rhyme(ExampleRhymeParser.persist(r)) for r in ExampleParser.extract_example_rhymes(nt)]
+        return [ExampleRhymeParser.persist(r) for r in ExampleParser.extract_example_rhymes(nt)]
 
     @staticmethod
     def extract_lyric_links(nt: ExampleParsed) -> List[LyricLinkParsed]:
@@ -160,27 +176,34 @@ class ExampleParser:
                 yield LyricLinkParser.parse(rhyme, LyricLinkParser.RHYME, nt.lyric_text)
             for entity in nt.entities:
                 if '@type' in entity and entity['@type'] == 'artist':
-                    n = entity['@prefLabel'] if 'prefLabel' in entity else entity['#text']
-                    _, _ = ArtistParser.persist(ArtistParser.parse({"name": n}))
                     yield LyricLinkParser.parse(entity, LyricLinkParser.ARTIST, nt.lyric_text)
                 else:
                     yield LyricLinkParser.parse(entity, LyricLinkParser.ENTITY, nt.lyric_text)
         return list(_extract_lyric_links())
 
+    @staticmethod
+    def extract_entity_artists(nt: ExampleParsed) -> List[ArtistParsed]:
+        def entity_artist_name(entity: Dict) -> str:
+            return entity['@prefLabel'] if 'prefLabel' in entity else entity['#text']
+        return [ArtistParser.parse({"name": entity_artist_name(entity)}) for entity in nt.entities
+                if '@type' in entity and entity['@type'] == 'artist']
+
     @staticmethod
     def process_lyric_links(nt: ExampleParsed, example: Example) -> List[LyricLink]:
-        def process_lyric_link(lyric_link: LyricLink) -> LyricLink:
-            example.lyric_links.add(lyric_link)
-            if lyric_link.link_type == LyricLinkParser.XREF:
-                hw, xml_id = lyric_link.target_slug.split("#")
-                try:
-                    sense = Sense.objects.get(xml_id=xml_id)
-                except ObjectDoesNotExist:
-                    sense = Sense.objects.create(xml_id=xml_id, headword=lyric_link.target_lemma)
-                example.illustrates_senses.add(sense)
-                for artist in example.artist.all():
-                    artist.primary_senses.add(sense)
-                for artist in example.feat_artist.all():
-                    artist.featured_senses.add(sense)
-            return lyric_link
-        return [process_lyric_link(LyricLinkParser.persist(lyric_link_parsed)) for lyric_link_parsed in ExampleParser.extract_lyric_links(nt)]
+        for artist in ExampleParser.extract_entity_artists(nt):
+            _, _ = ArtistParser.persist(artist)
+        return [LyricLinkParser.persist(lyric_link_parsed) for lyric_link_parsed in ExampleParser.extract_lyric_links(nt)]
+
+    @staticmethod
+    def process_illustrated_senses(relations: ExampleRelations, parent_sense: Sense = None) -> List[Sense]:
+        """The senses the example's xref lyric links point at, plus the sense it is being persisted under, if any"""
+        def process_xref_sense(lyric_link: LyricLink) -> Sense:
+            hw, xml_id = lyric_link.target_slug.split("#")
+            sense = IdentityMap.persist(Sense, dict(xml_id=xml_id), defaults=dict(headword=lyric_link.target_lemma))
+            for artist in relations.artist:
+                artist.primary_senses.add(sense)
+            for artist in relations.feat_artist:
+                artist.featured_senses.add(sense)
+            return sense
+        senses = [process_xref_sense(ll) for ll in relations.lyric_links if ll.link_type == LyricLinkParser.XREF]
+        return senses + [parent_sense] if parent_sense else senses
@@ -2,6 +2,7 @@ from typing import Dict
 
 from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
 
+from dictionary.ingestion.write_tracker import WriteTracker
 from dictionary.models import ExampleRhyme, ExampleRhymeParsed
 from dictionary.utils import slugify
 
@@ -35,10 +36,8 @@ class ExampleRhymeParser:
             example_rhyme = ExampleRhyme.objects.get(word_one=nt.word_one, word_two=nt.word_two,
                                                      word_one_position=nt.word_one_position,
                                                      word_two_position=nt.word_two_position)
-            example_rhyme.word_one_slug = nt.word_one_slug
-            example_rhyme.word_two_slug = nt.word_two_slug
-            example_rhyme.word_two_target_id = nt.word_two_target_id
-            example_rhyme.save()
+            WriteTracker.save_changed(example_rhyme, dict(word_one_slug=nt.word_one_slug, word_two_slug=nt.word_two_slug,
+                                                          word_two_target_id=nt.word_two_target_id))
         except MultipleObjectsReturned as e:
             print(nt, e)
             raise
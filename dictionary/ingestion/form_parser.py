@@ -2,7 +2,9 @@ from typing import Dict, Tuple
 
 from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
 
-from dictionary.models import FormParsed, Form, FormRelations
+from dictionary.ingestion.relation_sync import RelationSync
+from dictionary.ingestion.write_tracker import WriteTracker
+from dictionary.models import FormParsed, Form, FormRelations, Entry
 from dictionary.utils import slugify
 
 
@@ -23,27 +25,21 @@ class FormParser:
             return nt
 
     @staticmethod
-    def persist(nt: FormParsed) -> Tuple[Form, FormRelations]:
+    def persist(nt: FormParsed, parent_entry: Entry = None) -> Tuple[Form, FormRelations]:
         try:
             form = Form.objects.get(slug=nt.slug)
-            form.frequency = nt.frequency
-            form.save()
+            WriteTracker.save_changed(form, dict(frequency=nt.frequency))
         except MultipleObjectsReturned as e:
             print(nt.slug, e)
             raise
         except ObjectDoesNotExist:
             form = Form.objects.create(slug=nt.slug, frequency=nt.frequency)
-        return FormParser.update_relations(form)
+        return FormParser.update_relations(form, parent_entry)
 
     @staticmethod
-    def update_relations(form: Form) -> Tuple[Form, FormRelations]:
-        _ = FormParser.purge_relations(form)
+    def update_relations(form: Form, parent_entry: Entry = None) -> Tuple[Form, FormRelations]:
         relations = FormRelations(
-            parent_entry=[]
+            parent_entry=[parent_entry] if parent_entry else []
         )
+        RelationSync.sync(form, 'parent_entry', relations.parent_entry)
         return form, relations
-
-    @staticmethod
-    def purge_relations(form: Form) -> Form:
-        form.parent_entry.clear()
-        return form
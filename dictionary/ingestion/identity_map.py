@@ -0,0 +1,67 @@
+from typing import Any, Dict, Optional, Tuple
+
+from django.core.exceptions import MultipleObjectsReturned
+
+from dictionary.ingestion.write_tracker import WriteTracker
+
+
+class IdentityMap:
+    """
+    Run-scoped cache of the shared rows ingestion keeps coming back to (artists, places, domains, songs,
+    xref target senses...), keyed by model & natural key, so that each is fetched at most once per run
+    and written only when its fields differ; inactive outside start() & stop(), when every lookup hits the database
+    """
+
+    objects: Optional[Dict[Tuple, Any]] = None
+    examples: Optional[Dict[Tuple, Any]] = None
+
+    @staticmethod
+    def start() -> None:
+        IdentityMap.objects = dict()
+        IdentityMap.examples = dict()
+
+    @staticmethod
+    def stop() -> None:
+        IdentityMap.objects = None
+        IdentityMap.examples = None
+
+    @staticmethod
+    def invalidate() -> None:
+        """Forgets everything cached, as after a rollback that may have undone rows the map holds"""
+        if IdentityMap.objects is not None:
+            IdentityMap.start()
+
+    @staticmethod
+    def persist(model, lookup: Dict[str, Any], values: Dict[str, Any] = None, defaults: Dict[str, Any] = None) -> Any:
+        """
+        Returns the row matching lookup, created from lookup, values & defaults if there is none; an existing row
+        has only those of values that differ written, with save(update_fields=...), or isn't written at all
+        """
+        values = values or dict()
+        key = (model, tuple(sorted(lookup.items())))
+        obj = IdentityMap.objects.get(key) if IdentityMap.objects is not None else None
+        if obj is None:
+            try:
+                obj = model.objects.get(**lookup)
+            except MultipleObjectsReturned as e:
+                print(lookup, e)
+                raise
+            except model.DoesNotExist:
+                obj = model.objects.create(**lookup, **values, **(defaults or dict()))
+                if IdentityMap.objects is not None:
+                    IdentityMap.objects[key] = obj
+                return obj
+        WriteTracker.save_changed(obj, values)
+        if IdentityMap.objects is not None:
+            IdentityMap.objects[key] = obj
+        return obj
+
+    @staticmethod
+    def persisted_example(key: Tuple) -> Optional[Any]:
+        """The (example, relations) already persisted this run for an example's natural key, if any"""
+        return IdentityMap.examples.get(key) if IdentityMap.examples is not None else None
+
+    @staticmethod
+    def remember_example(key: Tuple, persisted: Any) -> None:
+        if IdentityMap.examples is not None:
+            IdentityMap.examples[key] = persisted
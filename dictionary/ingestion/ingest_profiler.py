@@ -0,0 +1,202 @@
+import functools
+import heapq
+import json
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from inspect import getattr_static
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from django.db import connection
+
+from dictionary.ingestion.artist_parser import ArtistParser
+from dictionary.ingestion.bulk_persister import BulkPersister
+from dictionary.ingestion.collocate_parser import CollocateParser
+from dictionary.ingestion.domain_parser import DomainParser
+from dictionary.ingestion.entry_parser import EntryParser
+from dictionary.ingestion.example_parser import ExampleParser
+from dictionary.ingestion.example_rhyme_parser import ExampleRhymeParser
+from dictionary.ingestion.form_parser import FormParser
+from dictionary.ingestion.lyric_link_parser import LyricLinkParser
+from dictionary.ingestion.named_entity_parser import NamedEntityParser
+from dictionary.ingestion.region_parser import RegionParser
+from dictionary.ingestion.semantic_class_parser import SemanticClassParser
+from dictionary.ingestion.sense_parser import SenseParser
+from dictionary.ingestion.song_parser import SongParser
+from dictionary.ingestion.synset_parser import SynSetParser
+from dictionary.ingestion.xref_parser import XrefParser
+
+
+# the classes whose persist methods are timed while profiling
+PROFILED = (EntryParser, FormParser, SenseParser, ExampleParser, SongParser, ArtistParser, XrefParser, CollocateParser,
+            DomainParser, RegionParser, SemanticClassParser, SynSetParser, ExampleRhymeParser, NamedEntityParser,
+            LyricLinkParser, BulkPersister)
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class IngestProfiler:
+    """
+    Run-scoped timings of an ingest: parse & persist time, SQL queries & rows written per file, time per parser
+    class's persist (in total & excluding the nested persists it calls), and the slowest entries; between start()
+    & stop() the parsers' persist methods are wrapped & every query counted, outside them nothing is recorded
+    """
+
+    active = False
+    top = 20
+    queries = 0
+    rows = 0
+    parse_seconds = 0.0
+    files: List[Dict[str, Any]] = list()
+    parsers: Dict[str, Dict[str, float]] = dict()
+    slowest: List[tuple] = list()
+    stack: List[List[float]] = list()
+    originals: List[tuple] = list()
+    hooks: Optional[ExitStack] = None
+
+    @staticmethod
+    def start(top: int = 20) -> None:
+        IngestProfiler.active, IngestProfiler.top = True, top
+        IngestProfiler.queries, IngestProfiler.rows, IngestProfiler.parse_seconds = 0, 0, 0.0
+        IngestProfiler.files, IngestProfiler.slowest, IngestProfiler.stack = list(), list(), list()
+        IngestProfiler.parsers = defaultdict(lambda: dict(calls=0, seconds=0.0, self_seconds=0.0))
+        for cls in PROFILED:
+            original = getattr_static(cls, 'persist')
+            IngestProfiler.originals.append((cls, original))
+            if isinstance(original, staticmethod):
+                setattr(cls, 'persist', staticmethod(IngestProfiler.timed(cls.__name__, original.__func__)))
+            else:
+                setattr(cls, 'persist', IngestProfiler.timed(cls.__name__, original))
+        IngestProfiler.hooks = ExitStack()
+        IngestProfiler.hooks.enter_context(connection.execute_wrapper(IngestProfiler.count_query))
+
+    @staticmethod
+    def stop() -> None:
+        """Restores the parsers & stops counting queries, keeping what was recorded for the report"""
+        for cls, original in IngestProfiler.originals:
+            setattr(cls, 'persist', original)
+        IngestProfiler.originals = list()
+        if IngestProfiler.hooks is not None:
+            IngestProfiler.hooks.close()
+            IngestProfiler.hooks = None
+        IngestProfiler.active = False
+
+    @staticmethod
+    def count_query(execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        IngestProfiler.queries += 1
+        if sql.lstrip()[:6].upper() in WRITES:
+            IngestProfiler.rows += max(context['cursor'].rowcount, 0)
+        return result
+
+    @staticmethod
+    def timed(name: str, persist):
+        @functools.wraps(persist)
+        def wrapper(*args, **kwargs):
+            # start time, queries & rows so far, seconds spent in nested persists
+            frame = [time.perf_counter(), IngestProfiler.queries, IngestProfiler.rows, 0.0]
+            IngestProfiler.stack.append(frame)
+            try:
+                return persist(*args, **kwargs)
+            finally:
+                IngestProfiler.stack.pop()
+                elapsed = time.perf_counter() - frame[0]
+                if IngestProfiler.stack:
+                    IngestProfiler.stack[-1][3] += elapsed
+                stats = IngestProfiler.parsers[name]
+                stats['calls'] += 1
+                stats['seconds'] += elapsed
+                stats['self_seconds'] += elapsed - frame[3]
+                if name == EntryParser.__name__:
+                    IngestProfiler.record_entry(args[0].headword, elapsed, IngestProfiler.queries - frame[1],
+                                                IngestProfiler.rows - frame[2])
+        return wrapper
+
+    @staticmethod
+    def record_entry(headword: str, seconds: float, queries: int, rows: int) -> None:
+        entry = (seconds, headword, queries, rows)
+        if len(IngestProfiler.slowest) < IngestProfiler.top:
+            heapq.heappush(IngestProfiler.slowest, entry)
+        else:
+            heapq.heappushpop(IngestProfiler.slowest, entry)
+
+    @staticmethod
+    def parsing(items: Iterable) -> Iterator:
+        """Passes items through, counting the time spent producing each as parse time"""
+        if not IngestProfiler.active:
+            yield from items
+            return
+        items = iter(items)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            finally:
+                IngestProfiler.parse_seconds += time.perf_counter() - started
+            yield item
+
+    @staticmethod
+    @contextmanager
+    def file(name: str) -> Iterator[Dict[str, Any]]:
+        """
+        Records a file's totals into the dict yielded, where the caller puts the count of entries persisted;
+        its parse time is that counted since the previous file, which includes waiting on the parse pool for it,
+        & its persist time the rest of the time spent inside the block
+        """
+        if not IngestProfiler.active:
+            yield dict()
+            return
+        stats = dict(file=name, entries=0)
+        IngestProfiler.files.append(stats)
+        started, parsed = time.perf_counter(), IngestProfiler.parse_seconds
+        queries, rows = IngestProfiler.queries, IngestProfiler.rows
+        try:
+            yield stats
+        finally:
+            elapsed = time.perf_counter() - started
+            stats['parse_seconds'] = round(IngestProfiler.parse_seconds, 4)
+            stats['persist_seconds'] = round(elapsed - (IngestProfiler.parse_seconds - parsed), 4)
+            stats['queries'] = IngestProfiler.queries - queries
+            stats['rows_written'] = IngestProfiler.rows - rows
+            IngestProfiler.parse_seconds = 0.0
+
+    @staticmethod
+    def report() -> Dict[str, Any]:
+        parsers = {name: dict(calls=int(s['calls']), seconds=round(s['seconds'], 4), self_seconds=round(s['self_seconds'], 4))
+                   for name, s in sorted(IngestProfiler.parsers.items(), key=lambda item: -item[1]['self_seconds'])}
+        return dict(
+            totals=dict(
+                files=len(IngestProfiler.files),
+                entries=sum(f['entries'] for f in IngestProfiler.files),
+                parse_seconds=round(sum(f.get('parse_seconds', 0) for f in IngestProfiler.files), 4),
+                persist_seconds=round(sum(f.get('persist_seconds', 0) for f in IngestProfiler.files), 4),
+                queries=IngestProfiler.queries,
+                rows_written=IngestProfiler.rows,
+            ),
+            files=IngestProfiler.files,
+            parsers=parsers,
+            slowest_entries=[dict(headword=headword, seconds=round(seconds, 4), queries=queries, rows_written=rows)
+                             for seconds, headword, queries, rows in sorted(IngestProfiler.slowest, reverse=True)],
+        )
+
+    @staticmethod
+    def write_report(path: str) -> Dict[str, Any]:
+        report = IngestProfiler.report()
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        return report
+
+    @staticmethod
+    def summary(report: Dict[str, Any] = None, lines: int = 5) -> str:
+        report = report or IngestProfiler.report()
+        totals = report['totals']
+        summary = [f"{totals['files']} files, {totals['entries']} entries: parse {totals['parse_seconds']:.1f}s, "
+                   f"persist {totals['persist_seconds']:.1f}s, {totals['queries']} queries, "
+                   f"{totals['rows_written']} rows written"]
+        summary += [f"  {name}: {s['self_seconds']:.2f}s self, {s['seconds']:.2f}s total over {s['calls']} calls"
+                    for name, s in list(report['parsers'].items())[:lines]]
+        summary += [f"  slowest '{e['headword']}': {e['seconds']:.3f}s, {e['queries']} queries"
+                    for e in report['slowest_entries'][:lines]]
+        return '\n'.join(summary)
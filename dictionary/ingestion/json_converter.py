@@ -1,35 +1,62 @@
-from typing import AnyStr, Dict
+from typing import AnyStr, Dict, Iterator, IO, Union
+from xml.etree import ElementTree
 
 import xmltodict
 
 
 class JSONConverter:
 
+    FORCE_LIST = ('entry',
+                  'senses',
+                  'forms',
+                  'form',
+                  'sense',
+                  'definition',
+                  'domain',
+                  'region',
+                  'semanticClass',
+                  'synSetRef'
+                  'collocates',
+                  'collocate',
+                  'xref',
+                  'feat',
+                  'note',
+                  'etym',
+                  'rhyme',
+                  'entity',
+                  'artist',
+                  'rf')
+
     @staticmethod
     def parse_to_dict(xml_string: AnyStr) -> Dict:
-        force_list = ('entry',
-                      'senses',
-                      'forms',
-                      'form',
-                      'sense',
-                      'definition',
-                      'domain',
-                      'region',
-                      'semanticClass',
-                      'synSetRef'
-                      'collocates',
-                      'collocate',
-                      'xref',
-                      'feat',
-                      'note',
-                      'etym',
-                      'rhyme',
-                      'entity',
-                      'artist',
-                      'rf')
         try:
-            j = xmltodict.parse(xml_string, force_list=force_list)
+            j = xmltodict.parse(xml_string, force_list=JSONConverter.FORCE_LIST)
         except Exception as e:
             raise SyntaxError(f"Failed to parse XML string: {e}")
         else:
             return j
+
+    @staticmethod
+    def iter_entries(source: Union[str, IO]) -> Iterator[Dict]:
+        """
+        Yields the dict of one <entry> at a time from a file name or file object, converted with the same force_list
+        as parse_to_dict; each entry's element is dropped from the tree once yielded, so memory doesn't grow with the file
+        """
+        try:
+            context = ElementTree.iterparse(source, events=('start', 'end'))
+            _, root = next(context)
+            if root.tag != 'dictionary':
+                raise KeyError(f"Expected a <dictionary> root, not <{root.tag}>")
+            depth = 1
+            for event, elem in context:
+                if event == 'start':
+                    depth += 1
+                    continue
+                depth -= 1
+                if depth == 1 and elem.tag == 'entry':
+                    elem.tail = None
+                    entry_string = ElementTree.tostring(elem, encoding='unicode')
+                    root.clear()
+                    yield xmltodict.parse(entry_string, force_list=JSONConverter.FORCE_LIST)['entry'][0]
+        except ElementTree.ParseError as e:
+            raise SyntaxError(f"Failed to parse XML string: {e}")
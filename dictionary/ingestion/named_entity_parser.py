@@ -1,7 +1,6 @@
 from typing import Dict
 
-from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
-
+from dictionary.ingestion.identity_map import IdentityMap
 from dictionary.models import NamedEntity, NamedEntityParsed
 from dictionary.utils import slugify
 
@@ -24,24 +23,5 @@ class NamedEntityParser:
 
     @staticmethod
     def persist(nt: NamedEntityParsed) -> NamedEntity:
-        try:
-            named_entity = NamedEntity.objects.get(
-                entity_type=nt.entity_type,
-                pref_label_slug=nt.pref_label_slug
-            )
-            named_entity.pref_label = nt.pref_label
-            named_entity.slug = nt.slug
-            named_entity.name = nt.name
-            named_entity.save()
-        except MultipleObjectsReturned as e:
-            print(nt.entity_type, nt.pref_label_slug, e)
-            raise
-        except ObjectDoesNotExist:
-            named_entity = NamedEntity.objects.create(
-                entity_type=nt.entity_type,
-                pref_label_slug=nt.pref_label_slug,
-                pref_label=nt.pref_label,
-                slug=nt.slug,
-                name=nt.name
-            )
-        return named_entity
+        return IdentityMap.persist(NamedEntity, dict(entity_type=nt.entity_type, pref_label_slug=nt.pref_label_slug),
+                                   dict(pref_label=nt.pref_label, slug=nt.slug, name=nt.name))
@@ -1,7 +1,6 @@
 from typing import Dict
 
-from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
-
+from dictionary.ingestion.identity_map import IdentityMap
 from dictionary.models import Place, PlaceParsed
 
 
@@ -26,17 +25,7 @@ class PlaceParser:
 
     @staticmethod
     def persist(nt: PlaceParsed) -> Place:
-        try:
-            place = Place.objects.get(slug=nt.slug)
-            place.name = nt.name
-            place.full_name = nt.full_name
-            if nt.latitude and nt.longitude:
-                place.latitude = nt.latitude
-                place.longitude = nt.longitude
-            place.save()
-        except MultipleObjectsReturned as e:
-            print(nt.slug, e)
-            raise
-        except ObjectDoesNotExist:
-            place = Place.objects.create(slug=nt.slug, name=nt.name, full_name=nt.full_name, latitude=nt.latitude, longitude=nt.longitude)
-        return place
+        values = dict(name=nt.name, full_name=nt.full_name)
+        if nt.latitude and nt.longitude:
+            values.update(latitude=nt.latitude, longitude=nt.longitude)
+        return IdentityMap.persist(Place, dict(slug=nt.slug), values, dict(latitude=nt.latitude, longitude=nt.longitude))
@@ -1,5 +1,4 @@
-from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
-
+from dictionary.ingestion.identity_map import IdentityMap
 from dictionary.models import RegionParsed, Region
 from dictionary.utils import make_label_from_camel_case, slugify
 
@@ -13,13 +12,4 @@ class RegionParser:
 
     @staticmethod
     def persist(nt: RegionParsed):
-        try:
-            region = Region.objects.get(slug=nt.slug)
-            region.name = nt.name
-            region.save()
-        except MultipleObjectsReturned as e:
-            print(nt.slug, e)
-            raise
-        except ObjectDoesNotExist:
-            region = Region.objects.create(slug=nt.slug, name=nt.name)
-        return region
+        return IdentityMap.persist(Region, dict(slug=nt.slug), dict(name=nt.name))
@@ -0,0 +1,32 @@
+from typing import Any, Iterable, Set, Tuple
+
+
+class RelationSync:
+    """
+    Brings a many-to-many relation to a desired set of related rows by its difference with the current one,
+    deleting only the through rows of links that went away & inserting only the new ones, so that re-ingesting
+    unchanged data leaves the through tables (& readers of them) untouched
+    """
+
+    @staticmethod
+    def related_ids(related: Iterable[Any]) -> Set[Any]:
+        return {getattr(r, 'pk', r) for r in related if r is not None}
+
+    @staticmethod
+    def sync(obj, name: str, related: Iterable[Any]) -> Tuple[Set[Any], Set[Any]]:
+        """
+        Makes obj.<name> link to exactly the related objects (or primary keys) given;
+        returns the primary keys of the (added, removed) links
+        """
+        field = obj._meta.get_field(name)
+        through = field.remote_field.through
+        source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+        desired = RelationSync.related_ids(related)
+        current = set(through.objects.filter(**{source: obj.pk}).values_list(target + '_id', flat=True))
+        added, removed = desired - current, current - desired
+        if removed:
+            through.objects.filter(**{source: obj.pk, target + '__in': removed}).delete()
+        if added:
+            through.objects.bulk_create([through(**{source + '_id': obj.pk, target + '_id': pk}) for pk in added],
+                                        ignore_conflicts=True)
+        return added, removed
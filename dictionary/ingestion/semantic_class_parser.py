@@ -1,5 +1,4 @@
-from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
-
+from dictionary.ingestion.identity_map import IdentityMap
 from dictionary.models import SemanticClassParsed, SemanticClass
 from dictionary.utils import make_label_from_camel_case, slugify
 
@@ -13,13 +12,4 @@ class SemanticClassParser:
 
     @staticmethod
     def persist(nt: SemanticClassParsed):
-        try:
-            semantic_class = SemanticClass.objects.get(slug=nt.slug)
-            semantic_class.name = nt.name
-            semantic_class.save()
-        except MultipleObjectsReturned as e:
-            print(nt.slug, e)
-            raise
-        except ObjectDoesNotExist:
-            semantic_class = SemanticClass.objects.create(slug=nt.slug, name=nt.name)
-        return semantic_class
+        return IdentityMap.persist(SemanticClass, dict(slug=nt.slug), dict(name=nt.name))
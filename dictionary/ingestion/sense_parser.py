@@ -5,14 +5,17 @@ from dictionary.ingestion.artist_parser import ArtistParser
 from dictionary.ingestion.collocate_parser import CollocateParser
 from dictionary.ingestion.synset_parser import SynSetParser
 from dictionary.ingestion.region_parser import RegionParser
+from dictionary.ingestion.relation_sync import RelationSync
 from dictionary.ingestion.semantic_class_parser import SemanticClassParser
+from dictionary.ingestion.dirty_tracker import DirtyTracker
 from dictionary.ingestion.domain_parser import DomainParser
 from dictionary.ingestion.example_parser import ExampleParser
+from dictionary.ingestion.write_tracker import WriteTracker
 from dictionary.ingestion.xref_parser import XrefParser
 from dictionary.models import SenseParsed, Sense, SenseRelations, SynSet, SemanticClass, Region, Domain, DomainParsed, \
     SemanticClassParsed, SynSetParsed, ExampleParsed, Example, ExampleRelations, RegionParsed, CollocateParsed, \
-    Collocate, XrefParsed, Xref, Artist, ArtistParsed, ArtistRelations
-from dictionary.utils import slugify
+    Collocate, XrefParsed, Xref, Artist, ArtistParsed
+from dictionary.utils import slugify, content_digest
 
 
 class SenseParser:
@@ -39,18 +42,18 @@ class SenseParser:
             return nt
 
     @staticmethod
-    def persist(nt: SenseParsed) -> Tuple[Sense, SenseRelations]:
+    def digest(nt: SenseParsed) -> str:
+        """Digest of everything a sense is persisted from, which includes its examples & what it inherits from its entry"""
+        return content_digest(nt._asdict())
+
+    @staticmethod
+    def persist(nt: SenseParsed, force_update: bool = False) -> Tuple[Sense, SenseRelations]:
+        digest = SenseParser.digest(nt)
         try:
-            sense = Sense.objects.get(xml_id=nt.xml_id)
-            sense.json = nt.xml_dict
-            sense.headword = nt.headword
-            sense.part_of_speech = nt.part_of_speech
-            sense.definition = nt.definition
-            sense.etymology = nt.etymology
-            sense.notes = nt.notes
-            sense.slug = nt.slug
-            sense.publish = nt.publish
-            sense.save()
+            sense = Sense.objects.defer('json').get(xml_id=nt.xml_id)
+            if not force_update and sense.digest == digest:
+                WriteTracker.avoided += 1
+                return sense, SenseRelations(**{field: list() for field in SenseRelations._fields})
         except MultipleObjectsReturned as e:
             print(nt.xml_id, e)
             raise
@@ -66,37 +69,55 @@ class SenseParser:
                 slug=nt.slug,
                 publish=nt.publish,
             )
-        return SenseParser.update_relations(sense, nt)
-
-    @staticmethod
-    def update_relations(sense: Sense, nt: SenseParsed) -> Tuple[Sense, SenseRelations]:
-        purged = SenseParser.purge_relations(sense)
+        sense, relations = SenseParser.update_relations(sense, nt, force_update)
+        # the digest goes in last, so that a sense whose relations failed to persist is retried on the next run
+        WriteTracker.save_changed(sense, dict(
+            json=nt.xml_dict,
+            headword=nt.headword,
+            part_of_speech=nt.part_of_speech,
+            definition=nt.definition,
+            etymology=nt.etymology,
+            notes=nt.notes,
+            slug=nt.slug,
+            publish=nt.publish,
+            digest=digest
+        ))
+        return sense, relations
+
+    @staticmethod
+    def update_relations(sense: Sense, nt: SenseParsed, force_update: bool = False) -> Tuple[Sense, SenseRelations]:
+        examples = SenseParser.process_examples(nt, sense, force_update)
         relations = SenseRelations(
-            examples=SenseParser.process_examples(nt, purged),
-            domains=SenseParser.process_domains(nt, purged),
-            regions=SenseParser.process_regions(nt, purged),
-            semantic_classes=SenseParser.process_semantic_classes(nt, purged),
-            synset=SenseParser.process_synsets(nt, purged),
-            xrefs=SenseParser.process_xrefs(nt, purged),
+            examples=examples,
+            domains=SenseParser.process_domains(nt, sense),
+            regions=SenseParser.process_regions(nt, sense),
+            semantic_classes=SenseParser.process_semantic_classes(nt, sense),
+            synset=SenseParser.process_synsets(nt, sense),
+            xrefs=SenseParser.process_xrefs(nt, sense),
             sense_rhymes=[],
-            collocates=SenseParser.process_collocates(nt, purged),
-            features_entities=[],
-            cites_artists=SenseParser.process_artists(nt, purged)
+            collocates=SenseParser.process_collocates(nt, sense),
+            features_entities=[e for _, r in examples for e in r.features_entities],
+            cites_artists=SenseParser.process_artists(nt, sense)
         )
-        return purged, relations
-
-    @staticmethod
-    def purge_relations(sense: Sense) -> Sense:
-        sense.examples.clear()
-        sense.domains.clear()
-        sense.regions.clear()
-        sense.semantic_classes.clear()
-        sense.synset.clear()
-        sense.xrefs.clear()
-        sense.sense_rhymes.clear()
-        sense.collocates.clear()
-        sense.features_entities.clear()
-        sense.cites_artists.clear()
+        SenseParser.sync_relations(sense, relations)
+        DirtyTracker.mark_senses([sense.id])
+        DirtyTracker.mark_artists([artist.slug for artist in relations.cites_artists])
+        return sense, relations
+
+    @staticmethod
+    def sync_relations(sense: Sense, relations: SenseRelations) -> Sense:
+        RelationSync.sync(sense, 'examples', [example for example, _ in relations.examples])
+        RelationSync.sync(sense, 'domains', relations.domains)
+        RelationSync.sync(sense, 'regions', relations.regions)
+        RelationSync.sync(sense, 'semantic_classes', relations.semantic_classes)
+        RelationSync.sync(sense, 'synset', relations.synset)
+        RelationSync.sync(sense, 'xrefs', relations.xrefs)
+        RelationSync.sync(sense, 'sense_rhymes', relations.sense_rhymes)
+        RelationSync.sync(sense, 'collocates', relations.collocates)
+        RelationSync.sync(sense, 'features_entities', relations.features_entities)
+        # cites_artists shares its through table with the primary_senses of the examples' artists
+        RelationSync.sync(sense, 'cites_artists',
+                          relations.cites_artists + [a for _, r in relations.examples for a in r.artist])
         return sense
 
     @staticmethod
@@ -110,10 +131,7 @@ class SenseParser:
 
     @staticmethod
     def process_synsets(nt, sense) -> List[SynSet]:
-        def process_synset(synset: SynSet) -> SynSet:
-            sense.synset.add(synset)
-            return synset
-        return [process_synset(SynSetParser.persist(d)) for d in SenseParser.extract_synsets(nt.xml_dict)]
+        return [SynSetParser.persist(d) for d in SenseParser.extract_synsets(nt.xml_dict)]
 
     @staticmethod
     def extract_collocates(d: Dict, sense_id: str) -> List[CollocateParsed]:
@@ -124,10 +142,7 @@ class SenseParser:
 
     @staticmethod
     def process_collocates(nt, sense) -> List[Collocate]:
-        def process_collocate(collocate: Collocate) -> Collocate:
-            sense.collocates.add(collocate)
-            return collocate
-        return [process_collocate(CollocateParser.persist(d)) for d in SenseParser.extract_collocates(nt.xml_dict, nt.xml_id)]
+        return [CollocateParser.persist(d) for d in SenseParser.extract_collocates(nt.xml_dict, nt.xml_id)]
 
     @staticmethod
     def extract_semantic_classes(d: Dict) -> List[SemanticClassParsed]:
@@ -138,10 +153,7 @@ class SenseParser:
 
     @staticmethod
     def process_semantic_classes(nt, sense) -> List[SemanticClass]:
-        def process_semantic_class(semantic_class: SemanticClass) -> SemanticClass:
-            sense.semantic_classes.add(semantic_class)
-            return semantic_class
-        return [process_semantic_class(SemanticClassParser.persist(d)) for d in SenseParser.extract_semantic_classes(nt.xml_dict)]
+        return [SemanticClassParser.persist(d) for d in SenseParser.extract_semantic_classes(nt.xml_dict)]
 
     @staticmethod
     def extract_regions(d: Dict) -> List[RegionParsed]:
@@ -152,10 +164,7 @@ class SenseParser:
 
     @staticmethod
     def process_regions(nt, sense) -> List[Region]:
-        def process_region(region: Region) -> Region:
-            sense.regions.add(region)
-            return region
-        return [process_region(RegionParser.persist(d)) for d in SenseParser.extract_regions(nt.xml_dict)]
+        return [RegionParser.persist(d) for d in SenseParser.extract_regions(nt.xml_dict)]
 
     @staticmethod
     def extract_domains(d: Dict) -> List[DomainParsed]:
@@ -166,10 +175,7 @@ class SenseParser:
 
     @staticmethod
     def process_domains(nt: SenseParsed, sense: Sense) -> List[Domain]:
-        def process_domain(domain: Domain) -> Domain:
-            sense.domains.add(domain)
-            return domain
-        return [process_domain(DomainParser.persist(d)) for d in SenseParser.extract_domains(nt.xml_dict)]
+        return [DomainParser.persist(d) for d in SenseParser.extract_domains(nt.xml_dict)]
 
     @staticmethod
     def extract_examples(d: Dict) -> List[ExampleParsed]:
@@ -180,17 +186,12 @@ class SenseParser:
             return list()
 
     @staticmethod
-    def process_examples(nt: SenseParsed, sense: Sense) -> List[Tuple[Example, ExampleRelations]]:
+    def process_examples(nt: SenseParsed, sense: Sense, force_update: bool = False) -> List[Tuple[Example, ExampleRelations]]:
         def process_example(example: Example, example_relations: ExampleRelations) -> Tuple[Example, ExampleRelations]:
-            sense.examples.add(example)
-            for a in example_relations.artist:
-                a.primary_senses.add(sense)
             for a in example_relations.feat_artist:
                 a.featured_senses.add(sense)
-            for e in example_relations.features_entities:
-                e.mentioned_at_senses.add(sense)
             return example, example_relations
-        return [process_example(*ExampleParser.persist(d)) for d in SenseParser.extract_examples(nt.xml_dict)]
+        return [process_example(*ExampleParser.persist(d, sense, force_update)) for d in SenseParser.extract_examples(nt.xml_dict)]
 
     @staticmethod
     def extract_xrefs(d: Dict) -> List[XrefParsed]:
@@ -202,10 +203,7 @@ class SenseParser:
 
     @staticmethod
     def process_xrefs(nt: SenseParsed, sense: Sense) -> List[Xref]:
-        def process_xref(xref: Xref) -> Xref:
-            sense.xrefs.add(xref)
-            return xref
-        return [process_xref(XrefParser.persist(d)) for d in SenseParser.extract_xrefs(nt.xml_dict)]
+        return [XrefParser.persist(d) for d in SenseParser.extract_xrefs(nt.xml_dict)]
 
     @staticmethod
     def extract_artists(d: Dict) -> List[ArtistParsed]:
@@ -216,8 +214,4 @@ class SenseParser:
 
     @staticmethod
     def process_artists(nt: SenseParsed, sense: Sense) -> List[Artist]:
-        def process_artist(artist: Artist, artist_relations: ArtistRelations) -> Artist:
-            sense.cites_artists.add(artist)
-            return artist
-
-        return [process_artist(*ArtistParser.persist(a)) for a in SenseParser.extract_artists(nt.xml_dict)]
+        return [ArtistParser.persist(a)[0] for a in SenseParser.extract_artists(nt.xml_dict)]
@@ -1,5 +1,4 @@
-from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
-
+from dictionary.ingestion.identity_map import IdentityMap
 from dictionary.models import SynSetParsed, SynSet
 from dictionary.utils import make_label_from_snake_case, slugify
 
@@ -13,11 +12,4 @@ class SynSetParser:
 
     @staticmethod
     def persist(nt: SynSetParsed) -> SynSet:
-        try:
-            synset = SynSet.objects.get(slug=nt.slug)
-        except MultipleObjectsReturned as e:
-            print(nt.slug, e)
-            raise
-        except ObjectDoesNotExist:
-            synset = SynSet.objects.create(name=nt.name, slug=nt.slug)
-        return synset
+        return IdentityMap.persist(SynSet, dict(slug=nt.slug), defaults=dict(name=nt.name))
@@ -0,0 +1,49 @@
+from decimal import Decimal
+from typing import Any, Dict
+
+from django.db.models import DecimalField
+
+
+class WriteTracker:
+    """
+    Saves only the columns of a loaded row whose incoming values differ, skipping the write altogether
+    when none do, and counts the updates made & avoided so that an ingest can report them
+    """
+
+    written = 0
+    avoided = 0
+
+    @staticmethod
+    def changed_fields(obj, values: Dict[str, Any]) -> Dict[str, Any]:
+        """The values (converted to the field's python type) that differ from those on the loaded row"""
+        changed = dict()
+        for f, v in values.items():
+            field = obj._meta.get_field(f)
+            v = field.to_python(v)
+            if isinstance(field, DecimalField) and v is not None:
+                # rounded to the column's scale, as the stored value was
+                v = v.quantize(Decimal(1).scaleb(-field.decimal_places))
+            if getattr(obj, f) != v:
+                changed[f] = v
+        return changed
+
+    @staticmethod
+    def save_changed(obj, values: Dict[str, Any]) -> bool:
+        changed = WriteTracker.changed_fields(obj, values)
+        if not changed:
+            WriteTracker.avoided += 1
+            return False
+        for f, v in changed.items():
+            setattr(obj, f, v)
+        obj.save(update_fields=list(changed))
+        WriteTracker.written += 1
+        return True
+
+    @staticmethod
+    def reset() -> None:
+        WriteTracker.written = 0
+        WriteTracker.avoided = 0
+
+    @staticmethod
+    def report() -> str:
+        return f"Updated {WriteTracker.written} rows, skipped {WriteTracker.avoided} unchanged writes"
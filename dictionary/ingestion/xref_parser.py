@@ -2,6 +2,7 @@ from typing import Dict
 
 from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
 
+from dictionary.ingestion.write_tracker import WriteTracker
 from dictionary.models import Xref, XrefParsed
 from dictionary.utils import slugify
 
@@ -44,9 +45,7 @@ class XrefParser:
                                     target_id=nt.target_id,
                                     target_lemma=nt.target_lemma,
                                     target_slug=nt.target_slug)
-            xref.position = nt.position
-            xref.frequency = nt.frequency
-            xref.save()
+            WriteTracker.save_changed(xref, dict(position=nt.position, frequency=nt.frequency))
         except MultipleObjectsReturned as e:
             print(nt, e)
             raise
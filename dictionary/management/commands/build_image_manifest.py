@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from dictionary.image_manifest import refresh_image_manifest, manifest_path
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the image manifest from dictionary/static/dictionary/img'
+
+    def handle(self, *args, **options):
+        manifest = refresh_image_manifest(write=True)
+        self.stdout.write(f"Indexed {len(manifest)} images in {manifest_path()}")
+        self.stdout.write(self.style.SUCCESS('Done!'))
@@ -1,56 +1,116 @@
 import sqlite3
+from collections import Counter
+from typing import Dict, List, Set, Tuple
 
-from dictionary.models import Song, Artist
+from django.db import transaction
+
+from dictionary.data_version import bump_data_version
+from dictionary.models import Song, SongLyrics, Artist
 from .xml_handler import clean_up_date
-from dictionary.utils import slugify
+from dictionary.utils import slugify, content_digest
 
+# rows fetched from HH.db & written per transaction
+BATCH_SIZE = 1000
 
-def process_row(row):
-    xml_id, artist, album, release_date, song_title, feat, lyrics, discogs_date, rel_date_verified, lyrics_verified = row
+# the columns the corpus writes on a song it has already filled in, besides its lyrics
+SYNCED_FIELDS = ['release_date_verified', 'digest']
+# & those it writes on a song it creates, or which has no slug yet
+FILLED_FIELDS = SYNCED_FIELDS + ['release_date', 'release_date_string', 'artist_name', 'artist_slug', 'title', 'album',
+                                 'slug']
 
-    song_object, created = get_song(xml_id)
-    if created or song_object.slug is None:
-        if release_date == 0:
-            release_date = "0001-01-01"
-        song_object.release_date = clean_up_date(str(release_date))
-        song_object.release_date_string = str(release_date)
-        artist_object = get_artist(artist)
-        song_object.artist_name = artist_object.name
-        song_object.artist_slug = artist_object.slug
-        song_object.artist.add(artist_object)
-        artist_object.primary_songs.add(song_object)
-        if feat:
-            feat_artists = [get_artist(f) for f in feat.split('; ')]
-            _ = [song_object.feat_artist.add(f) for f in feat_artists]
-            _ = [feat_object.featured_songs.add(song_object) for feat_object in feat_artists]
-        song_object.title = song_title
-        song_object.album = album
-        song_object.slug = slugify(song_object.artist_name + ' ' + song_title)
-    song_object.lyrics = lyrics
-
-    if rel_date_verified == 'MBK':
-        song_object.release_date_verified = True
-    else:
-        song_object.release_date_verified = False
-    song_object.save()
-    print('Processed', xml_id, artist, '- "' + song_title + '"')
-
-
-def get_artist(name):
+
+def resolve_artist(name: str, artists: Dict[str, str], renamed: Set[str]) -> str:
+    """
+    Returns the slug of the artist named, adding it to the preloaded slug -> name map if new; the name given
+    replaces a stored one, as get_or_create followed by a save of the name did
+    """
     slug = slugify(name)
-    artist_object, created = Artist.objects.get_or_create(slug=slug)
-    if not created or artist_object.name is None:
-        artist_object.name = name
-        artist_object.save()
-    return artist_object
+    if artists.get(slug, name) != name:
+        renamed.add(slug)
+    artists[slug] = name
+    return slug
+
+
+def fill_song(song: Song, row: Tuple, artists: Dict[str, str], renamed: Set[str]) -> Tuple[List[str], List[str]]:
+    """Sets a new song's metadata from its row, returning the slugs of its primary & featured artists"""
+    xml_id, artist, album, release_date, song_title, feat, lyrics, discogs_date, rel_date_verified, lyrics_verified = row
+    if release_date == 0:
+        release_date = "0001-01-01"
+    song.release_date = clean_up_date(str(release_date))
+    song.release_date_string = str(release_date)
+    artist_slug = resolve_artist(artist, artists, renamed)
+    song.artist_name = artist
+    song.artist_slug = artist_slug
+    song.title = song_title
+    song.album = album
+    song.slug = slugify(song.artist_name + ' ' + song_title)
+    feat_slugs = [resolve_artist(f, artists, renamed) for f in feat.split('; ')] if feat else []
+    return [artist_slug], feat_slugs
+
 
+def process_rows(rows: List[Tuple], artists: Dict[str, str]) -> Counter:
+    """
+    Upserts a batch of HH.db rows with a query to find their songs & bulk writes, skipping those whose row digest
+    matches the one stored at the last import; only the lyrics & release date verification of a song already
+    filled in are synced, as process_row did row by row
+    """
+    rows = {row[0]: row for row in rows}
+    digests = {xml_id: content_digest(list(row)) for xml_id, row in rows.items()}
+    existing = {song.xml_id: song for song in
+                Song.objects.filter(xml_id__in=rows).only('id', 'xml_id', 'slug', 'digest').order_by()}
+    counts = Counter()
+    created, filled, synced = list(), list(), list()
+    links: List[Tuple[Song, List[str], List[str]]] = list()
+    lyrics: List[Tuple[Song, str]] = list()
+    known = set(artists)
+    renamed: Set[str] = set()
+    for xml_id, row in rows.items():
+        song = existing.get(xml_id)
+        if song is not None and song.digest == digests[xml_id]:
+            counts['unchanged'] += 1
+            continue
+        if song is None:
+            song = Song(xml_id=xml_id)
+            created.append(song)
+            counts['created'] += 1
+        else:
+            (filled if song.slug is None else synced).append(song)
+            counts['updated'] += 1
+        if song.slug is None:
+            links.append((song, *fill_song(song, row, artists, renamed)))
+        lyrics.append((song, row[6]))
+        song.release_date_verified = row[8] == 'MBK'
+        song.digest = digests[xml_id]
 
-def get_song(xml_id):
-    song_object, created = Song.objects.get_or_create(xml_id=xml_id)
-    return song_object, created
+    Artist.objects.bulk_create([Artist(slug=slug, name=artists[slug]) for slug in set(artists) - known],
+                               batch_size=BATCH_SIZE)
+    Artist.objects.bulk_update([Artist(slug=slug, name=artists[slug]) for slug in renamed & known], ['name'],
+                               batch_size=BATCH_SIZE)
+    Song.objects.bulk_create(created, batch_size=BATCH_SIZE)
+    Song.objects.bulk_update(filled, FILLED_FIELDS, batch_size=BATCH_SIZE)
+    Song.objects.bulk_update(synced, SYNCED_FIELDS, batch_size=BATCH_SIZE)
+    SongLyrics.store({song.pk: text for song, text in lyrics})
+    Song.artist.through.objects.bulk_create([Song.artist.through(song_id=song.pk, artist_id=slug)
+                                             for song, primary, _ in links for slug in primary],
+                                            batch_size=BATCH_SIZE, ignore_conflicts=True)
+    Song.feat_artist.through.objects.bulk_create([Song.feat_artist.through(song_id=song.pk, artist_id=slug)
+                                                  for song, _, featured in links for slug in featured],
+                                                 batch_size=BATCH_SIZE, ignore_conflicts=True)
+    return counts
 
 
-def main(location='../corpus/dbs/HH.db'):
+def main(location='../corpus/dbs/HH.db', batch_size=BATCH_SIZE):
     conn = sqlite3.connect(location)
     cursor = conn.execute('select * from Songs')
-    _ = [process_row(row) for row in cursor]
+    artists = dict(Artist.objects.order_by().values_list('slug', 'name'))
+    counts = Counter()
+    rows = cursor.fetchmany(batch_size)
+    while rows:
+        with transaction.atomic():
+            counts.update(process_rows(rows, artists))
+        print(f"Processed {sum(counts.values())} rows")
+        rows = cursor.fetchmany(batch_size)
+    conn.close()
+    print(f"Created {counts['created']} songs, updated {counts['updated']}, skipped {counts['unchanged']} unchanged")
+    if counts['created'] or counts['updated']:
+        bump_data_version()
@@ -7,12 +7,12 @@ from dictionary.ingestion.directory_loader import DirectoryLoader
 logger = logging.getLogger(__name__)
 
 
-def main(directory):
+def main(directory, replace=False):
     print(f"Parsing directory {directory}")
     start = time.time()
     csv_files = sorted(DirectoryLoader.collect_csv_files(directory), key=lambda f: f.lower())
     print(csv_files)
-    DirectoryLoader.process_csv(csv_files)
+    DirectoryLoader.process_csv(csv_files, replace)
     end = time.time()
     total_time = end - start
     m, s = divmod(total_time, 60)
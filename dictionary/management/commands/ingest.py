@@ -10,10 +10,27 @@ class Command(BaseCommand):
                             action='store_true',
                             default='../django-xml',
                             help='path to XML')
+        parser.add_argument('--bulk',
+                            action='store_true',
+                            help='persist each file with bulk queries rather than row by row')
+        parser.add_argument('--workers',
+                            type=int,
+                            default=None,
+                            help='processes parsing files ahead of the writer (defaults to INGEST_WORKERS)')
+        parser.add_argument('--batch-size',
+                            type=int,
+                            default=None,
+                            help='entries per transaction, 0 for a file per transaction (defaults to INGEST_BATCH_SIZE)')
+        parser.add_argument('--profile',
+                            nargs='?',
+                            const='ingest-profile.json',
+                            default=None,
+                            help='time each file, entry & parser, writing a JSON report (to ingest-profile.json by default)')
 
     def handle(self, *args, **options):
         d = os.getenv("SOURCE_XML_PATH")
-        main(d, force_update=False)
+        main(d, force_update=False, bulk=options['bulk'], workers=options['workers'], batch_size=options['batch_size'],
+             profile=options['profile'])
         self.stdout.write(self.style.SUCCESS('Done!'))
 
 
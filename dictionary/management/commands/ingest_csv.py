@@ -5,9 +5,15 @@ from django.core.management.base import BaseCommand
 
 class Command(BaseCommand):
 
+    def add_arguments(self, parser):
+        parser.add_argument('--replace',
+                            action='store_true',
+                            help="make the origins, aliases & memberships of each artist listed exactly the CSVs' "
+                                 "rather than only adding the missing ones")
+
     def handle(self, *args, **options):
         d = os.getenv("SOURCE_CSV_PATH")
-        main(d)
+        main(d, replace=options['replace'])
         self.stdout.write(self.style.SUCCESS('Done!'))
 
 
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from dictionary.models import Example
+from dictionary.utils import render_linked_lyrics
+
+
+class Command(BaseCommand):
+    help = 'Renders the stored linked lyric of every example'
+
+    def handle(self, *args, **options):
+        rendered = render_linked_lyrics(Example.objects.all())
+        self.stdout.write(f"Rendered {rendered} linked lyrics")
+        self.stdout.write(self.style.SUCCESS('Done!'))
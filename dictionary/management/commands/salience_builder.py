@@ -1,21 +1,150 @@
-from dictionary.models import Sense
-from dictionary.management.commands.utils import print_progress
+import math
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from dictionary.ingestion.dirty_tracker import DirtyTracker
+from dictionary.models import Artist, Sense, Salience
 import logging
 
 
 logger = logging.getLogger(__name__)
 
+BATCH_SIZE = 5000
+ARTIST_COUNT_KEY = 'salience_artist_count'
+
+
+def collect_counts(sense_ids=None) -> Tuple[Dict[int, Dict[str, int]], Dict[int, List[Tuple[str, str]]], int]:
+    """
+    Pulls everything the tf-idf needs in three aggregate queries:
+    per published sense (optionally only those given), its example count by artist name
+    & the artists citing it, plus the artist count
+    """
+    through = Sense.examples.through
+    rows = through.objects.filter(sense__publish=True)
+    if sense_ids is not None:
+        rows = rows.filter(sense_id__in=sense_ids)
+    example_counts = defaultdict(dict)
+    for sense_id, artist_name, n in rows.values_list('sense_id', 'example__artist_name').annotate(n=Count('id')):
+        example_counts[sense_id][artist_name] = n
+
+    rows = Artist.primary_senses.through.objects.filter(sense__publish=True)
+    if sense_ids is not None:
+        rows = rows.filter(sense_id__in=sense_ids)
+    citing_artists = defaultdict(list)
+    for sense_id, artist_slug, artist_name in rows.values_list('sense_id', 'artist_id', 'artist__name'):
+        citing_artists[sense_id].append((artist_slug, artist_name))
+
+    return example_counts, citing_artists, Artist.objects.count()
+
+
+def score_saliences(example_counts, citing_artists, artist_count) -> List[Salience]:
+    """
+    Same scores as Sense.get_tfidfs: tf is the share of a sense's examples by an artist,
+    idf is log10(all artists / artists citing the sense); ranks are 1-based, per artist & per sense
+    """
+    saliences = list()
+    for sense_id, artists in citing_artists.items():
+        counts = example_counts.get(sense_id, dict())
+        e_count = sum(counts.values())
+        idf = math.log10(artist_count / len(artists))
+        for artist_slug, artist_name in artists:
+            a_count = counts.get(artist_name, 0)
+            tf = a_count / e_count if e_count > 0 else a_count / 0.000001
+            saliences.append(Salience(sense_id=sense_id, artist_id=artist_slug, score=tf * idf))
+
+    assign_ranks(saliences, 'sense_id', 'sense_rank')
+    assign_ranks(saliences, 'artist_id', 'artist_rank')
+    return saliences
+
+
+def assign_ranks(saliences: List[Salience], group_field: str, rank_field: str) -> None:
+    groups = defaultdict(list)
+    for salience in saliences:
+        groups[getattr(salience, group_field)].append(salience)
+    for group in groups.values():
+        group.sort(key=lambda s: -s.score)
+        for rank, salience in enumerate(group, 1):
+            setattr(salience, rank_field, rank)
+
+
+def rerank_artists(artist_slugs=None) -> None:
+    """Recomputes artist_rank from stored scores, for the given artists or all of them"""
+    saliences = Salience.objects.only('id', 'artist_id', 'score')
+    if artist_slugs is not None:
+        saliences = saliences.filter(artist_id__in=artist_slugs)
+    saliences = list(saliences)
+    assign_ranks(saliences, 'artist_id', 'artist_rank')
+    Salience.objects.bulk_update(saliences, ['artist_rank'], batch_size=BATCH_SIZE)
+
+
+def rescale_idfs(old_artist_count: int, artist_count: int, exclude_sense_ids) -> List[Salience]:
+    """
+    Rescales the idf factor of stored scores when the artist count has changed: a sense's row count
+    is its citing artist count, so its score is multiplied by log10(new / cited) / log10(old / cited)
+    """
+    saliences = list(Salience.objects.exclude(sense_id__in=exclude_sense_ids).only('id', 'sense_id', 'score'))
+    cited = Counter(salience.sense_id for salience in saliences)
+    for salience in saliences:
+        salience.score *= math.log10(artist_count / cited[salience.sense_id]) / math.log10(old_artist_count / cited[salience.sense_id])
+    return saliences
+
 
 def main():
+    start = time.time()
+    # marks flushed from here on may postdate the counts read below, so only these are discarded once built
+    marked = DirtyTracker.pending()
+    saliences = score_saliences(*collect_counts())
+    with transaction.atomic():
+        Salience.objects.all().delete()
+        Salience.objects.bulk_create(saliences, batch_size=BATCH_SIZE)
+    cache.set(ARTIST_COUNT_KEY, Artist.objects.count(), None)
+    DirtyTracker.discard(*marked)
+    msg = "Built {} saliences in {:.1f}s".format(len(saliences), time.time() - start)
+    logger.info(msg)
+    print(msg)
+    return len(saliences)
 
-    senses = Sense.objects.filter(publish=True).order_by("headword")
-    iterations = senses.count()
-    print_progress(0, iterations, prefix='Progress:', suffix='Complete ')
-    for i, sense in enumerate(senses):
-        msg = "Now processing: {}".format(str(sense))
-        logger.info(msg)
-        sense.remove_saliences()
-        sense.add_saliences()
-        print_progress(i+1, iterations, prefix='Progress:', suffix='Complete ', filename=sense.headword)
 
+def refresh():
+    """
+    Recomputes saliences only for the senses ingestion marked dirty, rescales the idf of every other row
+    if the artist count has moved, & re-ranks the artists whose scores changed;
+    falls back to a full rebuild if no previous build recorded its artist count
+    """
+    start = time.time()
+    old_artist_count = cache.get(ARTIST_COUNT_KEY)
+    if old_artist_count is None:
+        return main()
+    marked = DirtyTracker.pending()
+    sense_ids, artist_slugs = marked
+    artist_count = Artist.objects.count()
+    rescale = artist_count != old_artist_count
+    if rescale:
+        # an idf of 0 (every artist cited the sense) leaves no tf to rescale, so those senses are recomputed
+        sense_ids = sense_ids | set(Salience.objects.order_by().values('sense_id').annotate(n=Count('id'))
+                                    .filter(n=old_artist_count).values_list('sense_id', flat=True))
+    if not sense_ids and not rescale:
+        print("No saliences to refresh")
+        return 0
 
+    saliences = score_saliences(*collect_counts(sense_ids))
+    with transaction.atomic():
+        stale = Salience.objects.filter(sense_id__in=sense_ids)
+        artist_slugs = artist_slugs | set(stale.values_list('artist_id', flat=True)) | {s.artist_id for s in saliences}
+        stale.delete()
+        if rescale:
+            Salience.objects.bulk_update(rescale_idfs(old_artist_count, artist_count, sense_ids), ['score'], batch_size=BATCH_SIZE)
+        Salience.objects.bulk_create(saliences, batch_size=BATCH_SIZE)
+        rerank_artists(None if rescale else artist_slugs)
+    cache.set(ARTIST_COUNT_KEY, artist_count, None)
+    DirtyTracker.discard(*marked)
+    msg = "Refreshed {} saliences for {} senses{} in {:.1f}s".format(
+        len(saliences), len(sense_ids), " & rescaled all idfs" if rescale else "", time.time() - start)
+    logger.info(msg)
+    print(msg)
+    return len(saliences)
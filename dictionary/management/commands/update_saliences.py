@@ -1,14 +1,19 @@
-from .salience_builder import main
+from .salience_builder import main, refresh
 from django.core.management.base import BaseCommand
 
 
 class Command(BaseCommand):
     help = 'Updates Saliences'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--incremental',
+                            action='store_true',
+                            help='only recompute the senses changed by ingestion since the last update')
+
     def handle(self, *args, **options):
-        main()
+        if options['incremental']:
+            refresh()
+        else:
+            main()
 
         self.stdout.write(self.style.SUCCESS('Done!'))
-
-
-
@@ -1,4 +1,5 @@
 import sys
+import time
 
 
 def print_progress(iteration, total, prefix='', suffix='', decimals=1, bar_length=50, filename=''):
@@ -24,6 +25,26 @@ def print_progress(iteration, total, prefix='', suffix='', decimals=1, bar_lengt
     sys.stdout.flush()
 
 
+class RateLimitedProgress:
+    """
+    Prints the progress bar at most once every interval seconds, and always for the last iteration,
+    so that reporting progress on many small steps doesn't cost more than the steps themselves
+    """
+
+    def __init__(self, total, interval=1.0, prefix='Progress:', suffix='Complete '):
+        self.total = total
+        self.interval = interval
+        self.prefix = prefix
+        self.suffix = suffix
+        self.last = None
+
+    def update(self, iteration, filename=''):
+        now = time.monotonic()
+        if iteration == self.total or self.last is None or now - self.last >= self.interval:
+            self.last = now
+            print_progress(iteration, self.total, prefix=self.prefix, suffix=self.suffix, filename=filename)
+
+
 def is_ascii(s):
     return all(ord(c) < 128 for c in s)
 
@@ -7,6 +7,7 @@ from os.path import isfile, join
 
 import xmltodict
 from geopy.geocoders import Nominatim
+from dictionary.data_version import bump_data_version
 from dictionary.models import Entry, Sense, Example, Artist, Domain, SynSet, \
     NamedEntity, Xref, Collocate, SenseRhyme, ExampleRhyme, LyricLink, \
     Place, Song, SemanticClass, Region, Form
@@ -1010,6 +1011,7 @@ def process_xml(xml_list):
         x = XMLDict(xml)
         launch_trr_dict(x)
         print_progress(i + 1, iterations, prefix='Progress:', suffix='Complete ', filename=xml)
+    bump_data_version()
 
 
 def main(directory='../tRR/XML/tRR_Django'):
@@ -4,16 +4,22 @@ import logging
 
 
 from dictionary.ingestion.directory_loader import DirectoryLoader
+from dictionary.ingestion.ingest_profiler import IngestProfiler
 from dictionary.utils import update_stats
 
 logger = logging.getLogger(__name__)
 
 
-def main(directory: str, force_update: bool = False):
+def main(directory: str, force_update: bool = False, bulk: bool = False, workers: int = None, batch_size: int = None,
+         profile: str = None):
+    """profile is the path to write a JSON profiling report to, if the run should be profiled"""
     print(f"Parsing directory {directory}")
     start = time.time()
     xml_files = sorted(DirectoryLoader.collect_xml_files(directory), key=lambda f: f.lower())
-    DirectoryLoader.process_xml(xml_files, force_update)
+    DirectoryLoader.process_xml(xml_files, force_update, bulk, workers, batch_size, profile=bool(profile))
+    if profile:
+        report = IngestProfiler.write_report(profile)
+        sys.stdout.write(f"{IngestProfiler.summary(report)}\nProfile written to {profile}\n")
     end = time.time()
     total_time = end - start
     m, s = divmod(total_time, 60)
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0006_song_spot_uri'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='example',
+            name='linked_lyric',
+            field=models.TextField(blank=True, null=True, verbose_name='Linked Lyric'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.0.7 on 2026-10-18 13:14
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+SEARCH_VECTOR_TRIGGER = '''
+CREATE TRIGGER dictionary_example_search_vector_update
+BEFORE INSERT OR UPDATE OF lyric_text ON dictionary_example
+FOR EACH ROW EXECUTE PROCEDURE tsvector_update_trigger(search_vector, 'pg_catalog.english', lyric_text);
+UPDATE dictionary_example SET search_vector = to_tsvector('pg_catalog.english', lyric_text);
+'''
+
+DROP_SEARCH_VECTOR_TRIGGER = '''
+DROP TRIGGER IF EXISTS dictionary_example_search_vector_update ON dictionary_example;
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0007_example_linked_lyric'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='example',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='example',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='dictionary__search__3212f3_gin'),
+        ),
+        migrations.RunSQL(SEARCH_VECTOR_TRIGGER, DROP_SEARCH_VECTOR_TRIGGER),
+    ]
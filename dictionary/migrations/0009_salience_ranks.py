@@ -0,0 +1,31 @@
+# Generated by Django 3.0.7 on 2026-10-18 13:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0008_example_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salience',
+            name='artist_rank',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='salience',
+            name='sense_rank',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='salience',
+            index=models.Index(fields=['artist', 'artist_rank'], name='dictionary__artist__9fb57f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salience',
+            index=models.Index(fields=['sense', 'sense_rank'], name='dictionary__sense_i_13f32a_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.0.7 on 2026-10-18 13:29
+
+import hashlib
+import json
+
+from django.db import migrations, models
+
+
+def content_digest(d):
+    # frozen copy of dictionary.utils.content_digest as of this migration
+    canonical = json.dumps(d, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def backfill_digests(apps, schema_editor):
+    Entry = apps.get_model('dictionary', 'Entry')
+    entries = list(Entry.objects.exclude(json__isnull=True).only('headword', 'json'))
+    for entry in entries:
+        entry.digest = content_digest(entry.json)
+    Entry.objects.bulk_update(entries, ['digest'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0009_salience_ranks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entry',
+            name='digest',
+            field=models.CharField(blank=True, max_length=40, null=True, verbose_name='Content Digest'),
+        ),
+        migrations.RunPython(backfill_digests, migrations.RunPython.noop),
+    ]
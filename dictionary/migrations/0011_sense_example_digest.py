@@ -0,0 +1,23 @@
+# Generated by Django 3.0.7 on 2026-10-18 13:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0010_entry_digest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='example',
+            name='digest',
+            field=models.CharField(blank=True, max_length=40, null=True, verbose_name='Content Digest'),
+        ),
+        migrations.AddField(
+            model_name='sense',
+            name='digest',
+            field=models.CharField(blank=True, max_length=40, null=True, verbose_name='Content Digest'),
+        ),
+    ]
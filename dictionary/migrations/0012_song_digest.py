@@ -0,0 +1,18 @@
+# Generated by Django 3.0.7 on 2026-10-18 13:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0011_sense_example_digest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='song',
+            name='digest',
+            field=models.CharField(blank=True, max_length=40, null=True, verbose_name='Corpus Row Digest'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 3.0.7 on 2026-10-18 13:43
+
+import zlib
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def move_lyrics(apps, schema_editor):
+    Song = apps.get_model('dictionary', 'Song')
+    SongLyrics = apps.get_model('dictionary', 'SongLyrics')
+    batch = list()
+    for song_id, text in Song.objects.exclude(lyrics__isnull=True).values_list('id', 'lyrics').iterator():
+        if settings.COMPRESS_SONG_LYRICS:
+            batch.append(SongLyrics(song_id=song_id, compressed=zlib.compress(text.encode('utf-8'))))
+        else:
+            batch.append(SongLyrics(song_id=song_id, text=text))
+        if len(batch) == 1000:
+            SongLyrics.objects.bulk_create(batch)
+            batch = list()
+    SongLyrics.objects.bulk_create(batch)
+
+
+def restore_lyrics(apps, schema_editor):
+    Song = apps.get_model('dictionary', 'Song')
+    SongLyrics = apps.get_model('dictionary', 'SongLyrics')
+    for stored in SongLyrics.objects.iterator():
+        text = zlib.decompress(bytes(stored.compressed)).decode('utf-8') if stored.compressed is not None else stored.text
+        Song.objects.filter(id=stored.song_id).update(lyrics=text)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0012_song_digest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SongLyrics',
+            fields=[
+                ('song', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='dictionary.Song')),
+                ('text', models.TextField(blank=True, null=True, verbose_name='Lyrics')),
+                ('compressed', models.BinaryField(blank=True, null=True, verbose_name='Compressed Lyrics')),
+            ],
+        ),
+        migrations.RunPython(move_lyrics, restore_lyrics),
+        migrations.RemoveField(
+            model_name='song',
+            name='lyrics',
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.0.7 on 2026-10-18 14:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionary', '0013_song_lyrics'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='songlyrics',
+            name='song',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='lyrics_store', serialize=False, to='dictionary.Song'),
+        ),
+    ]
@@ -2,13 +2,18 @@ from collections import Counter, OrderedDict
 import operator
 import math
 import logging
+import zlib
 from collections import namedtuple
+from django.conf import settings
 from django.db import models
 from django.db.models import Count
 from django.contrib.postgres.fields import JSONField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.urls import reverse
 
-from dictionary.utils import slugify, extract_short_name
+from dictionary.data_version import bump_data_version
+from dictionary.utils import slugify, extract_short_name, rerender_linked_lyrics
 
 logger = logging.getLogger(__name__)
 
@@ -73,7 +78,7 @@ class Artist(models.Model):
         return OrderedDict(sorted(results.items(), key=operator.itemgetter(1), reverse=True))
 
     def get_salient_senses(self):
-        return Salience.objects.filter(artist=self).order_by("-score")
+        return Salience.objects.filter(artist=self).order_by("artist_rank", "-score")
 
 
 class Editor(models.Model):
@@ -102,6 +107,7 @@ class Entry(models.Model):
     pub_date = models.DateTimeField('Date Published', auto_now_add=True, blank=True)
     last_updated = models.DateField('Last Updated', auto_now=True, null=True, blank=True)
     json = JSONField(null=True, blank=True)
+    digest = models.CharField('Content Digest', max_length=40, null=True, blank=True)
     senses = models.ManyToManyField('Sense', related_name='+', blank=True)
 
     class Meta:
@@ -111,6 +117,24 @@ class Entry(models.Model):
     def __str__(self):
         return self.headword
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        entry = super().from_db(db, field_names, values)
+        entry._stored_publish = entry.__dict__.get('publish')
+        return entry
+
+    def save(self, *args, **kwargs):
+        """
+        Publishing or unpublishing an entry (or creating a published one) re-renders the linked lyrics
+        pointing at it & marks the published data as changed
+        """
+        republished = self.publish != bool(getattr(self, '_stored_publish', False))
+        super().save(*args, **kwargs)
+        self._stored_publish = self.publish
+        if republished:
+            rerender_linked_lyrics([self.slug])
+            bump_data_version()
+
     def get_senses_ordered_by_example_count(self):
         return [sense for sense in self.senses.annotate(num_examples=Count('examples')).order_by('-num_examples')]
 
@@ -176,6 +200,7 @@ class Sense(models.Model):
     xml_id = models.CharField('XML id', db_index=True, max_length=50, null=True, blank=True)
     part_of_speech = models.CharField('Part of Speech', max_length=100)
     json = JSONField(null=True, blank=True)
+    digest = models.CharField('Content Digest', max_length=40, null=True, blank=True)
     parent_entry = models.ManyToManyField(Entry, through=Entry.senses.through, related_name="+")
     definition = models.CharField(max_length=2000, null=True, blank=True)
     etymology = models.CharField(max_length=2000, null=True, blank=True)
@@ -245,9 +270,15 @@ class Salience(models.Model):
     artist = models.ForeignKey(Artist, on_delete=models.CASCADE)
     sense = models.ForeignKey(Sense, on_delete=models.CASCADE)
     score = models.FloatField()
+    artist_rank = models.IntegerField(null=True, blank=True)
+    sense_rank = models.IntegerField(null=True, blank=True)
 
     class Meta:
         ordering = ["score"]
+        indexes = [
+            models.Index(fields=['artist', 'artist_rank']),
+            models.Index(fields=['sense', 'sense_rank']),
+        ]
 
     def __str__(self):
         return self.artist.name + ' / ' + self.sense.headword + ' (' + self.sense.xml_id + '): ' + str(self.score)
@@ -283,9 +314,9 @@ class Song(models.Model):
     release_date_string = models.CharField('Release Date String', max_length=10, blank=True, null=True)
     album = models.CharField('Album', max_length=200)
     examples = models.ManyToManyField('Example', db_index=True, related_name="+", blank=True)
-    lyrics = models.TextField('Lyrics', null=True, blank=True)
     release_date_verified = models.BooleanField('Release Date Verified', default=False)
     spot_uri = models.CharField('Spot URI', max_length=200, blank=True, null=True)
+    digest = models.CharField('Corpus Row Digest', max_length=40, null=True, blank=True)
 
     class Meta:
         ordering = ["title", "artist_name"]
@@ -296,6 +327,22 @@ class Song(models.Model):
     def get_absolute_url(self):
         return reverse('song', args=[str(self.slug)])
 
+    def get_lyrics(self):
+        """
+        Loads the song's lyrics from their own table, which song queries never do unless asked to with
+        select_related('lyrics_store'), as callers serialising lists of songs should
+        """
+        try:
+            return self.lyrics_store.get_text()
+        except SongLyrics.DoesNotExist:
+            return None
+
+    def set_lyrics(self, text):
+        packed = SongLyrics.pack(self.pk, text)
+        stored, _ = SongLyrics.objects.update_or_create(song_id=self.pk, defaults=dict(text=packed.text,
+                                                                                       compressed=packed.compressed))
+        self.lyrics_store = stored
+
     def as_dict(self):
         return {
             "id": self.id,
@@ -307,12 +354,45 @@ class Song(models.Model):
             "release_date": self.release_date,
             "release_date_string": self.release_date_string,
             "album": self.album,
-            "lyrics": self.lyrics,
+            "lyrics": self.get_lyrics(),
             "release_date_verified": self.release_date_verified,
             "spot_uri": self.spot_uri
         }
 
 
+class SongLyrics(models.Model):
+    """
+    A song's lyrics, kept out of the song table so that listing songs doesn't haul them along,
+    & stored zlib-compressed when settings.COMPRESS_SONG_LYRICS is on
+    """
+    song = models.OneToOneField(Song, on_delete=models.CASCADE, primary_key=True, related_name="lyrics_store")
+    text = models.TextField('Lyrics', null=True, blank=True)
+    compressed = models.BinaryField('Compressed Lyrics', null=True, blank=True)
+
+    def __str__(self):
+        return 'Lyrics of ' + str(self.song_id)
+
+    def get_text(self):
+        if self.compressed is not None:
+            return zlib.decompress(bytes(self.compressed)).decode('utf-8')
+        return self.text
+
+    @staticmethod
+    def pack(song_id, text):
+        if text is not None and settings.COMPRESS_SONG_LYRICS:
+            return SongLyrics(song_id=song_id, compressed=zlib.compress(text.encode('utf-8')))
+        return SongLyrics(song_id=song_id, text=text)
+
+    @staticmethod
+    def store(lyrics):
+        """Sets the lyrics of each song id -> text given, updating the rows of songs that have some in place"""
+        existing = set(SongLyrics.objects.filter(song_id__in=list(lyrics)).values_list('song_id', flat=True))
+        packed = [SongLyrics.pack(song_id, text) for song_id, text in lyrics.items()]
+        SongLyrics.objects.bulk_update([p for p in packed if p.song_id in existing], ['text', 'compressed'],
+                                       batch_size=1000)
+        SongLyrics.objects.bulk_create([p for p in packed if p.song_id not in existing], batch_size=1000)
+
+
 SynSetParsed = namedtuple("SynSetParsed", ["name", "slug"])
 SynSetRelations = namedtuple("SynSetRelations", ["senses"])
 
@@ -502,7 +582,10 @@ class Example(models.Model):
     release_date_string = models.CharField('Release Date String', max_length=10, blank=True, null=True)
     album = models.CharField('Album', max_length=200)
     lyric_text = models.CharField('Lyric Text', max_length=1000)
+    linked_lyric = models.TextField('Linked Lyric', blank=True, null=True)
+    search_vector = SearchVectorField(null=True, editable=False)
     json = JSONField(null=True, blank=True)
+    digest = models.CharField('Content Digest', max_length=40, null=True, blank=True)
     example_rhymes = models.ManyToManyField('ExampleRhyme', related_name="+")
     illustrates_senses = models.ManyToManyField(Sense, through=Sense.examples.through, related_name="+")
     features_entities = models.ManyToManyField('NamedEntity', db_index=True, related_name="+", blank=True)
@@ -510,13 +593,18 @@ class Example(models.Model):
 
     class Meta:
         ordering = ["release_date", "artist_name"]
+        indexes = [GinIndex(fields=['search_vector'])]
 
     def __str__(self):
         return '[' + str(self.release_date_string) + '] ' + str(self.artist_name) + ' - ' + str(self.lyric_text)
 
     def spot_link(self):
         uri = self.from_song.values_list("spot_uri").first()
-        return f"""https://open.spotify.com{uri[0].lstrip("spotify").replace(":", "/")}""" if uri and len(uri) > 0 and uri[0] else None
+        return self.format_spot_link(uri[0]) if uri and len(uri) > 0 else None
+
+    @staticmethod
+    def format_spot_link(uri):
+        return f"""https://open.spotify.com{uri.lstrip("spotify").replace(":", "/")}""" if uri else None
 
 
 ExampleRhymeParsed = namedtuple("ExampleRhymeParsed", ["word_one", "word_two", "word_one_slug", "word_two_slug", "word_two_target_id", "word_one_position", "word_two_position"])
@@ -0,0 +1,75 @@
+from bisect import bisect_left
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+import dictionary.models
+from dictionary.data_version import get_data_version
+
+
+ENTRY = 'entry'
+FORM = 'form'
+ARTIST = 'artist'
+ENTITY = 'entity'
+
+
+class Suggestion(NamedTuple):
+    type: str
+    label: str
+    slug: str
+
+
+class PrefixIndex:
+    """
+    Published headwords, their forms, artist names & entity labels in one array sorted by lowercased label,
+    so that autocomplete is a bisect to the first match & a short walk forward, without touching the database
+    """
+
+    def __init__(self, version: str, suggestions: Iterable[Suggestion]):
+        self.version = version
+        seen = set()
+        keyed = list()
+        for suggestion in suggestions:
+            key = suggestion.label.lower()
+            if (key, suggestion.slug) not in seen:
+                seen.add((key, suggestion.slug))
+                keyed.append((key, suggestion))
+        keyed.sort(key=lambda k: k[0])
+        self.keys: List[str] = [k for k, _ in keyed]
+        self.suggestions: List[Suggestion] = [s for _, s in keyed]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def search(self, prefix: str, limit: int = 20, types: Optional[Tuple[str, ...]] = None) -> List[Suggestion]:
+        prefix = prefix.lower()
+        results = list()
+        i = bisect_left(self.keys, prefix)
+        while i < len(self.keys) and len(results) < limit and self.keys[i].startswith(prefix):
+            if types is None or self.suggestions[i].type in types:
+                results.append(self.suggestions[i])
+            i += 1
+        return results
+
+    @staticmethod
+    def build(version: str) -> 'PrefixIndex':
+        # entries come first, so that a form spelled like its headword is dropped as a duplicate
+        entries = dictionary.models.Entry.objects.filter(publish=True).values_list('headword', 'slug')
+        forms = dictionary.models.Form.objects.filter(parent_entry__publish=True).values_list('label', 'parent_entry__slug')
+        artists = dictionary.models.Artist.objects.values_list('name', 'slug')
+        entities = dictionary.models.NamedEntity.objects.exclude(pref_label__isnull=True).values_list('pref_label', 'pref_label_slug')
+        suggestions = [Suggestion(ENTRY, label, slug) for label, slug in entries]
+        suggestions += [Suggestion(FORM, label, slug) for label, slug in forms]
+        suggestions += [Suggestion(ARTIST, label, slug) for label, slug in artists if label]
+        suggestions += [Suggestion(ENTITY, label, slug) for label, slug in entities if label]
+        return PrefixIndex(version, suggestions)
+
+
+_index: Optional[PrefixIndex] = None
+
+
+def get_prefix_index() -> PrefixIndex:
+    """Returns this worker's index, rebuilding it only if the data version has moved on since it was built"""
+    global _index
+    version = get_data_version()
+    if _index is None or _index.version != version:
+        _index = PrefixIndex.build(version)
+    return _index
@@ -0,0 +1,57 @@
+from typing import FrozenSet, Optional, Tuple
+
+from django.db.models.functions import Lower
+
+import dictionary.models
+from dictionary.data_version import get_data_version
+
+
+class PublishedIndex:
+    """
+    The slugs & headwords of every published entry, held as frozensets so that
+    the "is this link target published?" checks made for every lyric link are O(1),
+    along with the slugs in A-Z sort_key order & each slug's position in it, for prev/next navigation
+    """
+
+    def __init__(self, version: str, ordered_slugs: Tuple[str, ...], headwords: FrozenSet[str]):
+        self.version = version
+        self.ordered_slugs = ordered_slugs
+        self.positions = {slug: i for i, slug in enumerate(ordered_slugs)}
+        self.slugs = frozenset(ordered_slugs)
+        self.headwords = headwords
+
+    def __contains__(self, slug):
+        return slug in self.slugs
+
+    def __len__(self):
+        return len(self.slugs)
+
+    def neighbours(self, slug: str) -> Tuple[Optional[str], Optional[str]]:
+        """Returns the slugs of the published entries either side of this one in A-Z order"""
+        i = self.positions.get(slug)
+        if i is None:
+            return None, None
+        preceding = self.ordered_slugs[i-1] if i > 0 else None
+        following = self.ordered_slugs[i+1] if i+1 < len(self.ordered_slugs) else None
+        return preceding, following
+
+    @staticmethod
+    def build(version: str) -> 'PublishedIndex':
+        rows = dictionary.models.Entry.objects.filter(publish=True).order_by(Lower('sort_key'), 'headword').values_list('slug', 'headword')
+        ordered_slugs, headwords = list(), set()
+        for slug, headword in rows:
+            ordered_slugs.append(slug)
+            headwords.add(headword)
+        return PublishedIndex(version, tuple(ordered_slugs), frozenset(headwords))
+
+
+_index: Optional[PublishedIndex] = None
+
+
+def get_published_index() -> PublishedIndex:
+    """Returns this worker's index, rebuilding it only if the data version has moved on since it was built"""
+    global _index
+    version = get_data_version()
+    if _index is None or _index.version != version:
+        _index = PublishedIndex.build(version)
+    return _index
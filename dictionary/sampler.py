@@ -0,0 +1,70 @@
+import datetime
+import random
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import dictionary.models
+from dictionary.data_version import get_data_version
+
+
+# the querysets each random endpoint may draw from
+ELIGIBLE: Dict[str, Callable[[], Any]] = {
+    'artist': lambda: dictionary.models.Artist.objects.all(),
+    'entry': lambda: dictionary.models.Entry.objects.filter(publish=True),
+    'example': lambda: dictionary.models.Example.objects.all(),
+    'place': lambda: dictionary.models.Place.objects.filter(longitude__isnull=False),
+    'sense': lambda: dictionary.models.Sense.objects.filter(publish=True),
+    'song': lambda: dictionary.models.Song.objects.all(),
+}
+
+
+class Sampler:
+    """
+    Keeps the primary keys eligible for each random endpoint in memory, loaded on first use,
+    so that drawing k distinct rows is random.sample over an array followed by one in_bulk query,
+    rather than an ORDER BY random() sort of the whole table
+    """
+
+    def __init__(self, version: str):
+        self.version = version
+        self.pools: Dict[str, Tuple[Any, ...]] = dict()
+
+    def pool(self, name: str) -> Tuple[Any, ...]:
+        if name not in self.pools:
+            self.pools[name] = tuple(ELIGIBLE[name]().order_by('pk').values_list('pk', flat=True))
+        return self.pools[name]
+
+    def sample_ids(self, name: str, k: int = 1, seed: Optional[str] = None) -> List[Any]:
+        ids = self.pool(name)
+        rng = random.Random(seed) if seed is not None else random
+        return rng.sample(ids, min(k, len(ids)))
+
+    def sample(self, name: str, k: int = 1, seed: Optional[str] = None) -> List[Any]:
+        ids = self.sample_ids(name, k, seed)
+        objects = ELIGIBLE[name]().in_bulk(ids)
+        if len(objects) < len(ids):
+            # rows deleted (or no longer eligible) since the pool was loaded: reload it once & draw again
+            del self.pools[name]
+            ids = self.sample_ids(name, k, seed)
+            objects = ELIGIBLE[name]().in_bulk(ids)
+        return [objects[i] for i in ids if i in objects]
+
+    def choice(self, name: str, seed: Optional[str] = None) -> Optional[Any]:
+        sampled = self.sample(name, 1, seed)
+        return sampled[0] if sampled else None
+
+    def word_of_the_day(self, day: Optional[datetime.date] = None) -> Optional[Any]:
+        """The same published entry for everyone for the whole of a given day"""
+        day = day or datetime.date.today()
+        return self.choice('entry', seed=day.isoformat())
+
+
+_sampler: Optional[Sampler] = None
+
+
+def get_sampler() -> Sampler:
+    """Returns this worker's sampler, dropping its pools if the data version has moved on since they were loaded"""
+    global _sampler
+    version = get_data_version()
+    if _sampler is None or _sampler.version != version:
+        _sampler = Sampler(version)
+    return _sampler
@@ -0,0 +1,63 @@
+from typing import Dict, Optional, Tuple
+
+import dictionary.models
+from dictionary.data_version import get_data_version
+
+
+DEFINITE_ARTICLE_SUFFIX = '-the'
+
+
+class SlugResolver:
+    """
+    Maps the slug of an exact search query to the (view name, slug) it should redirect to,
+    covering forms, published entries, artists, person entities & "the"-moved variants ("the-x" for "x-the")
+    """
+
+    def __init__(self, version: str, targets: Dict[str, Tuple[str, str]]):
+        self.version = version
+        self.targets = targets
+
+    def __len__(self):
+        return len(self.targets)
+
+    def resolve(self, slug: str) -> Optional[Tuple[str, str]]:
+        return self.targets.get(slug)
+
+    @staticmethod
+    def build(version: str) -> 'SlugResolver':
+        targets = dict()
+        forms = dictionary.models.Form.objects.filter(parent_entry__publish=True)\
+            .order_by('slug', 'parent_entry__headword').values_list('slug', 'parent_entry__slug')
+        entries = list(dictionary.models.Entry.objects.filter(publish=True).values_list('slug', flat=True))
+        artists = list(dictionary.models.Artist.objects.values_list('slug', flat=True))
+        entities = dictionary.models.NamedEntity.objects.filter(entity_type='person').values_list('pref_label_slug', flat=True)
+
+        # setdefault keeps the first target for a slug, so the order below is the order of precedence
+        for slug, entry_slug in forms:
+            targets.setdefault(slug, ('entry', entry_slug))
+        for slug in entries:
+            targets.setdefault(slug, ('entry', slug))
+        for slug in artists:
+            targets.setdefault(slug, ('artist', slug))
+        for slug in entities:
+            if slug:
+                targets.setdefault(slug, ('entity', slug))
+        for slug in entries:
+            if slug.endswith(DEFINITE_ARTICLE_SUFFIX):
+                targets.setdefault('the-' + slug[:-len(DEFINITE_ARTICLE_SUFFIX)], ('entry', slug))
+        for slug in artists:
+            if slug.endswith(DEFINITE_ARTICLE_SUFFIX):
+                targets.setdefault('the-' + slug[:-len(DEFINITE_ARTICLE_SUFFIX)], ('artist', slug))
+        return SlugResolver(version, targets)
+
+
+_resolver: Optional[SlugResolver] = None
+
+
+def get_slug_resolver() -> SlugResolver:
+    """Returns this worker's resolver, rebuilding it only if the data version has moved on since it was built"""
+    global _resolver
+    version = get_data_version()
+    if _resolver is None or _resolver.version != version:
+        _resolver = SlugResolver.build(version)
+    return _resolver
@@ -0,0 +1,81 @@
+from django.test import TestCase
+
+from dictionary.ingestion.artist_alias_parser import ArtistAliasParser
+from dictionary.ingestion.artist_membership_parser import ArtistMembershipParser
+from dictionary.ingestion.artist_metadata_persister import ArtistMetadataPersister
+from dictionary.ingestion.artist_origin_parser import ArtistOriginParser
+from dictionary.models import Artist, Place
+
+
+ORIGINS = [['RZA', 'Staten Island, New York, USA', '40.5795317', '-74.1502007'],
+           ['GZA', 'Brooklyn, New York, USA', '40.6781784', '-73.9441579']]
+ALIASES = [['RZA', 'Bobby Digital']]
+MEMBERSHIPS = [['RZA', 'Wu-Tang Clan'], ['GZA', 'Wu-Tang Clan']]
+
+
+def persist(origins=ORIGINS, aliases=ALIASES, memberships=MEMBERSHIPS, replace=False) -> ArtistMetadataPersister:
+    persister = ArtistMetadataPersister(replace)
+    for row in origins:
+        persister.collect_origin(ArtistOriginParser.extract(row))
+    for row in aliases:
+        persister.collect_aliases(ArtistAliasParser.extract(row))
+    for row in memberships:
+        persister.collect_membership(ArtistMembershipParser.extract(row))
+    persister.persist()
+    return persister
+
+
+class TestArtistMetadataPersister(TestCase):
+
+    def test_persists_links(self):
+        counts = persist().counts
+        rza = Artist.objects.get(slug='rza')
+        self.assertEqual([place.slug for place in rza.origin.all()], ['staten-island-new-york-usa'])
+        self.assertEqual([alias.slug for alias in rza.also_known_as.all()], ['bobby-digital'])
+        self.assertEqual([alias.slug for alias in Artist.objects.get(slug='bobby-digital').also_known_as.all()], ['rza'])
+        self.assertEqual(sorted(member.slug for member in Artist.objects.get(slug='wu-tang-clan').members.all()),
+                         ['gza', 'rza'])
+        self.assertEqual(Place.objects.get(slug='brooklyn-new-york-usa').full_name, 'Brooklyn, New York, USA')
+        self.assertEqual(counts['artists created'], 4)
+        self.assertEqual(counts['also_known_as added'], 2)
+
+    def test_rerun_writes_nothing(self):
+        persist()
+        # savepoint & release, then a read per model & one per relation
+        with self.assertNumQueries(7):
+            counts = persist().counts
+        self.assertFalse(any(counts.values()))
+
+    def test_removed_row_keeps_link(self):
+        persist()
+        counts = persist(memberships=MEMBERSHIPS[:1] + [['GZA', 'Sunz of Man']]).counts
+        self.assertEqual(sorted(group.slug for group in Artist.objects.get(slug='gza').member_of.all()),
+                         ['sunz-of-man', 'wu-tang-clan'])
+        self.assertEqual((counts['member_of added'], counts['member_of removed']), (1, 0))
+
+    def test_replace_removes_link(self):
+        persist()
+        counts = persist(memberships=MEMBERSHIPS[:1] + [['GZA', 'Sunz of Man']], replace=True).counts
+        self.assertEqual([group.slug for group in Artist.objects.get(slug='gza').member_of.all()], ['sunz-of-man'])
+        self.assertEqual((counts['member_of added'], counts['member_of removed']), (1, 1))
+
+    def test_replace_keeps_links_of_artists_not_listed(self):
+        persist()
+        persist(origins=ORIGINS[1:], aliases=[], memberships=[], replace=True)
+        self.assertTrue(Artist.objects.get(slug='rza').origin.exists())
+
+    def test_alias_added_elsewhere(self):
+        rza = Artist.objects.create(slug='rza', name='RZA')
+        rza.also_known_as.add(Artist.objects.create(slug='prince-rakeem', name='Prince Rakeem'))
+        persist()
+        self.assertEqual(sorted(alias.slug for alias in rza.also_known_as.all()), ['bobby-digital', 'prince-rakeem'])
+        counts = persist(replace=True).counts
+        self.assertEqual([alias.slug for alias in rza.also_known_as.all()], ['bobby-digital'])
+        self.assertFalse(Artist.objects.get(slug='prince-rakeem').also_known_as.exists())
+        self.assertEqual(counts['also_known_as removed'], 2)
+
+    def test_renames_artist(self):
+        persist()
+        counts = persist(aliases=[], memberships=[['RZA', 'Wu-Tang clan']]).counts
+        self.assertEqual(Artist.objects.get(slug='wu-tang-clan').name, 'Wu-Tang clan')
+        self.assertEqual(counts['artists renamed'], 1)
@@ -0,0 +1,86 @@
+import io
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from dictionary.ingestion.bulk_persister import BulkPersister, EXAMPLE_RELATIONS, SENSE_RELATIONS
+from dictionary.ingestion.dictionary_parser import DictionaryParser
+from dictionary.models import Entry, Form, Sense, Artist, Example, Song, LyricLink, ExampleRhyme, NamedEntity, Xref, \
+    Collocate
+from dictionary.tests.base import BaseXMLParserTest
+
+
+RELATIONS = (Entry.forms, Entry.senses, Song.artist, Song.feat_artist, Artist.primary_senses, Artist.featured_senses) + \
+            EXAMPLE_RELATIONS + SENSE_RELATIONS
+
+
+def snapshot():
+    rows = {model.__name__: model.objects.count() for model in
+            (Entry, Form, Sense, Artist, Example, Song, LyricLink, ExampleRhyme, NamedEntity, Xref, Collocate)}
+    for relation in RELATIONS:
+        names = (relation.field.m2m_field_name() + '_id', relation.field.m2m_reverse_field_name() + '_id')
+        rows[relation.through.__name__] = set(relation.through.objects.values_list(*names))
+    return rows
+
+
+class TestBulkPersister(BaseXMLParserTest):
+
+    def setUp(self):
+        super().setUp()
+        self.entry_nts = DictionaryParser.parse(self.xml_dict)
+
+    def test_persist(self):
+        entries = DictionaryParser.bulk_process_entries(self.entry_nts)
+        self.assertEqual([entry.slug for entry in entries], ['zootie'])
+        zootie = Entry.objects.get(slug='zootie')
+        self.assertEqual(zootie.senses.count(), 1)
+        self.assertEqual(zootie.forms.count(), 1)
+        sense = zootie.senses.get()
+        self.assertEqual(sense.examples.count(), 5)
+        self.assertTrue(Sense.objects.filter(xml_id='e9000_intrV_1').exists())
+        self.assertTrue(all(example.linked_lyric for example in Example.objects.all()))
+
+    def test_matches_row_by_row(self):
+        DictionaryParser.bulk_process_entries(self.entry_nts)
+        bulk = snapshot()
+        DictionaryParser.process_entries(self.entry_nts, force_update=True)
+        self.assertEqual(snapshot(), bulk)
+
+    def test_row_by_row_then_bulk(self):
+        DictionaryParser.process_entries(self.entry_nts)
+        row_by_row = snapshot()
+        DictionaryParser.bulk_process_entries(self.entry_nts, force_update=True)
+        self.assertEqual(snapshot(), row_by_row)
+
+    def test_fewer_queries(self):
+        with CaptureQueriesContext(connection) as row_by_row:
+            DictionaryParser.process_entries(self.entry_nts, force_update=True)
+        with CaptureQueriesContext(connection) as bulk:
+            DictionaryParser.bulk_process_entries(self.entry_nts, force_update=True)
+        self.assertLess(len(bulk), len(row_by_row) / 3)
+
+    def test_unchanged_entries_skipped(self):
+        DictionaryParser.bulk_process_entries(self.entry_nts)
+        persister = BulkPersister()
+        persister.persist(self.entry_nts)
+        self.assertEqual(dict(persister.rows), dict())
+        self.assertEqual(dict(persister.links), dict())
+
+    def test_shared_examples_keep_links(self):
+        with open("dictionary/tests/resources/zootie.xml") as f:
+            zootie = f.read()
+        entry = zootie[zootie.index('<entry'):zootie.index('</entry>') + len('</entry>')]
+        other = entry.replace('sk="zootie"', 'sk="zooties"').replace('<headword>zootie', '<headword>zooties') \
+            .replace('<form freq="5">zootie', '<form freq="5">zooties').replace('id="e11730', 'id="e11731')
+        DictionaryParser.bulk_process_entries(
+            list(DictionaryParser.iter_parse(io.BytesIO(zootie.replace(entry, entry + other).encode()))))
+        zooties = Sense.objects.get(xml_id='e11731_n_1')
+        self.assertEqual(zooties.examples.count(), 5)
+        # a new definition changes the sense & dropping an xref one of its examples, but not the other entry's
+        edited = entry.replace('laced with cocaine', 'laced with crack') \
+            .replace('<xref target="e9000_intrV_1" position="24" lemma="ride">riding</xref>', 'riding')
+        DictionaryParser.bulk_process_entries(
+            list(DictionaryParser.iter_parse(io.BytesIO(zootie.replace(entry, edited).encode()))))
+        self.assertEqual(zooties.examples.count(), 5)
+        self.assertEqual(Sense.objects.get(xml_id='e11730_n_1').examples.count(), 5)
+        self.assertFalse(Sense.objects.get(xml_id='e9000_intrV_1').examples.exists())
@@ -0,0 +1,56 @@
+import os
+import sqlite3
+import tempfile
+
+from django.test import TestCase
+
+from dictionary.management.commands.corpus_handler import main
+from dictionary.models import Artist, Song
+
+
+COLUMNS = "xml_id, artist, album, release_date, song_title, feat, lyrics, discogs_date, rel_date_verified, lyrics_verified"
+ROWS = [
+    ('s1', 'RZA', 'Bobby Digital', '1998-11-24', 'Terrorist', 'GZA; Method Man', 'lyrics one', None, 'MBK', 1),
+    ('s2', 'RZA', 'Bobby Digital', 0, 'Domestic Violence', '', 'lyrics two', None, '', 0),
+]
+
+
+class TestCorpusHandler(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.location = os.path.join(self.directory.name, 'HH.db')
+        self.write_rows(ROWS)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_rows(self, rows):
+        conn = sqlite3.connect(self.location)
+        conn.execute(f"create table if not exists Songs ({COLUMNS})")
+        conn.execute("delete from Songs")
+        conn.executemany("insert into Songs values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.commit()
+        conn.close()
+
+    def test_import(self):
+        main(self.location, batch_size=1)
+        song = Song.objects.get(xml_id='s1')
+        self.assertEqual((song.slug, song.artist_slug, song.get_lyrics()), ('rza-terrorist', 'rza', 'lyrics one'))
+        self.assertTrue(song.release_date_verified)
+        self.assertEqual(list(song.artist.all()), [Artist.objects.get(slug='rza')])
+        self.assertEqual({a.slug for a in song.feat_artist.all()}, {'gza', 'method-man'})
+        self.assertEqual(Song.objects.get(xml_id='s2').release_date_string, '0001-01-01')
+
+    def test_unchanged_rows_skipped(self):
+        main(self.location)
+        # the artist map, & a savepoint around a song lookup
+        with self.assertNumQueries(4):
+            main(self.location)
+
+    def test_changed_lyrics_synced(self):
+        main(self.location)
+        self.write_rows([ROWS[0][:6] + ('lyrics revised',) + ROWS[0][7:], ROWS[1]])
+        main(self.location)
+        self.assertEqual(Song.objects.get(xml_id='s1').get_lyrics(), 'lyrics revised')
+        self.assertEqual(Song.objects.count(), 2)
@@ -1,4 +1,7 @@
+import io
+
 from dictionary.ingestion.dictionary_parser import DictionaryParser
+from dictionary.models import Entry
 from dictionary.tests.base import BaseTest
 
 
@@ -6,4 +9,33 @@ class TestDictionaryParser(BaseTest):
 
     def test_no_dictionary_key(self):
         with self.assertRaises(Exception):
-            DictionaryParser.parse({})
\ No newline at end of file
+            DictionaryParser.parse({})
+
+    def test_persist_stream(self):
+        for bulk in (False, True):
+            entry_nts = DictionaryParser.iter_parse("dictionary/tests/resources/zootie.xml")
+            self.assertEqual(DictionaryParser.persist_stream(entry_nts, force_update=True, bulk=bulk), 1)
+            self.assertEqual(Entry.objects.get(slug='zootie').senses.count(), 1)
+
+    def test_malformed_entry_skipped(self):
+        with open("dictionary/tests/resources/zootie.xml") as f:
+            zootie = f.read()
+        entry = zootie[zootie.index('<entry'):zootie.index('</entry>') + len('</entry>')]
+        unpublishable = entry.replace(' publish="yes"', '').replace('zootie', 'broken')
+        second = entry.replace('zootie', 'zooties')
+        xml = zootie.replace(entry, entry + unpublishable + second)
+        entry_nts = DictionaryParser.iter_parse(io.BytesIO(xml.encode('utf-8')))
+        self.assertEqual(DictionaryParser.persist_stream(entry_nts, force_update=True), 2)
+        self.assertEqual(sorted(Entry.objects.values_list('slug', flat=True)), ['mad', 'zootie', 'zooties'])
+
+    def test_failed_entry_rolled_back_alone(self):
+        zootie = next(DictionaryParser.iter_parse("dictionary/tests/resources/zootie.xml"))
+        broken = zootie._replace(headword='broken', slug='broken', xml_dict={'head': {'headword': 'broken'}})
+        for bulk in (False, True):
+            self.assertEqual(DictionaryParser.persist_stream([broken, zootie], force_update=True, bulk=bulk), 1)
+            self.assertTrue(Entry.objects.filter(slug='zootie').exists())
+            self.assertFalse(Entry.objects.filter(slug='broken').exists())
+
+    def test_batches_of_one(self):
+        entry_nts = DictionaryParser.iter_parse("dictionary/tests/resources/zootie.xml")
+        self.assertEqual(DictionaryParser.persist_stream(entry_nts, batch_size=1), 1)
@@ -0,0 +1,42 @@
+import pickle
+from unittest import mock
+
+from django.test import TestCase
+
+from dictionary.data_version import get_data_version
+from dictionary.ingestion.dictionary_parser import DictionaryParser
+from dictionary.ingestion.directory_loader import DirectoryLoader
+from dictionary.models import Entry
+
+
+class TestDirectoryLoader(TestCase):
+
+    def setUp(self):
+        self.xml_files = sorted(DirectoryLoader.collect_xml_files("dictionary/tests/resources"))
+        self.well_formed = [xml for xml in self.xml_files if "malformed" not in xml]
+
+    def test_parse_xml_is_picklable(self):
+        entry_tuples = DirectoryLoader.parse_xml("dictionary/tests/resources/zootie.xml")
+        self.assertEqual(pickle.loads(pickle.dumps(entry_tuples)), entry_tuples)
+
+    def test_pool_keeps_file_order(self):
+        in_process = [(xml, list(entry_tuples)) for xml, entry_tuples in DirectoryLoader.parse_xml_files(self.well_formed, workers=1)]
+        pooled = list(DirectoryLoader.parse_xml_files(self.well_formed, workers=2))
+        self.assertEqual([xml for xml, _ in pooled], self.well_formed)
+        self.assertEqual(pooled, in_process)
+
+    def test_failed_run_still_bumps_data_version(self):
+        version = get_data_version()
+        with mock.patch.object(DictionaryParser, 'persist_stream', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                DirectoryLoader.process_xml(self.well_formed, workers=1)
+        self.assertNotEqual(get_data_version(), version)
+
+    def test_process_xml_with_workers(self):
+        DirectoryLoader.process_xml(self.xml_files, workers=2)
+        self.assertEqual(Entry.objects.count(), len(self.well_formed))
+        self.assertTrue(Entry.objects.filter(slug='zootie').exists())
+
+    def test_process_xml_streamed(self):
+        DirectoryLoader.process_xml(self.xml_files, workers=1)
+        self.assertEqual(Entry.objects.count(), len(self.well_formed))
@@ -1,8 +1,10 @@
 from typing import List
 
+from dictionary.ingestion.dictionary_parser import DictionaryParser
 from dictionary.ingestion.entry_parser import EntryParser
 from dictionary.models import Entry, Form, EntryParsed, FormParsed
 from dictionary.tests.base import BaseXMLParserTest
+from dictionary.utils import content_digest
 
 
 class TestEntryParser(BaseXMLParserTest):
@@ -24,16 +26,13 @@ class TestEntryParser(BaseXMLParserTest):
         print(queried.senses.all())
         self.assertNotEqual(list(queried.senses.all()), list())
 
-    def test_purge_relations(self):
-        self.assertEqual(Form.objects.count(), 0)
+    def test_update_relations_drops_stale_forms(self):
         entry, relations = EntryParser.persist(self.zootie_entry_nt)
+        entry.forms.add(Form.objects.create(slug='zooties', label='zooties'))
+        self.assertEqual(entry.forms.count(), 2)
 
         entry_updated, _ = EntryParser.update_relations(entry, self.zootie_entry_nt, True)
-        self.assertEqual(entry_updated.forms.count(), 1)
-        self.assertEqual(Form.objects.count(), 1)
-
-        entry_purged = EntryParser.purge_relations(entry_updated)
-        self.assertEqual(entry_purged.forms.count(), 0)
+        self.assertEqual([form.slug for form in entry_updated.forms.all()], ['zootie'])
 
     def test_persist_and_update(self):
         _, _ = EntryParser.persist(self.zootie_entry_nt)
@@ -74,4 +73,18 @@ class TestEntryParser(BaseXMLParserTest):
         exx = [e for e in sense_updated.examples.all()]
         self.assertTrue(exx[-1].lyric_text.endswith("pass the zootie, yo"))
 
+    def test_persist_stores_digest(self):
+        entry, _ = EntryParser.persist(self.zootie_entry_nt)
+        self.assertEqual(Entry.objects.get(slug='zootie').digest, content_digest(self.zootie_entry_nt.xml_dict))
 
+    def test_unchanged_entry_skipped_with_preloaded_digests(self):
+        _, _ = EntryParser.persist(self.zootie_entry_nt)
+        EntryParser.preload_digests()
+        try:
+            self.assertTrue(EntryParser.is_unchanged(self.zootie_entry_nt))
+            self.assertFalse(EntryParser.is_unchanged(self.zootie_entry_nt_updated))
+            with self.assertNumQueries(0):
+                self.assertEqual(DictionaryParser.persist_stream([self.zootie_entry_nt]), 0)
+        finally:
+            EntryParser.release_digests()
+        self.assertFalse(EntryParser.is_unchanged(self.zootie_entry_nt))
@@ -13,6 +13,11 @@ class TestExampleParser(BaseXMLParserTest):
         example = Example.objects.get(artist_name=self.zootie_example_nt.primary_artists, song_title=self.zootie_example_nt.song_title, lyric_text=self.zootie_example_nt.lyric_text)
         self.assertEqual(result, example)
 
+    def test_persist_renders_linked_lyric(self):
+        result, relations = ExampleParser.persist(self.zootie_example_nt)
+        result.refresh_from_db()
+        self.assertEqual(result.linked_lyric, 'I met a little <a href="/rhymes/cutie">cutie</a>, she was all hopped up on zootie')
+
     def test_update_relations(self):
         example, relations = ExampleParser.persist(self.zootie_example_nt1)
         example_updated, _ = ExampleParser.update_relations(example, self.zootie_example_nt1)
@@ -20,17 +25,19 @@ class TestExampleParser(BaseXMLParserTest):
         self.assertEqual(example_updated.artist.count(), 1)
         self.assertEqual(example_updated.feat_artist.count(), 1)
 
-    def test_purge_relations(self):
-        example, relations = ExampleParser.persist(self.zootie_example_nt)
+    def test_update_relations_drops_stale_links(self):
+        example, relations = ExampleParser.persist(self.zootie_example_nt1)
+        self.assertEqual(example.feat_artist.count(), 1)
 
-        example_updated, _ = ExampleParser.update_relations(example, self.zootie_example_nt1)
+        example_updated, _ = ExampleParser.update_relations(example, self.zootie_example_nt)
         self.assertEqual(example_updated.from_song.count(), 1)
         self.assertEqual(example_updated.artist.count(), 1)
-        self.assertEqual(example_updated.feat_artist.count(), 1)
-
-        example_purged = ExampleParser.purge_relations(example_updated)
-        self.assertEqual(example_purged.from_song.count(), 0)
-        self.assertEqual(example_purged.artist.count(), 0)
-        self.assertEqual(example_purged.feat_artist.count(), 0)
-
+        self.assertEqual(example_updated.feat_artist.count(), 0)
 
+    def test_unchanged_example_keeps_relations(self):
+        example, relations = ExampleParser.persist(self.zootie_example_nt1)
+        with self.assertNumQueries(4):
+            again, stored = ExampleParser.persist(self.zootie_example_nt1)
+        self.assertEqual(again, example)
+        self.assertEqual(stored.artist, relations.artist)
+        self.assertEqual(stored.feat_artist, relations.feat_artist)
@@ -0,0 +1,46 @@
+from dictionary.ingestion.artist_parser import ArtistParser
+from dictionary.ingestion.example_parser import ExampleParser
+from dictionary.ingestion.identity_map import IdentityMap
+from dictionary.models import Artist, ArtistParsed, Example
+from dictionary.tests.base import BaseXMLParserTest
+
+
+class TestIdentityMap(BaseXMLParserTest):
+
+    def tearDown(self):
+        IdentityMap.stop()
+
+    def test_unchanged_row_not_written(self):
+        Artist.objects.create(slug='rza', name='RZA')
+        with self.assertNumQueries(1):
+            artist = IdentityMap.persist(Artist, dict(slug='rza'), dict(name='RZA'))
+        self.assertEqual(artist.name, 'RZA')
+
+    def test_only_changed_fields_written(self):
+        Artist.objects.create(slug='rza', name='Rza')
+        with self.assertNumQueries(2):
+            IdentityMap.persist(Artist, dict(slug='rza'), dict(name='RZA'))
+        self.assertEqual(Artist.objects.get(slug='rza').name, 'RZA')
+
+    def test_fetched_once_per_run(self):
+        IdentityMap.start()
+        nt = ArtistParsed(name='RZA', slug='rza', xml_dict={'name': 'RZA'})
+        first, _ = ArtistParser.persist(nt)
+        with self.assertNumQueries(0):
+            second, _ = ArtistParser.persist(nt)
+        self.assertIs(first, second)
+
+    def test_not_cached_outside_run(self):
+        nt = ArtistParsed(name='RZA', slug='rza', xml_dict={'name': 'RZA'})
+        ArtistParser.persist(nt)
+        with self.assertNumQueries(1):
+            ArtistParser.persist(nt)
+
+    def test_example_persisted_once_per_run(self):
+        IdentityMap.start()
+        example, relations = ExampleParser.persist(self.zootie_example_nt)
+        with self.assertNumQueries(0):
+            again, again_relations = ExampleParser.persist(self.zootie_example_nt)
+        self.assertEqual(again, example)
+        self.assertEqual(again_relations.artist, relations.artist)
+        self.assertEqual(Example.objects.count(), 1)
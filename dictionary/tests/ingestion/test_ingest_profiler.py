@@ -0,0 +1,50 @@
+import json
+import os
+import tempfile
+
+from django.test import TestCase
+
+from dictionary.ingestion.directory_loader import DirectoryLoader
+from dictionary.ingestion.entry_parser import EntryParser
+from dictionary.ingestion.ingest_profiler import IngestProfiler
+
+
+class TestIngestProfiler(TestCase):
+
+    def setUp(self):
+        self.xml_files = sorted(DirectoryLoader.collect_xml_files("dictionary/tests/resources"))
+
+    def tearDown(self):
+        IngestProfiler.stop()
+
+    def test_profiled_run(self):
+        DirectoryLoader.process_xml(self.xml_files, workers=1, profile=True)
+        report = IngestProfiler.report()
+        self.assertEqual(report['totals']['files'], len([xml for xml in self.xml_files if "malformed" not in xml]))
+        self.assertEqual(report['totals']['entries'], len(report['slowest_entries']))
+        self.assertGreater(report['totals']['queries'], 0)
+        self.assertGreater(report['totals']['rows_written'], 0)
+        self.assertEqual(report['parsers']['EntryParser']['calls'], report['totals']['entries'])
+        self.assertIn('ExampleParser', report['parsers'])
+        seconds = [entry['seconds'] for entry in report['slowest_entries']]
+        self.assertEqual(seconds, sorted(seconds, reverse=True))
+
+    def test_persist_restored_after_run(self):
+        persist = EntryParser.persist
+        DirectoryLoader.process_xml(self.xml_files, workers=1, profile=True)
+        self.assertIs(EntryParser.persist, persist)
+
+    def test_write_report(self):
+        DirectoryLoader.process_xml(self.xml_files, workers=1, profile=True)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'profile.json')
+            report = IngestProfiler.write_report(path)
+            with open(path) as f:
+                self.assertEqual(json.load(f), json.loads(json.dumps(report)))
+        self.assertTrue(IngestProfiler.summary(report).startswith(f"{report['totals']['files']} files"))
+
+    def test_inactive_records_nothing(self):
+        IngestProfiler.start()
+        IngestProfiler.stop()
+        DirectoryLoader.process_xml(self.xml_files, workers=1)
+        self.assertEqual(IngestProfiler.report()['totals']['queries'], 0)
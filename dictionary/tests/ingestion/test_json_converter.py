@@ -23,4 +23,14 @@ class TestJSONConverter(BaseXMLParserTest):
     def test_json_parse_50(self):
         file_read = FileReader.read_file("dictionary/tests/resources/50.xml")
         as_dict = JSONConverter.parse_to_dict(file_read)
-        self.assertTrue('dictionary' in as_dict)
\ No newline at end of file
+        self.assertTrue('dictionary' in as_dict)
+
+    def test_iter_entries_matches_parse_to_dict(self):
+        for f in ("zootie", "12", "50"):
+            as_dict = JSONConverter.parse_to_dict(FileReader.read_file(f"dictionary/tests/resources/{f}.xml"))
+            streamed = list(JSONConverter.iter_entries(f"dictionary/tests/resources/{f}.xml"))
+            self.assertEqual(streamed, as_dict['dictionary']['entry'])
+
+    def test_iter_entries_malformed_file(self):
+        with self.assertRaises(SyntaxError):
+            list(JSONConverter.iter_entries("dictionary/tests/resources/malformed.xml"))
@@ -0,0 +1,30 @@
+from dictionary.ingestion.example_parser import ExampleParser
+from dictionary.ingestion.relation_sync import RelationSync
+from dictionary.models import Artist, Song
+from dictionary.tests.base import BaseXMLParserTest
+
+
+class TestRelationSync(BaseXMLParserTest):
+
+    def setUp(self):
+        super().setUp()
+        self.song = Song.objects.create(slug='song', title='Song', artist_name='RZA', artist_slug='rza',
+                                        album='Album')
+        self.rza = Artist.objects.create(slug='rza', name='RZA')
+        self.gza = Artist.objects.create(slug='gza', name='GZA')
+
+    def test_sync_adds_and_removes(self):
+        self.assertEqual(RelationSync.sync(self.song, 'artist', [self.rza]), ({self.rza.pk}, set()))
+        self.assertEqual(RelationSync.sync(self.song, 'artist', [self.gza]), ({self.gza.pk}, {self.rza.pk}))
+        self.assertEqual(list(self.song.artist.all()), [self.gza])
+
+    def test_unchanged_sync_writes_nothing(self):
+        RelationSync.sync(self.song, 'artist', [self.rza, self.gza])
+        with self.assertNumQueries(1):
+            self.assertEqual(RelationSync.sync(self.song, 'artist', [self.gza, self.rza]), (set(), set()))
+
+    def test_reingested_example_keeps_through_rows(self):
+        example, _ = ExampleParser.persist(self.zootie_example_nt)
+        through_ids = set(example.artist.through.objects.values_list('id', flat=True))
+        ExampleParser.persist(self.zootie_example_nt)
+        self.assertEqual(set(example.artist.through.objects.values_list('id', flat=True)), through_ids)
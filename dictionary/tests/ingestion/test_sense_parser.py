@@ -1,5 +1,6 @@
+from dictionary.ingestion.dirty_tracker import DirtyTracker
 from dictionary.ingestion.sense_parser import SenseParser
-from dictionary.models import Sense, SynSet
+from dictionary.models import Domain, Sense, SynSet
 from dictionary.tests.base import BaseXMLParserTest
 
 
@@ -13,6 +14,15 @@ class TestSenseParser(BaseXMLParserTest):
         sense = Sense.objects.get(slug=self.zootie_sense_nt.slug)
         self.assertEqual(result, sense)
 
+    def test_persist_marks_sense_and_artists_dirty(self):
+        DirtyTracker.senses, DirtyTracker.artists = set(), set()
+        sense, relations = SenseParser.persist(self.zootie_sense_nt)
+        self.assertIn(sense.id, DirtyTracker.senses)
+        self.assertTrue({artist.slug for artist in sense.cites_artists.all()} <= DirtyTracker.artists)
+        DirtyTracker.flush()
+        self.assertIn(sense.id, DirtyTracker.pending()[0])
+        self.assertEqual(DirtyTracker.senses, set())
+
     def test_update_relations(self):
         sense, relations = SenseParser.persist(self.zootie_sense_nt)
         self.assertEqual(sense.domains.count(), 2)
@@ -23,19 +33,27 @@ class TestSenseParser(BaseXMLParserTest):
         self.assertEqual(sense.collocates.count(), 2)
         self.assertEqual(sense.xrefs.count(), 2)
 
-    def test_purge_relations(self):
+    def test_update_relations_drops_stale_links(self):
         sense, relations = SenseParser.persist(self.zootie_sense_nt)
-        self.assertEqual(sense.domains.count(), 2)
-        self.assertEqual(sense.regions.count(), 0)
-        self.assertEqual(sense.semantic_classes.count(), 0)
-        self.assertEqual(sense.synset.count(), 1)
-        self.assertEqual(sense.examples.count(), 5)
-        self.assertEqual(sense.collocates.count(), 2)
+        sense.domains.add(Domain.objects.create(name='Stale', slug='stale'))
+        sense.synset.add(SynSet.objects.create(name='stale', slug='stale'))
+        self.assertEqual(sense.domains.count(), 3)
+
+        sense_updated, _ = SenseParser.persist(self.zootie_sense_nt, force_update=True)
+        self.assertEqual(sense_updated.domains.count(), 2)
+        self.assertEqual(sense_updated.synset.count(), 1)
+        self.assertEqual(sense_updated.examples.count(), 5)
+        self.assertEqual(sense_updated.collocates.count(), 2)
+
+    def test_unchanged_sense_not_reprocessed(self):
+        sense, _ = SenseParser.persist(self.zootie_sense_nt)
+        self.assertEqual(Sense.objects.get(id=sense.id).digest, SenseParser.digest(self.zootie_sense_nt))
+        with self.assertNumQueries(1):
+            unchanged, relations = SenseParser.persist(self.zootie_sense_nt)
+        self.assertEqual(relations.examples, [])
+        self.assertEqual(unchanged.examples.count(), 5)
 
-        sense_purged = SenseParser.purge_relations(sense)
-        self.assertEqual(sense_purged.domains.count(), 0)
-        self.assertEqual(sense_purged.regions.count(), 0)
-        self.assertEqual(sense_purged.semantic_classes.count(), 0)
-        self.assertEqual(sense_purged.synset.count(), 0)
-        self.assertEqual(sense_purged.examples.count(), 0)
-        self.assertEqual(sense.collocates.count(), 0)
\ No newline at end of file
+    def test_force_update_reprocesses_sense(self):
+        SenseParser.persist(self.zootie_sense_nt)
+        _, relations = SenseParser.persist(self.zootie_sense_nt, force_update=True)
+        self.assertEqual(len(relations.examples), 5)
@@ -28,18 +28,15 @@ class TestSongParser(BaseXMLParserTest):
         self.assertEqual(song.artist.count(), 1)
         self.assertEqual(song.feat_artist.count(), 1)
 
-    def test_purge_relations(self):
+    def test_update_relations_drops_stale_artists(self):
         artist = Artist(name=self.zootie_song_nt1.artist_name, slug=self.zootie_song_nt1.artist_slug)
         artist.save()
         feat = Artist(name="The Legion", slug="legion-the")
         feat.save()
-        primary_artists = [artist]
-        featured_artists = [feat]
-        song, relations = SongParser.persist(self.zootie_song_nt1, primary_artists, featured_artists)
-        self.assertEqual(song.artist.count(), 1)
+        song, relations = SongParser.persist(self.zootie_song_nt1, [artist], [feat])
         self.assertEqual(song.feat_artist.count(), 1)
-        song_purged = SongParser.purge_relations(song)
-        self.assertEqual(song_purged.artist.count(), 0)
-        self.assertEqual(song_purged.feat_artist.count(), 0)
+        song_updated, _ = SongParser.persist(self.zootie_song_nt1, [artist], [])
+        self.assertEqual(list(song_updated.artist.all()), [artist])
+        self.assertEqual(song_updated.feat_artist.count(), 0)
 
 
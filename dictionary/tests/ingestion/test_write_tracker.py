@@ -0,0 +1,50 @@
+from dictionary.ingestion.sense_parser import SenseParser
+from dictionary.ingestion.write_tracker import WriteTracker
+from dictionary.ingestion.xref_parser import XrefParser
+from dictionary.models import Place, Sense, Xref
+from dictionary.tests.base import BaseXMLParserTest
+
+
+class TestWriteTracker(BaseXMLParserTest):
+
+    def setUp(self):
+        super().setUp()
+        WriteTracker.reset()
+
+    def test_unchanged_row_skipped(self):
+        xref = Xref.objects.create(xref_word='primo', xref_type='Synonym', target_id='e8630_n_1', position=3)
+        with self.assertNumQueries(0):
+            self.assertFalse(WriteTracker.save_changed(xref, dict(position='3', frequency=None)))
+        self.assertEqual((WriteTracker.written, WriteTracker.avoided), (0, 1))
+
+    def test_only_changed_columns_saved(self):
+        xref = Xref.objects.create(xref_word='primo', xref_type='Synonym', target_id='e8630_n_1', position=3)
+        with self.assertNumQueries(1):
+            self.assertTrue(WriteTracker.save_changed(xref, dict(position='4', frequency=None)))
+        self.assertEqual(Xref.objects.get(id=xref.id).position, 4)
+        self.assertEqual((WriteTracker.written, WriteTracker.avoided), (1, 0))
+
+    def test_decimal_compared_at_column_scale(self):
+        place = Place.objects.create(name='Brooklyn', slug='brooklyn', latitude='40.678178', longitude='-73.944158')
+        place.refresh_from_db()
+        changed = WriteTracker.changed_fields(place, dict(latitude='40.6781784', longitude='-73.9441579'))
+        self.assertEqual(changed, dict())
+
+    def test_xref_persist_skips_unchanged(self):
+        nt = XrefParser.parse({'@type': 'hasSynonym', '@target': 'e8630_n_1', '#text': 'primo'})
+        XrefParser.persist(nt)
+        with self.assertNumQueries(1):
+            XrefParser.persist(nt)
+        self.assertEqual(WriteTracker.avoided, 1)
+
+    def test_sense_persist_skips_unchanged(self):
+        sense, _ = SenseParser.persist(self.zootie_sense_nt)
+        WriteTracker.reset()
+        SenseParser.persist(self.zootie_sense_nt)
+        self.assertEqual(WriteTracker.written, 0)
+        self.assertGreater(WriteTracker.avoided, 0)
+        self.assertEqual(Sense.objects.get(xml_id='e11730_n_1').definition, self.zootie_sense_nt.definition)
+
+    def test_report(self):
+        WriteTracker.written, WriteTracker.avoided = 2, 40
+        self.assertEqual(WriteTracker.report(), "Updated 2 rows, skipped 40 unchanged writes")
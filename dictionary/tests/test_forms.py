@@ -1,5 +1,6 @@
 from django.test import TestCase
 from dictionary.forms import SongForm
+from dictionary.models import Song
 
 
 class SongFormTest(TestCase):
@@ -12,3 +13,8 @@ class SongFormTest(TestCase):
     def test_form_validation_for_blank_items(self):
         form = SongForm(data={"title": ""})
         self.assertFalse(form.is_valid())
+
+    def test_form_loads_lyrics_of_instance(self):
+        song = Song.objects.create(slug='rza-terrorist', title='Terrorist', album='Bobby Digital')
+        song.set_lyrics('lyrics one')
+        self.assertEqual(SongForm(instance=song).initial['lyrics'], 'lyrics one')
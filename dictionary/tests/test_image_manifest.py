@@ -0,0 +1,59 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase
+
+from dictionary import image_manifest
+from dictionary.image_manifest import ImageManifest, refresh_image_manifest
+from dictionary.utils import check_for_image
+
+
+class TestImageManifest(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        for image_type, folder, filename in [
+            ('artists', 'full', 'epmd.jpg'),
+            ('artists', 'full', 'epmd.png'),
+            ('artists', 'thumb', 'epmd.jpg'),
+            ('artists', 'thumb', 'method-man.jpeg'),
+            ('places', 'full', 'brentwood-new-york-usa.png'),
+        ]:
+            os.makedirs(os.path.join(self.root, image_type, folder), exist_ok=True)
+            open(os.path.join(self.root, image_type, folder, filename), 'w').close()
+        self.manifest = ImageManifest.scan(self.root)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        image_manifest._manifest = None
+
+    def test_scan(self):
+        self.assertEqual(len(self.manifest), 3)
+        self.assertEqual(self.manifest.lookup('epmd', 'artists', 'full'),
+                         ['/static/dictionary/img/artists/full/epmd.jpg', '/static/dictionary/img/artists/full/epmd.png'])
+        self.assertEqual(self.manifest.lookup('brentwood-new-york-usa', 'places', 'full'),
+                         ['/static/dictionary/img/places/full/brentwood-new-york-usa.png'])
+
+    def test_lookup_ignores_other_extensions(self):
+        self.assertEqual(self.manifest.lookup('method-man', 'artists', 'thumb'), [])
+
+    def test_save_and_load(self):
+        path = os.path.join(self.root, 'manifest.json')
+        self.manifest.save(path)
+        loaded = ImageManifest.load(path)
+        self.assertDictEqual(loaded.images, self.manifest.images)
+
+    def test_check_for_image(self):
+        image_manifest._manifest = self.manifest
+        self.assertEqual(check_for_image('epmd', 'artists', 'thumb'), '/static/dictionary/img/artists/thumb/epmd.jpg')
+        self.assertEqual(check_for_image('nobody', 'places', 'full'), '/static/dictionary/img/artists/full/__none.png')
+
+    def test_refresh_image_manifest(self):
+        path = os.path.join(self.root, 'manifest.json')
+        with self.settings(IMAGE_MANIFEST_PATH=path), \
+                mock.patch('dictionary.image_manifest.ImageManifest.scan', return_value=self.manifest):
+            refreshed = refresh_image_manifest(write=True)
+        self.assertIs(image_manifest._manifest, refreshed)
+        self.assertDictEqual(ImageManifest.load(path).images, self.manifest.images)
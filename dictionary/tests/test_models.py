@@ -1,6 +1,8 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from dictionary.data_version import get_data_version
 from dictionary.tests.base import BaseTest
-from dictionary.models import Artist
+from dictionary.models import Artist, Entry, Song, SongLyrics
+from dictionary.utils import render_linked_lyrics
 
 
 class ArtistTest(TestCase):
@@ -19,3 +21,76 @@ class ExampleTest(BaseTest):
         for link in links:
             self.example_2.lyric_links.remove(link)
         self.assertEqual(self.example_2.lyric_links.count(), 0)
+
+
+class EntryTest(BaseTest):
+
+    def test_publish_rerenders_linked_lyrics(self):
+        render_linked_lyrics([self.example_2])
+        loco = Entry.objects.create(headword="loco", slug="loco", letter="l", publish=False)
+        self.example_2.refresh_from_db()
+        self.assertNotIn('href="/loco', self.example_2.linked_lyric)
+
+        version = get_data_version()
+        loco = Entry.objects.get(slug="loco")
+        loco.publish = True
+        loco.save()
+        self.example_2.refresh_from_db()
+        self.assertIn('<a href="/loco#e7360_adv_1">loco</a>', self.example_2.linked_lyric)
+        self.assertNotEqual(get_data_version(), version)
+
+        loco.publish = False
+        loco.save()
+        self.example_2.refresh_from_db()
+        self.assertNotIn('href="/loco', self.example_2.linked_lyric)
+
+    def test_unchanged_publish_renders_nothing(self):
+        loco = Entry.objects.create(headword="loco", slug="loco", letter="l", publish=True)
+        loco = Entry.objects.get(slug="loco")
+        with self.assertNumQueries(1):
+            loco.save()
+
+
+class SongLyricsTest(TestCase):
+
+    def setUp(self):
+        self.song = Song.objects.create(slug='rza-terrorist', title='Terrorist', album='Bobby Digital')
+
+    def test_no_lyrics(self):
+        self.assertIsNone(self.song.get_lyrics())
+
+    @override_settings(COMPRESS_SONG_LYRICS=True)
+    def test_compressed_lyrics(self):
+        self.song.set_lyrics('lyrics one')
+        stored = SongLyrics.objects.get(song_id=self.song.id)
+        self.assertIsNone(stored.text)
+        self.assertEqual(self.song.get_lyrics(), 'lyrics one')
+
+    @override_settings(COMPRESS_SONG_LYRICS=False)
+    def test_plain_lyrics_replaced(self):
+        self.song.set_lyrics('lyrics one')
+        self.song.set_lyrics('lyrics two')
+        self.assertEqual(SongLyrics.objects.get(song_id=self.song.id).text, 'lyrics two')
+        self.assertEqual(self.song.get_lyrics(), 'lyrics two')
+
+    @override_settings(COMPRESS_SONG_LYRICS=True)
+    def test_store_updates_in_place(self):
+        other = Song.objects.create(slug='rza-holocaust', title='Holocaust', album='Bobby Digital')
+        SongLyrics.store({self.song.id: 'lyrics one'})
+        with self.assertNumQueries(3), override_settings(COMPRESS_SONG_LYRICS=False):
+            SongLyrics.store({self.song.id: 'lyrics two', other.id: 'lyrics three'})
+        stored = SongLyrics.objects.get(song_id=self.song.id)
+        self.assertEqual((stored.text, stored.compressed), ('lyrics two', None))
+        self.assertEqual(other.get_lyrics(), 'lyrics three')
+
+    def test_select_related_lyrics(self):
+        self.song.set_lyrics('lyrics one')
+        Song.objects.create(slug='rza-holocaust', title='Holocaust', album='Bobby Digital')
+        with self.assertNumQueries(1):
+            dicts = [song.as_dict() for song in Song.objects.select_related('lyrics_store').order_by('slug')]
+        self.assertEqual([d['lyrics'] for d in dicts], [None, 'lyrics one'])
+
+    def test_song_queries_leave_lyrics_out(self):
+        self.song.set_lyrics('lyrics one')
+        with self.assertNumQueries(1):
+            self.assertEqual(list(Song.objects.all()), [self.song])
@@ -0,0 +1,45 @@
+from django.test import override_settings
+
+from dictionary import prefix_index
+from dictionary.data_version import bump_data_version, get_data_version
+from dictionary.models import Entry
+from dictionary.prefix_index import PrefixIndex, Suggestion, get_prefix_index
+from dictionary.tests.base import BaseTest
+
+
+# re-read the shared version stamp on every call, so that query counts don't depend on timing
+@override_settings(DATA_VERSION_CHECK_INTERVAL=0)
+class TestPrefixIndex(BaseTest):
+
+    def tearDown(self):
+        prefix_index._index = None
+
+    def test_search(self):
+        index = PrefixIndex('v', [
+            Suggestion('entry', 'Mad', 'mad'),
+            Suggestion('form', 'madder', 'mad'),
+            Suggestion('form', 'mad', 'mad'),
+            Suggestion('artist', 'Madlib', 'madlib'),
+            Suggestion('entry', 'loco', 'loco'),
+        ])
+        self.assertEqual(len(index), 4)
+        self.assertEqual([s.label for s in index.search('MAD')], ['Mad', 'madder', 'Madlib'])
+        self.assertEqual([s.label for s in index.search('mad', limit=2)], ['Mad', 'madder'])
+        self.assertEqual([s.label for s in index.search('mad', types=('artist',))], ['Madlib'])
+        self.assertEqual(index.search('zootie'), [])
+
+    def test_get_prefix_index(self):
+        get_data_version()
+        with self.assertNumQueries(5):
+            index = get_prefix_index()
+        self.assertEqual(index.search('madd'), [Suggestion('form', 'madder', 'mad'), Suggestion('form', 'maddest', 'mad')])
+        self.assertEqual(index.search('eric'), [Suggestion('artist', 'Erick Sermon', 'erick-sermon')])
+        self.assertEqual(index.search('oprah'), [Suggestion('entity', 'Oprah Winfrey', 'oprah-winfrey')])
+        with self.assertNumQueries(1):
+            self.assertIs(get_prefix_index(), index)
+
+    def test_index_is_rebuilt_when_version_changes(self):
+        self.assertEqual(get_prefix_index().search('loco'), [])
+        Entry(headword="loco", slug="loco", letter="l", publish=True).save()
+        bump_data_version()
+        self.assertEqual(get_prefix_index().search('loco'), [Suggestion('entry', 'loco', 'loco')])
@@ -0,0 +1,63 @@
+from django.test import override_settings
+
+from dictionary import published_index
+from dictionary.data_version import bump_data_version, get_data_version
+from dictionary.models import Entry
+from dictionary.published_index import get_published_index
+from dictionary.tests.base import BaseTest
+from dictionary.utils import update_headword
+
+
+# re-read the shared version stamp on every call, so that query counts don't depend on timing
+@override_settings(DATA_VERSION_CHECK_INTERVAL=0)
+class TestPublishedIndex(BaseTest):
+
+    def tearDown(self):
+        published_index._index = None
+
+    def test_get_published_index(self):
+        index = get_published_index()
+        self.assertIn('mad', index)
+        self.assertIn('mad', index.headwords)
+        self.assertIsInstance(index.slugs, frozenset)
+
+    def test_index_is_reused_while_version_is_unchanged(self):
+        index = get_published_index()
+        # a write that bypasses Entry.save & so leaves the version alone
+        Entry.objects.bulk_create([Entry(headword="loco", slug="loco", letter="l", publish=True)])
+        with self.assertNumQueries(1):
+            self.assertIs(get_published_index(), index)
+        self.assertNotIn('loco', index)
+
+    @override_settings(DATA_VERSION_CHECK_INTERVAL=5)
+    def test_version_read_once_per_interval(self):
+        index = get_published_index()
+        with self.assertNumQueries(0):
+            self.assertIs(get_published_index(), index)
+
+    def test_index_is_rebuilt_when_version_changes(self):
+        index = get_published_index()
+        Entry(headword="loco", slug="loco", letter="l", publish=True).save()
+        rebuilt = get_published_index()
+        self.assertIsNot(rebuilt, index)
+        self.assertIn('loco', rebuilt)
+
+    def test_neighbours_follow_sort_key_order(self):
+        Entry(headword="the Bay", slug="bay-the", sort_key="bay, the", letter="b", publish=True).save()
+        Entry(headword="zootie", slug="zootie", sort_key="zootie", letter="z", publish=True).save()
+        Entry(headword="loco", slug="loco", sort_key="loco", letter="l", publish=False).save()
+        Entry.objects.filter(slug="mad").update(sort_key="mad")
+        bump_data_version()
+        index = get_published_index()
+        self.assertEqual(index.ordered_slugs, ("bay-the", "mad", "zootie"))
+        self.assertEqual(index.neighbours("mad"), ("bay-the", "zootie"))
+        self.assertEqual(index.neighbours("bay-the"), (None, "mad"))
+        self.assertEqual(index.neighbours("zootie"), ("mad", None))
+        self.assertEqual(index.neighbours("loco"), (None, None))
+
+    def test_update_headword_bumps_version(self):
+        version = get_data_version()
+        update_headword("mad", "madd")
+        self.assertNotEqual(get_data_version(), version)
+        self.assertIn('madd', get_published_index())
+        self.assertNotIn('mad', get_published_index())
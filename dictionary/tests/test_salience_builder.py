@@ -0,0 +1,86 @@
+from unittest import mock
+
+from dictionary.ingestion.dirty_tracker import DirtyTracker
+from dictionary.management.commands import salience_builder
+from dictionary.management.commands.salience_builder import main, refresh
+from dictionary.models import Artist, Salience
+from dictionary.tests.base import BaseTest
+
+
+class TestSalienceBuilder(BaseTest):
+
+    def setUp(self):
+        super().setUp()
+        self.epmd.primary_senses.add(self.mad_sense)
+        self.erick_sermon.primary_senses.add(self.mad_sense)
+        self.method_man.primary_senses.add(self.sense)
+        Salience(artist=self.method_man, sense=self.mad_sense, score=1.0).save()
+
+    def tearDown(self):
+        DirtyTracker.senses, DirtyTracker.artists = set(), set()
+
+    def scores(self):
+        return {(s.sense_id, s.artist_id): s.score for s in Salience.objects.all()}
+
+    def test_scores_match_model_tfidfs(self):
+        expected = {artist.slug: score for artist, score in self.mad_sense.get_tfidfs().items()}
+        with self.assertNumQueries(14):
+            self.assertEqual(main(), 2)
+        built = {s.artist_id: s.score for s in Salience.objects.filter(sense=self.mad_sense)}
+        self.assertEqual(built.keys(), expected.keys())
+        for slug, score in expected.items():
+            self.assertAlmostEqual(built[slug], score)
+
+    def test_ranks(self):
+        main()
+        saliences = list(Salience.objects.filter(sense=self.mad_sense).order_by('sense_rank'))
+        self.assertEqual([s.sense_rank for s in saliences], [1, 2])
+        self.assertGreaterEqual(saliences[0].score, saliences[1].score)
+        self.assertTrue(all(s.artist_rank == 1 for s in saliences))
+        self.assertFalse(Salience.objects.filter(sense=self.sense).exists())
+
+    def test_refresh_recomputes_only_dirty_senses(self):
+        self.sense.publish = True
+        self.sense.save()
+        self.sense.examples.add(self.example_2)
+        main()
+        Salience.objects.filter(sense=self.sense).update(score=42.0)
+        self.mad_sense.examples.add(self.example_3)
+        DirtyTracker.mark_senses([self.mad_sense.id])
+        DirtyTracker.flush()
+        refresh()
+        self.assertEqual(Salience.objects.get(sense=self.sense).score, 42.0)
+        expected = {artist.slug: score for artist, score in self.mad_sense.get_tfidfs().items()}
+        for s in Salience.objects.filter(sense=self.mad_sense):
+            self.assertAlmostEqual(s.score, expected[s.artist_id])
+        self.assertEqual(DirtyTracker.pending(), (set(), set()))
+
+    def test_refresh_keeps_marks_flushed_meanwhile(self):
+        main()
+        DirtyTracker.mark_senses([self.mad_sense.id])
+        DirtyTracker.flush()
+        collect_counts = salience_builder.collect_counts
+
+        def flush_during_refresh(*args):
+            DirtyTracker.mark_senses([self.sense.id])
+            DirtyTracker.mark_artists(['epmd'])
+            DirtyTracker.flush()
+            return collect_counts(*args)
+        with mock.patch.object(salience_builder, 'collect_counts', side_effect=flush_during_refresh):
+            refresh()
+        self.assertEqual(DirtyTracker.pending(), ({self.sense.id}, {'epmd'}))
+
+    def test_refresh_rescales_idfs_when_artist_count_changes(self):
+        main()
+        Artist(name="Redman", slug="redman").save()
+        Artist(name="Keith Murray", slug="keith-murray").save()
+        refresh()
+        rescaled = self.scores()
+        main()
+        for key, score in self.scores().items():
+            self.assertAlmostEqual(rescaled[key], score)
+
+    def test_refresh_without_changes(self):
+        main()
+        with self.assertNumQueries(3):
+            self.assertEqual(refresh(), 0)
@@ -0,0 +1,62 @@
+import datetime
+
+from django.test import override_settings
+
+from dictionary import sampler
+from dictionary.data_version import bump_data_version
+from dictionary.models import Entry, Sense
+from dictionary.sampler import get_sampler
+from dictionary.tests.base import BaseTest
+
+
+# re-read the shared version stamp on every call, so that query counts don't depend on timing
+@override_settings(DATA_VERSION_CHECK_INTERVAL=0)
+class TestSampler(BaseTest):
+
+    def setUp(self):
+        super().setUp()
+        for hw in ["loco", "rock", "zootie"]:
+            Entry(headword=hw, slug=hw, letter=hw[0], publish=True).save()
+        Entry(headword="unpublished", slug="unpublished", letter="u", publish=False).save()
+        bump_data_version()
+
+    def tearDown(self):
+        sampler._sampler = None
+
+    def test_pool_holds_eligible_ids_only(self):
+        self.assertEqual(get_sampler().pool('entry'), ("loco", "mad", "rock", "zootie"))
+        self.assertEqual(get_sampler().pool('sense'), tuple(Sense.objects.filter(publish=True).order_by('pk').values_list('pk', flat=True)))
+
+    def test_sample_draws_distinct_objects(self):
+        sampled = get_sampler().sample('entry', 3)
+        self.assertEqual(len(sampled), 3)
+        self.assertEqual(len({e.slug for e in sampled}), 3)
+        self.assertTrue(all(isinstance(e, Entry) and e.publish for e in sampled))
+        self.assertEqual(len(get_sampler().sample('entry', 10)), 4)
+
+    def test_sample_after_pool_is_loaded_is_one_query(self):
+        get_sampler().pool('entry')
+        with self.assertNumQueries(2):
+            get_sampler().choice('entry')
+
+    def test_stale_pool_is_reloaded_on_a_miss(self):
+        get_sampler().pools['entry'] = ("deleted",)
+        self.assertIn(get_sampler().choice('entry').slug, ("loco", "mad", "rock", "zootie"))
+        self.assertNotIn("deleted", get_sampler().pool('entry'))
+
+    def test_word_of_the_day_is_stable_for_a_day(self):
+        day = datetime.date(2020, 6, 1)
+        self.assertEqual(get_sampler().word_of_the_day(day), get_sampler().word_of_the_day(day))
+
+    def test_pools_are_dropped_when_version_changes(self):
+        self.assertNotIn("new", get_sampler().pool('entry'))
+        Entry(headword="new", slug="new", letter="n", publish=True).save()
+        bump_data_version()
+        self.assertIn("new", get_sampler().pool('entry'))
+
+    def test_ungeocoded_places_are_not_eligible(self):
+        self.assertIsNone(get_sampler().choice('place'))
+        self.brentwood_place.latitude, self.brentwood_place.longitude = 40.78, -73.24
+        self.brentwood_place.save()
+        bump_data_version()
+        self.assertEqual(get_sampler().choice('place'), self.brentwood_place)
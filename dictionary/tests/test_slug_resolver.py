@@ -0,0 +1,45 @@
+from django.test import override_settings
+
+from dictionary import slug_resolver
+from dictionary.data_version import bump_data_version, get_data_version
+from dictionary.models import Artist, Entry
+from dictionary.slug_resolver import get_slug_resolver
+from dictionary.tests.base import BaseTest
+
+
+# re-read the shared version stamp on every call, so that query counts don't depend on timing
+@override_settings(DATA_VERSION_CHECK_INTERVAL=0)
+class TestSlugResolver(BaseTest):
+
+    def setUp(self):
+        super().setUp()
+        Artist(name="Notorious B.I.G., The", slug="notorious-b-i-g--the").save()
+        Entry(headword="Bay, the", slug="bay-the", letter="b", publish=True).save()
+        Entry(headword="loco", slug="loco", letter="l", publish=False).save()
+        bump_data_version()
+
+    def tearDown(self):
+        slug_resolver._resolver = None
+
+    def test_resolve(self):
+        resolver = get_slug_resolver()
+        self.assertEqual(resolver.resolve('madder'), ('entry', 'mad'))
+        self.assertEqual(resolver.resolve('mad'), ('entry', 'mad'))
+        self.assertEqual(resolver.resolve('epmd'), ('artist', 'epmd'))
+        self.assertEqual(resolver.resolve('oprah-winfrey'), ('entity', 'oprah-winfrey'))
+        self.assertIsNone(resolver.resolve('loco'))
+
+    def test_resolve_definite_article_variants(self):
+        resolver = get_slug_resolver()
+        self.assertEqual(resolver.resolve('the-bay'), ('entry', 'bay-the'))
+        self.assertEqual(resolver.resolve('the-notorious-b-i-g-'), ('artist', 'notorious-b-i-g--the'))
+
+    def test_resolver_is_reused_while_version_is_unchanged(self):
+        resolver = get_slug_resolver()
+        get_data_version()
+        with self.assertNumQueries(1):
+            self.assertIs(get_slug_resolver(), resolver)
+
+    def test_search_redirects(self):
+        self.assertRedirects(self.client.get("/search/?q=The Bay"), "/bay-the/", fetch_redirect_response=False)
+        self.assertRedirects(self.client.get("/search/?q=Erick Sermon"), "/artists/erick-sermon/", fetch_redirect_response=False)
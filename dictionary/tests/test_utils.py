@@ -1,12 +1,13 @@
 from unittest import mock
 from django.test import TestCase
 from dictionary.tests.base import BaseTest
-from dictionary.models import Artist, Place, Stats, Entry, Sense, Xref, Collocate, LyricLink
-from dictionary.utils import slugify, extract_short_name, extract_parent, build_example, build_beta_example, add_links, \
+from dictionary.models import Artist, Place, Stats, Entry, Sense, Xref, Collocate, LyricLink, Example, SynSet
+from dictionary.utils import slugify, extract_short_name, extract_parent, build_example, build_examples, build_beta_example, add_links, \
     inject_link, swap_place_lat_long, format_suspicious_lat_longs, gather_suspicious_lat_longs, build_entry_preview, \
-    build_collocate, build_xref, build_artist, build_sense, build_timeline_example, reduce_ordered_list, \
+    build_collocate, build_xref, build_artist, build_sense, build_senses, build_timeline_example, reduce_ordered_list, \
     count_place_artists, make_label_from_camel_case, dedupe_rhymes, update_release_date, build_stats, update_stats, \
-    update_headword, get_letter, split_definitions, make_label_from_snake_case
+    update_headword, get_letter, split_definitions, make_label_from_snake_case, render_linked_lyrics, rerender_linked_lyrics, \
+    search_examples
 
 
 class TestUtils(BaseTest):
@@ -20,6 +21,17 @@ class TestUtils(BaseTest):
     def test_extract_parent(self):
         self.assertEqual(extract_parent("Houston, Texas, USA"), "Texas, USA")
 
+    def test_search_examples(self):
+        results = search_examples("mad green")
+        self.assertEqual({e.id for e in results}, {self.example_4.id, self.example_5.id})
+        self.assertEqual(search_examples("greens").count(), 2)
+
+    def test_search_examples_quoted_phrase(self):
+        results = search_examples('"clock mad green"')
+        self.assertEqual([e.id for e in results], [self.example_4.id])
+        self.assertEqual(search_examples('"green mad"').count(), 0)
+        self.assertEqual(search_examples('').count(), 0)
+
     def test_build_entry_preview(self):
         result = build_entry_preview(self.mad_entry)
         self.assertEqual(result['headword'], 'mad')
@@ -145,13 +157,47 @@ class TestBuildArtist(BaseTest):
 
 
 class TestBuildSense(BaseTest):
-    @mock.patch('dictionary.utils.build_example')
-    def test_build_sense(self, mock_build_example):
-        mock_build_example.return_value = {"example": "example"}
+    @mock.patch('dictionary.utils.build_examples')
+    def test_build_sense(self, mock_build_examples):
+        mock_build_examples.return_value = [{"example": "example"}] * 3
         built = build_sense(self.mad_sense, self.published_headwords)
         expected = {'xml_id': 'bar', 'collocates': [], 'regions': [], 'etymology': None, 'semantic_classes': [], 'antonyms': [], 'ancestors': [], 'artist_name': '', 'artist_slug': '', 'sense_image': None, 'holonyms': [], 'related_words': [], 'image': '', 'examples': [{'example': 'example'}, {'example': 'example'}, {'example': 'example'}], 'form': None, 'part_of_speech': 'adj', 'instance_of': [], 'definition': None, 'num_examples': 4, 'meronyms': [], 'notes': None, 'rhymes': [], 'related_concepts': [], 'instances': [], 'derivatives': [], 'synonyms': [], 'headword': 'mad', 'domains': []}
         self.assertDictEqual(built, expected)
 
+    @mock.patch('dictionary.utils.check_for_image')
+    def test_build_senses(self, mock_check_for_image):
+        mock_check_for_image.return_value = "__none.png"
+        self.mad_xref.xref_type = "Antonym"
+        self.mad_xref.save()
+        self.mad_sense.xrefs.add(self.mad_xref)
+        self.mad_sense.domains.add(self.drugs)
+        self.sense.examples.add(self.example_2)
+        render_linked_lyrics(Example.objects.all())
+        with self.assertNumQueries(12):
+            built = build_senses(Sense.objects.order_by('id'), self.published_headwords)
+        self.assertEqual([s['xml_id'] for s in built], ['bar', 'foo'])
+        self.assertEqual(built[0]['num_examples'], 4)
+        self.assertEqual(len(built[0]['examples']), 3)
+        self.assertEqual(built[1]['num_examples'], 1)
+        self.assertEqual([x['xref_word'] for x in built[0]['antonyms']], ['maddest'])
+        self.assertEqual(built[0]['related_words'], [])
+        self.assertEqual([d['name'] for d in built[0]['domains']], ['drugs'])
+        self.assertDictEqual(built[0], build_sense(self.mad_sense, self.published_headwords))
+
+    @mock.patch('dictionary.utils.check_for_image')
+    def test_build_senses_query_count_is_constant(self, mock_check_for_image):
+        mock_check_for_image.return_value = "__none.png"
+        synset = SynSet(name="mad", slug="mad")
+        synset.save()
+        synset.senses.add(self.mad_sense, self.sense)
+        self.example_1.feat_artist.add(self.method_man)
+        self.sense.examples.add(self.example_2, self.example_3)
+        render_linked_lyrics(Example.objects.all())
+        with self.assertNumQueries(16):
+            build_senses(Sense.objects.filter(id=self.mad_sense.id), self.published_headwords)
+        with self.assertNumQueries(16):
+            build_senses(Sense.objects.order_by('id'), self.published_headwords, full=True)
+
     def test_split_definition(self):
         un_split = "an area including San Francisco & Sacramento, California; people hailing from the Bay area; The group 415, started by Oakland artists Richie Rich, D-Loc, DJ Daryl, and J.E.D."
         result = split_definitions(un_split)
@@ -169,6 +215,32 @@ class TestBuildExample(BaseTest):
         expected = {'lyric': "Now, it's time for me, the E, to rock it loco", 'featured_artists': [], 'song_title': 'Brothers From Brentwood L.I.', 'artist_name': 'EPMD', 'release_date_string': '1992-07-28', 'release_date': '1992-07-28', 'linked_lyric': 'foo', 'album': 'Crossover', 'artist_slug': 'epmd', 'song_slug': 'epmd-brothers-from-brentwood-l-i', 'spot_link': None}
         self.assertDictEqual(built, expected)
 
+    @mock.patch('dictionary.utils.check_for_image')
+    def test_build_examples(self, mock_check_for_image):
+        mock_check_for_image.return_value = "__none.png"
+        self.song.spot_uri = "spotify:track:foo"
+        self.song.save()
+        self.example_foo.feat_artist.add(self.epmd, self.method_man)
+        self.example_2.feat_artist.add(self.erick_sermon)
+        render_linked_lyrics(Example.objects.all())
+        expected = [build_example(example, self.published_headwords) for example in Example.objects.order_by('id')]
+        with self.assertNumQueries(6):
+            built = build_examples(Example.objects.order_by('id'), self.published_headwords)
+        self.assertListEqual(built, expected)
+        self.assertEqual(built[-1]['spot_link'], "https://open.spotify.com/track/foo")
+        self.assertEqual([a['slug'] for a in built[-1]['featured_artists']], ['epmd', 'method-man'])
+
+    @mock.patch('dictionary.utils.check_for_image')
+    def test_build_examples_query_count_is_constant(self, mock_check_for_image):
+        mock_check_for_image.return_value = "__none.png"
+        self.example_1.feat_artist.add(self.method_man)
+        self.example_foo.feat_artist.add(self.epmd, self.erick_sermon)
+        render_linked_lyrics(Example.objects.all())
+        with self.assertNumQueries(6):
+            build_examples(Example.objects.order_by('id')[:2], self.published_headwords)
+        with self.assertNumQueries(6):
+            build_examples(Example.objects.order_by('id'), self.published_headwords)
+
     @mock.patch('dictionary.utils.build_artist')
     def test_build_beta_example(self, mock_build_artist):
         mock_build_artist.return_value = {'foo': 'bar'}
@@ -176,6 +248,24 @@ class TestBuildExample(BaseTest):
         expected = {'links': [{'offset': 27, 'target_lemma': 'E', 'target_slug': 'erick-sermon', 'type': 'artist', 'text': 'E'}, {'offset': 33, 'target_lemma': 'rock', 'target_slug': 'rock#e9060_trV_1', 'type': 'xref', 'text': 'rock'}, {'offset': 41, 'target_lemma': 'loco', 'target_slug': 'loco#e7360_adv_1', 'type': 'xref', 'text': 'loco'}], 'text': "Now, it's time for me, the E, to rock it loco", 'title': 'Brothers From Brentwood L.I.', 'primary_artists': [{'foo': 'bar'}], 'album': 'Crossover', 'release_date_string': '1992-07-28', 'featured_artists': [], 'release_date': '1992-07-28'}
         self.assertDictEqual(result, expected)
 
+    def test_render_linked_lyrics(self):
+        self.assertEqual(render_linked_lyrics(Example.objects.filter(id=self.example_2.id)), 1)
+        self.example_2.refresh_from_db()
+        expected = """Now, it's time for me, the <a href="/artists/erick-sermon">E</a>, to rock it loco"""
+        self.assertEqual(self.example_2.linked_lyric, expected)
+        with self.assertNumQueries(2):
+            built = build_examples([self.example_2], self.published_headwords)
+        self.assertEqual(built[0]['linked_lyric'], expected)
+
+    def test_rerender_linked_lyrics(self):
+        render_linked_lyrics(Example.objects.all())
+        Entry(headword="loco", slug="loco", letter="l", publish=True).save()
+        self.assertEqual(rerender_linked_lyrics(["loco"]), 1)
+        self.example_2.refresh_from_db()
+        self.assertIn('<a href="/loco#e7360_adv_1">loco</a>', self.example_2.linked_lyric)
+        self.assertNotIn('<a href="/rock', self.example_2.linked_lyric)
+        self.assertEqual(rerender_linked_lyrics(["nobody"]), 0)
+
     def test_add_links(self):
         lyric_links = self.example_2.lyric_links.order_by('position')
         result = add_links(self.example_2.lyric_text, lyric_links, self.published_headwords)
@@ -1,4 +1,5 @@
 import decimal
+import hashlib
 import math
 import os
 import random
@@ -11,9 +12,13 @@ from geopy.geocoders import Nominatim
 
 
 from django.core.serializers.json import DjangoJSONEncoder
-from django.db.models import Q, Count
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Q, F, Count, Prefetch, prefetch_related_objects
 
 import dictionary.models
+from dictionary.data_version import bump_data_version
+from dictionary.image_manifest import get_image_manifest
+from dictionary.published_index import get_published_index
 
 gm = os.getenv("GOOGLE_MAPS_KEY", None)
 GMKV = f"&key={gm}" if gm else None
@@ -59,6 +64,32 @@ def build_query(query_string, search_fields, normalize=False) -> str:
     return query
 
 
+SEARCH_CONFIG = 'english'
+
+
+def build_search_query(query_string) -> SearchQuery:
+    """ANDs together the terms of normalize_query, treating each quoted term as a phrase"""
+    query = None
+    for term in normalize_query(query_string):
+        search_type = 'phrase' if ' ' in term else 'plain'
+        q = SearchQuery(term, config=SEARCH_CONFIG, search_type=search_type)
+        query = query & q if query else q
+    return query
+
+
+def search_examples(query_string) -> Any:
+    """
+    Returns the examples matching a query on Example.search_vector (GIN indexed & maintained by a trigger
+    on lyric_text), best match first
+    """
+    query = build_search_query(query_string)
+    if query is None:
+        return dictionary.models.Example.objects.none()
+    return dictionary.models.Example.objects.filter(search_vector=query)\
+        .annotate(rank=SearchRank(F('search_vector'), query))\
+        .order_by('-rank', '-release_date')
+
+
 def decimal_default(obj) -> float:
     if isinstance(obj, decimal.Decimal):
         return float(obj)
@@ -231,12 +262,64 @@ def assign_artist_image(examples) -> Tuple[str, str, str]:
     return '', '', ''
 
 
-def build_sense(sense_object, published, full=False, build_form=False) -> Dict[str, Any]:
-    example_results = sense_object.examples.order_by('release_date')
-    if full:
-        examples = [build_example(example, published) for example in example_results]
-    else:
-        examples = [build_example(example, published) for example in example_results[:NUM_QUOTS_TO_SHOW]]
+SENSE_XREF_TYPES = [
+    ("antonyms", "Antonym"),
+    ("meronyms", "Meronym"),
+    ("holonyms", "Holonym"),
+    ("derivatives", "Derivative"),
+    ("ancestors", "Derives From"),
+    ("instance_of", "Instance Of"),
+    ("instances", "Instance"),
+    ("related_concepts", "Related Concept"),
+    ("related_words", "Related Word"),
+]
+
+
+def sense_prefetches() -> List[Prefetch]:
+    return [
+        Prefetch('domains', queryset=dictionary.models.Domain.objects.order_by('name')),
+        Prefetch('regions', queryset=dictionary.models.Region.objects.order_by('name')),
+        Prefetch('semantic_classes', queryset=dictionary.models.SemanticClass.objects.order_by('name')),
+        Prefetch('xrefs', queryset=dictionary.models.Xref.objects.order_by('xref_word')),
+        Prefetch('sense_rhymes', queryset=dictionary.models.SenseRhyme.objects.order_by('-frequency')),
+        Prefetch('collocates', queryset=dictionary.models.Collocate.objects.order_by('-frequency')),
+        'synset',
+        Prefetch('synset__senses', queryset=dictionary.models.Sense.objects.only('id', 'headword', 'xml_id').order_by('headword'))
+    ]
+
+
+def sense_example_ids(sense_objects) -> Dict[int, List[int]]:
+    """Maps each sense id to its example ids in release date order, read from the through table alone"""
+    example_ids = {sense_object.id: [] for sense_object in sense_objects}
+    through = dictionary.models.Sense.examples.through
+    rows = through.objects.filter(sense_id__in=example_ids).order_by('example__release_date').values_list('sense_id', 'example_id')
+    for sense_id, example_id in rows:
+        example_ids[sense_id].append(example_id)
+    return example_ids
+
+
+def build_senses(sense_objects, published, full=False) -> List[Dict[str, Any]]:
+    """
+    Builds a list of senses in a constant number of queries: every relation is loaded once
+    for the whole list & partitioned in Python, and all the examples shown are built in one batch
+    """
+    senses = list(sense_objects)
+    prefetch_related_objects(senses, *sense_prefetches())
+    example_ids = sense_example_ids(senses)
+    shown_ids = {sense_id: ids if full else ids[:NUM_QUOTS_TO_SHOW] for sense_id, ids in example_ids.items()}
+    example_objects = list(dictionary.models.Example.objects.filter(id__in={i for ids in shown_ids.values() for i in ids}))
+    built = dict(zip([example.id for example in example_objects], build_examples(example_objects, published)))
+    return [
+        _build_sense(sense_object, [built[i] for i in shown_ids[sense_object.id]], len(example_ids[sense_object.id]))
+        for sense_object in senses
+    ]
+
+
+def build_sense(sense_object, published, full=False) -> Dict[str, Any]:
+    return build_senses([sense_object], published, full)[0]
+
+
+def _build_sense(sense_object, examples, num_examples) -> Dict[str, Any]:
     sense_slug = slugify(sense_object.headword + '_' + sense_object.xml_id)
     sense_image = check_for_image(sense_slug, 'senses', 'full')
     if "__none" in sense_image:
@@ -244,11 +327,15 @@ def build_sense(sense_object, published, full=False, build_form=False) -> Dict[s
     artist_slug, artist_name, image = assign_artist_image(examples)
     form = None
 
-    synset = sense_object.synset.first()
-    if synset:
-        synonyms = [sense_to_xref_dict(s) for s in synset.senses.order_by('headword') if s != sense_object]
+    xrefs = dict()
+    for xref in sense_object.xrefs.all():
+        xrefs.setdefault(xref.xref_type, []).append(xref.to_dict())
+
+    synsets = sense_object.synset.all()
+    if synsets:
+        synonyms = [sense_to_xref_dict(s) for s in synsets[0].senses.all() if s != sense_object]
     else:
-        synonyms = [o.to_dict() for o in sense_object.xrefs.filter(xref_type="Synonym").order_by('xref_word')]
+        synonyms = xrefs.get("Synonym", [])
 
     result = {
         "headword": sense_object.headword,
@@ -257,29 +344,21 @@ def build_sense(sense_object, published, full=False, build_form=False) -> Dict[s
         "definition": split_definitions(sense_object.definition),
         "notes": sense_object.notes,
         "etymology": sense_object.etymology,
-        "domains": [o.to_dict() for o in sense_object.domains.order_by('name')],
-        "regions": [o.to_dict() for o in sense_object.regions.order_by('name')],
-        "semantic_classes": [o.to_dict() for o in sense_object.semantic_classes.order_by('name')],
+        "domains": [o.to_dict() for o in sense_object.domains.all()],
+        "regions": [o.to_dict() for o in sense_object.regions.all()],
+        "semantic_classes": [o.to_dict() for o in sense_object.semantic_classes.all()],
         "examples": examples,
-        "num_examples": len(example_results),
+        "num_examples": num_examples,
         "synonyms": synonyms,
-        "antonyms": [o.to_dict() for o in sense_object.xrefs.filter(xref_type="Antonym").order_by('xref_word')],
-        "meronyms": [o.to_dict() for o in sense_object.xrefs.filter(xref_type="Meronym").order_by('xref_word')],
-        "holonyms": [o.to_dict() for o in sense_object.xrefs.filter(xref_type="Holonym").order_by('xref_word')],
-        "derivatives": [o.to_dict() for o in sense_object.xrefs.filter(xref_type="Derivative").order_by('xref_word')],
-        "ancestors": [o.to_dict() for o in sense_object.xrefs.filter(xref_type="Derives From").order_by('xref_word')],
-        "instance_of": [o.to_dict() for o in sense_object.xrefs.filter(xref_type="Instance Of").order_by('xref_word')],
-        "instances": [o.to_dict() for o in sense_object.xrefs.filter(xref_type="Instance").order_by('xref_word')],
-        "related_concepts": [o.to_dict() for o in sense_object.xrefs.filter(xref_type="Related Concept").order_by('xref_word')],
-        "related_words": [o.to_dict() for o in sense_object.xrefs.filter(xref_type="Related Word").order_by('xref_word')],
-        "rhymes": [o.to_dict() for o in sense_object.sense_rhymes.order_by('-frequency')],
-        "collocates": [o.to_dict() for o in sense_object.collocates.order_by('-frequency')],
+        "rhymes": [o.to_dict() for o in sense_object.sense_rhymes.all()],
+        "collocates": [o.to_dict() for o in sense_object.collocates.all()],
         "artist_slug": artist_slug,
         "artist_name": artist_name,
         "sense_image": sense_image,
         "image": image,
         "form": form
     }
+    result.update({key: xrefs.get(xref_type, []) for key, xref_type in SENSE_XREF_TYPES})
     return result
 
 
@@ -338,10 +417,40 @@ def build_entry_preview(entry_object) -> Dict[str, str]:
     }
 
 
+def example_prefetches() -> List[Prefetch]:
+    return [
+        Prefetch('from_song', queryset=dictionary.models.Song.objects.only('id', 'title', 'artist_name', 'spot_uri')),
+        Prefetch('feat_artist', queryset=dictionary.models.Artist.objects.order_by('name')),
+        'feat_artist__origin',
+        'feat_artist__also_known_as',
+        'feat_artist__members'
+    ]
+
+
+def prefetch_examples(example_objects) -> List[Any]:
+    """
+    Evaluates an example queryset (or list) & bulk loads everything build_example reads,
+    so a whole list serializes in a constant number of queries
+    """
+    examples = list(example_objects)
+    prefetch_related_objects(examples, *example_prefetches())
+    return examples
+
+
+def build_examples(example_objects, published, rf=False) -> List[Dict[str, Any]]:
+    return [_build_example(example, published, rf) for example in prefetch_examples(example_objects)]
+
+
 def build_example(example_object, published, rf=False) -> Dict[str, Any]:
+    return build_examples([example_object], published, rf)[0]
+
+
+def _build_example(example_object, published, rf=False) -> Dict[str, Any]:
     lyric = example_object.lyric_text
-    lyric_links = example_object.lyric_links.order_by('position')
-    sl = example_object.spot_link()
+    linked_lyric = example_object.linked_lyric
+    if linked_lyric is None:
+        linked_lyric = add_links(lyric, example_object.lyric_links.order_by('position'), published)
+    songs = example_object.from_song.all()
     return {
         "artist_name": reformat_name(example_object.artist_name),
         "artist_slug": example_object.artist_slug,
@@ -350,10 +459,10 @@ def build_example(example_object, published, rf=False) -> Dict[str, Any]:
         "album": example_object.album,
         "release_date": str(example_object.release_date),
         "release_date_string": example_object.release_date_string,
-        "featured_artists": [build_artist(feat) for feat in example_object.feat_artist.order_by('name')],
+        "featured_artists": [build_artist(feat) for feat in example_object.feat_artist.all()],
         "lyric": lyric,
-        "linked_lyric": add_links(lyric, lyric_links, published),
-        "spot_link": sl
+        "linked_lyric": linked_lyric,
+        "spot_link": dictionary.models.Example.format_spot_link(songs[0].spot_uri) if songs else None
     }
 
 
@@ -418,7 +527,7 @@ def build_timeline_example(example_object, published, rf=False):
 
 def build_stats():
 
-    published_headwords = dictionary.models.Entry.objects.filter(publish=True).values_list('headword', flat=True)
+    published_headwords = get_published_index().headwords
     entry_count = dictionary.models.Entry.objects.filter(publish=True).count()
     sense_count = dictionary.models.Sense.objects.filter(publish=True).count()
     example_count = dictionary.models.Example.objects.all().count()
@@ -544,8 +653,8 @@ def build_stats():
                 'width': (count_place_artists(p, [0]) / place_count) * 100 - WIDTH_ADJUSTMENT
             } for p in places
         ],
-        'earliest_date': {'example': [build_example(date, published_headwords) for date in examples_date_ascending[:LIST_LENGTH]]},
-        'latest_date': {'example': [build_example(date, published_headwords) for date in examples_date_descending[:LIST_LENGTH]]},
+        'earliest_date': {'example': build_examples(examples_date_ascending[:LIST_LENGTH], published_headwords)},
+        'latest_date': {'example': build_examples(examples_date_descending[:LIST_LENGTH], published_headwords)},
         'num_seventies': seventies_count,
         'seventies_width': (seventies_count / decade_max) * 100,
         'num_eighties': eighties_count,
@@ -612,15 +721,42 @@ def inject_link(lyric, start, end, a):
     return lyric[:start] + a + lyric[end:]
 
 
+def content_digest(d) -> str:
+    """A stable hash of a parsed source dict, taken over its JSON with sorted keys, so that equal dicts digest alike"""
+    canonical = json.dumps(d, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def render_linked_lyrics(example_objects) -> int:
+    """
+    Renders each example's lyric links into its stored linked_lyric, checking the publish status
+    of every link target in one query for the whole batch; returns the number of examples rendered
+    """
+    examples = list(example_objects)
+    prefetch_related_objects(examples, Prefetch('lyric_links', queryset=dictionary.models.LyricLink.objects.order_by('position')))
+    targets = {link.target_slug.split("#")[0] for example in examples for link in example.lyric_links.all()}
+    published = set(dictionary.models.Entry.objects.filter(publish=True, slug__in=targets).values_list('slug', flat=True))
+    for example in examples:
+        example.linked_lyric = add_links(example.lyric_text, example.lyric_links.all(), published)
+    dictionary.models.Example.objects.bulk_update(examples, ['linked_lyric'], batch_size=1000)
+    return len(examples)
+
+
+def rerender_linked_lyrics(slugs) -> int:
+    """
+    Re-renders only the examples with a lyric link targeting one of the given entry slugs,
+    found through the index on LyricLink.target_slug; used when an entry is published, unpublished or renamed
+    """
+    query = Q()
+    for slug in slugs:
+        query |= Q(lyric_links__target_slug=slug) | Q(lyric_links__target_slug__startswith=slug + '#')
+    if not query:
+        return 0
+    return render_linked_lyrics(dictionary.models.Example.objects.filter(query).distinct())
+
+
 def check_for_image(slug, image_type='artists', folder='thumb'):
-    jpg = 'dictionary/static/dictionary/img/{}/{}/{}.jpg'.format(image_type, folder, slug)
-    png = 'dictionary/static/dictionary/img/{}/{}/{}.png'.format(image_type, folder, slug)
-    images = []
-
-    if os.path.isfile(jpg.encode('utf-8').strip()):
-        images.append(jpg.replace('dictionary/static/dictionary/', '/static/dictionary/'))
-    if os.path.isfile(png.encode('utf-8').strip()):
-        images.append(png.replace('dictionary/static/dictionary/', '/static/dictionary/'))
+    images = get_image_manifest().lookup(slug, image_type, folder)
     if len(images) == 0:
         return '/static/dictionary/img/artists/{}/__none.png'.format(folder)
     else:
@@ -1060,9 +1196,11 @@ def update_headword(old_headword, new_headword):
             lyric_link.target_slug = new_ll_slug
             lyric_link.save()
         old_entry.delete()
+        rerender_linked_lyrics([new_slug])
     except Exception as e:
         logger.error(e)
     else:
+        bump_data_version()
         msg = "{} updated to {}".format(old_headword, new_headword)
         logger.info(msg)
         return {old_headword: new_headword}
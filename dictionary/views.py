@@ -12,18 +12,22 @@ from django.template import loader
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.cache import cache_control
 
-from dictionary.utils import build_artist, assign_artist_image, build_sense, build_sense_preview, \
-    build_example, check_for_image, abbreviate_place_name, \
+from dictionary.utils import build_artist, assign_artist_image, build_senses, build_sense_preview, \
+    build_examples, check_for_image, abbreviate_place_name, \
     collect_place_artists, build_entry_preview, dedupe_rhymes
 from .models import Entry, Sense, Artist, NamedEntity, Domain, Region, Example, Place, ExampleRhyme, Song, \
-    SemanticClass, Stats, Form
-from .utils import build_query, slugify, reformat_name, un_camel_case, move_definite_article_to_end, update_stats
+    SemanticClass, Stats
+from .utils import search_examples, slugify, reformat_name, un_camel_case, update_stats
 from dictionary.forms import SongForm
+from dictionary.published_index import get_published_index
+from dictionary.sampler import get_sampler
+from dictionary.slug_resolver import get_slug_resolver
 
 
 logger = logging.getLogger(__name__)
 NUM_QUOTS_TO_SHOW = 3
 NUM_ARTISTS_TO_SHOW = 6
+SEARCH_REDIRECT_ARGS = {'entry': 'headword_slug', 'artist': 'artist_slug', 'entity': 'entity_slug'}
 
 gm = os.getenv("GOOGLE_MAPS_KEY", None)
 GMKV = f"&key={gm}" if gm else None
@@ -71,7 +75,7 @@ def artist(request, artist_slug):
     origin_full_name = origin.full_name if origin and origin.full_name else ''
     origin_slug = origin.slug if origin else ''
 
-    published = Entry.objects.filter(publish=True).values_list('slug', flat=True)
+    published = get_published_index().slugs
     template = loader.get_template('dictionary/artist.html')
     entity_results = NamedEntity.objects.filter(pref_label_slug=artist_slug).first()
 
@@ -87,7 +91,7 @@ def artist(request, artist_slug):
             'slug': sense.slug,
             'xml_id': sense.xml_id,
             'example_count': sense.examples.filter(artist=a).count(),
-            'examples': [build_example(example, published) for example in sense.examples.filter(artist=a).order_by('release_date')]
+            'examples': build_examples(sense.examples.filter(artist=a).order_by('release_date'), published)
         } for sense in p_senses
     ]
 
@@ -97,11 +101,11 @@ def artist(request, artist_slug):
             'slug': sense.slug,
             'xml_id': sense.xml_id,
             'example_count': sense.examples.filter(feat_artist=a).count(),
-            'examples': [build_example(example, published) for example in sense.examples.filter(feat_artist=a).order_by('release_date')]
+            'examples': build_examples(sense.examples.filter(feat_artist=a).order_by('release_date'), published)
         } for sense in a.featured_senses.filter(publish=True).annotate(num_examples=Count('examples')).order_by('num_examples')[:5]
     ]
 
-    entity_examples = [build_example(example, published) for example in entity_results.examples.all()] if entity_results else list()
+    entity_examples = build_examples(entity_results.examples.all(), published) if entity_results else list()
 
     name = reformat_name(a.name)
     primary_sense_count = a.primary_senses.filter(publish=True).count()
@@ -134,7 +138,7 @@ def domain(request, domain_slug):
     template = loader.get_template('dictionary/domain.html')
     d = get_object_or_404(Domain, slug=domain_slug)
     sense_objects = d.senses.filter(publish=True).order_by('headword')
-    published = Entry.objects.filter(publish=True).values_list('slug', flat=True)
+    published = get_published_index().slugs
     senses = [build_sense_preview(sense) for sense in sense_objects]
     senses_data = [{"word": sense.headword, "weight": sense.examples.count()} for sense in sense_objects]
     data = [sense.headword for sense in sense_objects]
@@ -167,7 +171,7 @@ def region(request, region_slug):
     template = loader.get_template('dictionary/region.html')
     r = get_object_or_404(Region, slug=region_slug)
     sense_objects = r.senses.filter(publish=True).order_by('headword')
-    published = Entry.objects.filter(publish=True).values_list('slug', flat=True)
+    published = get_published_index().slugs
     senses = [build_sense_preview(sense) for sense in sense_objects]
     senses_data = [{"word": sense.headword, "weight": sense.examples.count()} for sense in sense_objects]
     data = [sense.headword for sense in sense_objects]
@@ -200,7 +204,7 @@ def regions(request):
 def entity(request, entity_slug):
     results = get_list_or_404(NamedEntity, pref_label_slug=entity_slug)
     template = loader.get_template('dictionary/named_entity.html')
-    published = Entry.objects.filter(publish=True).values_list('slug', flat=True)
+    published = get_published_index().slugs
 
     if len(results) > 0:
         entities = []
@@ -216,7 +220,7 @@ def entity(request, entity_slug):
                 'slug': e.slug,
                 'pref_label': e.pref_label,
                 'pref_label_slug': e.pref_label_slug,
-                'senses': [{'sense': sense, 'examples': [build_example(example, published) for example in sense.examples.filter(features_entities=e).order_by('release_date')]} for sense in e.mentioned_at_senses.filter(publish=True).order_by('headword')]
+                'senses': [{'sense': sense, 'examples': build_examples(sense.examples.filter(features_entities=e).order_by('release_date'), published)} for sense in e.mentioned_at_senses.filter(publish=True).order_by('headword')]
             })
 
         context = {
@@ -238,14 +242,11 @@ def entry(request, headword_slug):
     template = loader.get_template('dictionary/entry.html')
 
     _entry = get_object_or_404(Entry, slug=slug, publish=True)
-    published = Entry.objects.filter(publish=True).values_list('slug', flat=True)
-    slugs = list(published)
-    include_form = request.user.is_authenticated
+    index = get_published_index()
+    published = index.slugs
     include_all_senses = False
-    senses = [build_sense(sense, published, include_all_senses, include_form) for sense in _entry.get_senses_ordered_by_example_count()]
-    _index = slugs.index(slug)
-    preceding = slugs[_index-1] if _index-1 >= 0 else None
-    following = slugs[_index+1] if _index+1 < len(published) else None
+    senses = build_senses(_entry.get_senses_ordered_by_example_count(), published, include_all_senses)
+    preceding, following = index.neighbours(slug)
     context = {
         'headword': _entry.headword,
         'slug': slug,
@@ -285,7 +286,7 @@ def place(request, place_slug):
     p = get_object_or_404(Place, slug=place_slug)
     template = loader.get_template('dictionary/place.html')
 
-    published = Entry.objects.filter(publish=True).values_list('headword', flat=True)
+    published = get_published_index().headwords
     entity_results = NamedEntity.objects.filter(pref_label_slug=place_slug)
     examples = []
 
@@ -304,7 +305,7 @@ def place(request, place_slug):
     # TODO: reorder examples by release_date in case of multiple entities
     if len(entity_results) >= 1:
         for e in entity_results:
-            examples += [build_example(example, published, rf=True) for example in e.examples.order_by('release_date')]
+            examples += build_examples(e.examples.order_by('release_date'), published, rf=True)
 
     context = {
         'place': p.name,
@@ -324,7 +325,7 @@ def place(request, place_slug):
 
 
 def random_entry(request):
-    rand_entry = Entry.objects.filter(publish=True).order_by('?').first()
+    rand_entry = get_sampler().choice('entry')
     if rand_entry:
         return redirect('entry', headword_slug=rand_entry.slug)
     else:
@@ -334,7 +335,7 @@ def random_entry(request):
 @cache_control(max_age=3600)
 def rhyme(request, rhyme_slug):
     template = loader.get_template('dictionary/rhyme.html')
-    published = Entry.objects.filter(publish=True).values_list('slug', flat=True)
+    published = get_published_index().slugs
     title = rhyme_slug
 
     rhyme_results = ExampleRhyme.objects.filter(Q(word_one_slug=rhyme_slug)|Q(word_two_slug=rhyme_slug))
@@ -352,7 +353,7 @@ def rhyme(request, rhyme_slug):
             _rhyme = r.word_one
             slug = r.word_one_slug
 
-        exx = [build_example(example, published) for example in r.parent_example.all()]
+        exx = build_examples(r.parent_example.all(), published)
         if exx:
             image_exx.extend(exx)
 
@@ -392,40 +393,18 @@ def rhyme(request, rhyme_slug):
 
 @cache_control(max_age=360)
 def search(request):
-    published_entry_forms = Form.objects.filter(parent_entry__publish=True).values_list('slug', flat=True)
-    published_entry_slugs = Entry.objects.filter(publish=True).values_list('slug', flat=True)
-    artist_slugs = [a.slug for a in Artist.objects.all()]
-    entity_slugs = [e.pref_label_slug for e in NamedEntity.objects.filter(entity_type='person')]
     template = loader.get_template('dictionary/search_results.html')
     context = dict()
     if ('q' in request.GET) and request.GET['q'].strip():
         query_string = request.GET['q']
-        query_slug = slugify(query_string)
-
-        if query_string.lower().startswith("the "):
-            alt_query_string = move_definite_article_to_end(query_string)
-            alt_query_slug = slugify(alt_query_string)
-        else:
-            alt_query_slug = ''
-
-        if query_slug in published_entry_forms:
-            form = Form.objects.get(slug=query_slug)
-            parent_entry = form.parent_entry.first()
-            return redirect('entry', headword_slug=parent_entry.slug)
-        elif query_slug in published_entry_slugs:
-            return redirect('entry', headword_slug=query_slug)
-        elif query_slug in artist_slugs:
-            return redirect('artist', artist_slug=query_slug)
-        elif query_slug in entity_slugs:
-            return redirect('entity', entity_slug=query_slug)
-        elif alt_query_slug and alt_query_slug in published_entry_slugs:
-            return redirect('entry', headword_slug=alt_query_slug)
-        elif alt_query_slug and alt_query_slug in artist_slugs:
-            return redirect('artist', artist_slug=alt_query_slug)
+        target = get_slug_resolver().resolve(slugify(query_string))
+        if target:
+            view_name, target_slug = target
+            return redirect(view_name, **{SEARCH_REDIRECT_ARGS[view_name]: target_slug})
         else:
-            sense_query = build_query(query_string, ['lyric_text'])
-            result_count = Example.objects.filter(sense_query).order_by('-release_date').count()
-            example_results = [build_example(example, published=published_entry_slugs, rf=True) for example in Example.objects.filter(sense_query).order_by('-release_date')[:100]]
+            results = search_examples(query_string)
+            result_count = results.count()
+            example_results = build_examples(results[:100], published=get_published_index().slugs, rf=True)
             context['query'] = query_string
             context['examples'] = example_results
             context['result_count'] = result_count
@@ -433,10 +412,7 @@ def search(request):
 
     other_entries = []
     if 'result_count' in context and context['result_count'] < 1 or 'result_count' not in context:
-        for i in range(6):
-            r = Sense.objects.filter(publish=True).order_by('?').first()
-            if r:
-                other_entries.append(build_sense_preview(r))
+        other_entries = [build_sense_preview(r) for r in get_sampler().sample('sense', 6)]
     context['other_entries'] = other_entries
 
     return HttpResponse(template.render(context, request))
@@ -490,9 +466,9 @@ def song(request, song_slug):
             _song.release_date_string = form.cleaned_data["release_date_string"]
             _song.artist_name = form.cleaned_data["artist_name"]
             _song.album = form.cleaned_data["album"]
-            _song.lyrics = form.cleaned_data["lyrics"]
             _song.release_date_verified = form.cleaned_data["release_date_verified"]
             _song.save()
+            _song.set_lyrics(form.cleaned_data["lyrics"])
 
     _song = get_list_or_404(Song, slug=song_slug)[0]
     template = loader.get_template('dictionary/song.html')
@@ -505,7 +481,6 @@ def song(request, song_slug):
         } for s in Song.objects.filter(release_date=_song.release_date).order_by('artist_name') if s != _song]
     image = check_for_image(_song.artist_slug, 'artists', 'full')
     thumb = check_for_image(_song.artist_slug, 'artists', 'thumb')
-    form = SongForm(instance=_song)
     sense_results = set([s for e in _song.examples.all() for s in e.illustrates_senses.filter(publish=True).order_by('headword')])
     senses = [build_sense_preview(s) for s in sense_results]
 
@@ -527,7 +502,7 @@ def song(request, song_slug):
     }
 
     if request.user.is_authenticated:
-        context['form'] = form
+        context['form'] = SongForm(instance=_song)
 
     return HttpResponse(template.render(context, request))
 
@@ -144,3 +144,18 @@ REST_FRAMEWORK = {
 
 SOURCE_XML_PATH = '../tRR/XML/tRR_Django'
 SOURCE_CORPUS_PATH = '../corpus/dbs/HH.db'
+
+IMAGE_MANIFEST_PATH = os.path.join(BASE_DIR, 'dictionary/image_manifest.json')
+
+# seconds a worker may go without re-reading the shared data version stamp, so that the in-memory indexes are served
+# without a cache query; other workers see a published change up to this late. 0 re-reads it on every call
+DATA_VERSION_CHECK_INTERVAL = int(os.getenv("DATA_VERSION_CHECK_INTERVAL", 5))
+
+# processes parsing XML files ahead of the single ingestion writer; 1 (the default) streams each file an entry at a
+# time in the writer's own process, keeping memory flat, while more hold whole parsed files for the pool
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 1))
+# entries written per ingestion transaction (each in its own savepoint); 0 writes a whole file in one transaction
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 500))
+
+# whether song lyrics are stored zlib-compressed (either form reads back the same)
+COMPRESS_SONG_LYRICS = os.getenv("COMPRESS_SONG_LYRICS", "true").lower() in ("1", "true", "yes")
@@ -7,6 +7,7 @@ For more information on this file, see
 https://docs.djangoproject.com/en/1.8/howto/deployment/wsgi/
 """
 
+import logging
 import os
 
 from django.core.wsgi import get_wsgi_application
@@ -14,3 +15,14 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "the_right_rhymes.settings")
 
 application = get_wsgi_application()
+
+# build this worker's in-memory indexes before the first request rather than during it
+try:
+    from dictionary.prefix_index import get_prefix_index
+    from dictionary.published_index import get_published_index
+    from dictionary.slug_resolver import get_slug_resolver
+    get_published_index()
+    get_prefix_index()
+    get_slug_resolver()
+except Exception as e:
+    logging.getLogger(__name__).warning(f"Unable to build in-memory indexes at startup: {e}")